@@ -2,6 +2,7 @@
 import streamlit as st
 import sys
 import os
+from datetime import date, timedelta
 
 # Tambahkan path project root ke sys.path agar bisa impor dari modules
 current_dir = os.path.dirname(os.path.abspath(__file__))
@@ -23,6 +24,12 @@ except ImportError as e:
     st.error(f"Gagal mengimpor menu_manager: {e}. Pastikan struktur direktori sudah benar dan file modules/menu_manager.py ada.")
     st.stop()
 
+try:
+    from modules.sales_analytics import SalesColumnStore, compute_sales_summary, DINING_OPTIONS
+    analytics_import_error = None
+except ImportError as e:
+    analytics_import_error = e # Dashboard menu tetap bisa dipakai tanpa numpy
+
 # Konfigurasi Halaman Streamlit
 st.set_page_config(
     page_title="Admin Dashboard - Mata Kopian",
@@ -114,7 +121,7 @@ if st.session_state.editing_item_id:
 
 
 # --- TABS UNTUK KELOLA MENU DAN INFO ---
-tab1, tab2, tab3, tab4, tab5, tab6, tab7 = st.tabs(["➕ Tambah Item & ℹ️ Info Pesan", "☕ Es Kopi", "🍵 Non Kopi", "🫕 Espresso Based", "🍸 Refreshment", "🥤 Others", "🥐 Pastry"])
+tab1, tab2, tab3, tab4, tab5, tab6, tab7, tab8 = st.tabs(["➕ Tambah Item & ℹ️ Info Pesan", "☕ Es Kopi", "🍵 Non Kopi", "🫕 Espresso Based", "🍸 Refreshment", "🥤 Others", "🥐 Pastry", "📊 Analitik Penjualan"])
 
 with tab1:
     st.header("➕ Tambah Item Menu Baru")
@@ -261,6 +268,57 @@ with tab7:
     else:
         display_menu_items("Pastry", menu_data.get("pastry", []))
 
+# Hasil agregasi di-cache per rentang tanggal; signature berubah saat ada pesanan baru
+@st.cache_data
+def load_sales_summary(start_day, end_day, ledger_signature):
+    return compute_sales_summary(start_day, end_day)
+
+DINING_LABELS = {"dine_in": "Di Tempat", "takeaway": "Dibungkus"}
+
+with tab8:
+    st.header("📊 Analitik Penjualan")
+    if analytics_import_error:
+        st.warning(f"Analitik tidak tersedia: {analytics_import_error}. Install numpy (lihat requirements.txt).")
+    else:
+        today = date.today()
+        col_start, col_end = st.columns(2)
+        with col_start:
+            start_day = st.date_input("Dari tanggal:", value=today - timedelta(days=29), key="analytics_start")
+        with col_end:
+            end_day = st.date_input("Sampai tanggal:", value=today, key="analytics_end")
+
+        if start_day > end_day:
+            st.error("Tanggal awal tidak boleh setelah tanggal akhir.")
+        else:
+            summary = load_sales_summary(start_day, end_day, SalesColumnStore().signature(start_day, end_day))
+            if not summary["order_count"]:
+                st.info("Belum ada pesanan pada rentang tanggal ini.")
+            else:
+                col_revenue, col_orders, col_average = st.columns(3)
+                col_revenue.metric("Total Pendapatan", f"Rp{summary['total_revenue']:,}")
+                col_orders.metric("Jumlah Pesanan", f"{summary['order_count']:,}")
+                col_average.metric("Rata-rata per Pesanan", f"Rp{summary['total_revenue'] // summary['order_count']:,}")
+
+                st.subheader("Pendapatan per Jam")
+                st.bar_chart({"Pendapatan (Rp)": summary["revenue_per_hour"]})
+
+                st.subheader("Pendapatan per Hari")
+                st.line_chart({"Pendapatan (Rp)": summary["revenue_per_day"]})
+                st.caption(f"{summary['days'][0]} s/d {summary['days'][-1]} ({len(summary['days'])} hari dengan pesanan)")
+
+                st.subheader("Item Terlaris")
+                st.table([
+                    {"Item": item["nama"], "Terjual": item["quantity"], "Pendapatan": f"Rp{item['revenue']:,}"}
+                    for item in summary["top_items"]
+                ])
+
+                st.subheader("Di Tempat vs Dibungkus")
+                dining_columns = st.columns(len(DINING_OPTIONS))
+                for column, option in zip(dining_columns, DINING_OPTIONS):
+                    split = summary["dining_split"][option]
+                    share = split["orders"] / summary["order_count"] * 100
+                    column.metric(DINING_LABELS[option], f"{split['orders']:,} pesanan ({share:.0f}%)", f"Rp{split['revenue']:,}", delta_color="off")
+
 st.sidebar.divider()
 st.sidebar.markdown("---")
 st.sidebar.caption("Dashboard Admin Mata Kopian v0.2")
\ No newline at end of file
@@ -0,0 +1,193 @@
+"""
+Micro-benchmark fungsi NLP di hot path (bot/nlp_utils.py) dengan menu sintetis 50, 1k dan 10k item
+Hasil dibandingkan dengan baseline JSON; exit code 1 jika ada fungsi yang melambat melewati threshold
+Menjalankan:
+    python benchmarks/bench_nlp.py                      # bandingkan dengan baseline
+    python benchmarks/bench_nlp.py --save-baseline      # simpan hasil sebagai baseline baru
+    python benchmarks/bench_nlp.py --threshold 30 --sizes 50,1000
+"""
+import argparse
+import json
+import os
+import platform
+import random
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+current_dir = os.path.dirname(os.path.abspath(__file__))
+project_root = os.path.dirname(current_dir)
+if project_root not in sys.path:
+    sys.path.append(project_root)
+
+# Ukur biaya NLP penuh, bukan hit cache hasil NLP (bot/nlp_cache.py)
+os.environ.setdefault("BOT_NLP_CACHE_SIZE", "0")
+
+import modules.menu_manager as menu_manager
+from modules.menu_storage import JsonSnapshotStorage
+from bot.nlp_utils import preprocess_text, recognize_intent, extract_entities_item_name, extract_quantity
+
+DEFAULT_BASELINE_PATH = os.path.join(current_dir, "baseline_nlp.json")
+DEFAULT_SIZES = (50, 1000, 10000)
+DEFAULT_THRESHOLD_PERCENT = 25.0
+DEFAULT_MIN_DELTA_US = 1.0 # Selisih absolut di bawah ini dianggap noise
+DEFAULT_REPEAT = 5
+
+# Pesan realistis (bahasa Indonesia, slang, salah ketik) seperti yang masuk ke bot
+CORPUS = [
+    "halo kak", "pagi min", "menu dong", "ada apa aja menunya?", "kasih liat menu",
+    "berapa harga es kopi susu mako?", "es kopi karla brp ya", "harganya matcha latte berapa sih",
+    "mau pesan es kopi moka 2", "pesen cappuccino satu ya", "aku mau almond croissant dua",
+    "gue mau order es americano 3 gelas", "beli croffle", "mau itu aja deh", "yang tadi 2",
+    "es kopi susu mak0 1", "capucino 2", "matca latte", "kroisan almond", "es kopi pandan komandan",
+    "selesai", "udah itu aja", "makan di tempat", "dibungkus ya", "ambil sendiri", "delivery bisa?",
+    "bayar pake gopay", "cash di kasir", "qris", "makasih banyak", "thx bgt", "kamu siapa sih",
+    "bisa ngapain aja bot ini", "cara pesannya gimana", "jam buka kapan", "ada wifi ga",
+    "tiga", "sepuluh gelas", "12", "mau lima es kopi koko sama dua pain au chocolat",
+]
+
+_NAME_PREFIXES = ["Es", "Hot", "Iced", "Signature"]
+_NAME_BASES = [
+    "Kopi Susu", "Latte", "Cappuccino", "Americano", "Mocha", "Macchiato", "Flat White", "Affogato",
+    "Matcha", "Chocolate", "Teh Tarik", "Lemon Tea", "Kopi Tubruk", "Cold Brew", "Croissant",
+    "Danish", "Roti Bakar", "Pisang Goreng", "Waffle", "Pancake",
+]
+_NAME_FLAVORS = [
+    "Aren", "Pandan", "Karamel", "Hazelnut", "Vanilla", "Rum", "Cookies", "Kelapa", "Jahe", "Stroberi",
+    "Mangga", "Leci", "Markisa", "Cokelat", "Keju", "Almond", "Tiramisu", "Regal", "Oreo", "Lotus",
+    "Kurma", "Alpukat", "Taro", "Ubi Ungu", "Kacang", "Kayu Manis", "Madu", "Mint", "Yuzu", "Sakura",
+]
+_NAME_SIZES = ["", "Regular", "Large", "Jumbo", "Mini", "Double"]
+
+
+def build_synthetic_menu(size, seed=42):
+    """Menu sintetis berisi item asli (agar korpus tetap cocok) ditambah kombinasi nama acak."""
+    real_menu = menu_manager.get_menu()
+    real_items = [dict(item) for category in menu_manager.MENU_CATEGORIES for item in real_menu.get(category, [])]
+
+    names = [
+        " ".join(part for part in (prefix, base, flavor, size_name) if part)
+        for prefix in _NAME_PREFIXES for base in _NAME_BASES
+        for flavor in _NAME_FLAVORS for size_name in _NAME_SIZES
+    ]
+    rng = random.Random(seed)
+    rng.shuffle(names)
+
+    menu = {category: [] for category in menu_manager.MENU_CATEGORIES}
+    for index, item in enumerate(real_items[:size]):
+        menu[menu_manager.MENU_CATEGORIES[index % len(menu_manager.MENU_CATEGORIES)]].append(item)
+    for index, name in enumerate(names[:max(0, size - len(real_items))]):
+        menu[menu_manager.MENU_CATEGORIES[index % len(menu_manager.MENU_CATEGORIES)]].append({
+            "id": f"syn{index:05d}", "nama": name,
+            "harga": rng.randrange(10, 60) * 1000, "deskripsi": ""
+        })
+    menu["info_pemesanan"] = real_menu.get("info_pemesanan", "")
+    return menu
+
+
+def use_menu(menu, tmp_dir):
+    """Mengarahkan menu_manager ke file menu sintetis (tanpa menyentuh data/menu_data.json)."""
+    path = os.path.join(tmp_dir, f"menu_{sum(len(v) for v in menu.values() if isinstance(v, list))}.json")
+    storage = JsonSnapshotStorage(path)
+    storage.save_snapshot(menu)
+    menu_manager._storage = storage
+    menu_manager.load_menu_data()
+
+
+def time_function(func, corpus, repeat):
+    """Waktu rata-rata per panggilan (mikrodetik), diambil yang tercepat dari beberapa putaran."""
+    loops = max(1, 2000 // len(corpus))
+    best = float("inf")
+    for _ in range(repeat):
+        started = time.perf_counter()
+        for _ in range(loops):
+            for text in corpus:
+                func(text)
+        best = min(best, (time.perf_counter() - started) / (loops * len(corpus)))
+    return best * 1_000_000
+
+
+def run_benchmarks(sizes, repeat):
+    functions = {
+        "preprocess_text": preprocess_text,
+        "recognize_intent": recognize_intent,
+        "extract_entities_item_name": extract_entities_item_name,
+        "extract_quantity": extract_quantity,
+    }
+    results = {}
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        for size in sizes:
+            use_menu(build_synthetic_menu(size), tmp_dir)
+            # Panggilan pertama membangun indeks entitas/fuzzy; jangan ikut diukur
+            for text in CORPUS:
+                extract_entities_item_name(text)
+            for name, func in functions.items():
+                key = f"{name}@{size}"
+                results[key] = round(time_function(func, CORPUS, repeat), 3)
+                print(f"{key:<36} {results[key]:>10.2f} us/panggilan")
+    return results
+
+
+def compare_with_baseline(results, baseline, threshold_percent, min_delta_us):
+    """Mengembalikan daftar (key, baseline, sekarang, persen) yang melambat melewati threshold."""
+    regressions = []
+    for key, current in results.items():
+        previous = baseline.get(key)
+        if not previous:
+            continue
+        change_percent = (current - previous) / previous * 100
+        if change_percent > threshold_percent and current - previous > min_delta_us:
+            regressions.append((key, previous, current, change_percent))
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Micro-benchmark bot/nlp_utils.py")
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE_PATH, help="Path file baseline JSON")
+    parser.add_argument("--save-baseline", action="store_true", help="Simpan hasil sebagai baseline baru")
+    parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD_PERCENT,
+                        help="Persen perlambatan maksimum sebelum dianggap regresi")
+    parser.add_argument("--min-delta-us", type=float, default=DEFAULT_MIN_DELTA_US,
+                        help="Selisih absolut minimum (us) agar dianggap regresi")
+    parser.add_argument("--sizes", default=",".join(str(size) for size in DEFAULT_SIZES),
+                        help="Ukuran menu sintetis, dipisah koma")
+    parser.add_argument("--repeat", type=int, default=DEFAULT_REPEAT)
+    args = parser.parse_args()
+
+    sizes = [int(size) for size in args.sizes.split(",") if size.strip()]
+    results = run_benchmarks(sizes, args.repeat)
+
+    if args.save_baseline:
+        with open(args.baseline, "w", encoding="utf-8") as f:
+            json.dump({
+                "meta": {
+                    "created_at": datetime.now().isoformat(timespec="seconds"),
+                    "python": platform.python_version(),
+                    "platform": platform.platform(),
+                    "corpus_size": len(CORPUS),
+                },
+                "results": results,
+            }, f, indent=4)
+            f.write("\n")
+        print(f"Baseline disimpan ke {args.baseline}")
+        return
+
+    try:
+        with open(args.baseline, "r", encoding="utf-8") as f:
+            baseline = json.load(f)["results"]
+    except FileNotFoundError:
+        print(f"Baseline {args.baseline} belum ada. Jalankan dengan --save-baseline terlebih dahulu.")
+        return
+
+    regressions = compare_with_baseline(results, baseline, args.threshold, args.min_delta_us)
+    if regressions:
+        print(f"\nRegresi performa (> {args.threshold:.0f}%):")
+        for key, previous, current, change_percent in regressions:
+            print(f"  {key}: {previous:.2f} -> {current:.2f} us (+{change_percent:.0f}%)")
+        sys.exit(1)
+    print(f"\nTidak ada regresi di atas {args.threshold:.0f}% dibanding baseline.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,151 @@
+"""
+Load test offline: mensimulasikan banyak pelanggan yang chat bersamaan melalui handle_message
+Update/Message diganti stub dengan reply_text yang ditampung di memori, jadi tidak ada request ke Telegram
+Menjalankan: python benchmarks/load_test.py [--users 2000] [--think-ms 50] [--seed 1]
+"""
+import argparse
+import asyncio
+import logging
+import os
+import random
+import sys
+import tempfile
+import time
+
+try:
+    import resource
+except ImportError: # resource hanya tersedia di Unix
+    resource = None
+
+current_dir = os.path.dirname(os.path.abspath(__file__))
+project_root = os.path.dirname(current_dir)
+if project_root not in sys.path:
+    sys.path.append(project_root)
+
+# Sesi simulasi tidak perlu ditulis ke data/sessions.db, dan checkout simulasi tidak boleh
+# memakai urutan nomor pesanan maupun ledger produksi: arahkan ke folder sementara
+os.environ.setdefault("BOT_SESSION_PERSISTENCE", "0")
+_scratch_dir = tempfile.TemporaryDirectory(prefix="load_test_") # Dihapus otomatis saat proses keluar
+os.environ.setdefault("ORDER_ID_DB", os.path.join(_scratch_dir.name, "order_ids.db"))
+os.environ.setdefault("ORDER_LEDGER_DIR", os.path.join(_scratch_dir.name, "orders"))
+
+from bot.telegram_bot import handle_message
+from bot.dispatch import user_locks
+from bot.user_context import user_contexts
+
+SYSTEM_ERROR_REPLY = "Maaf, terjadi kesalahan sistem"
+
+# Skenario percakapan yang umum terjadi saat jam makan siang
+CONVERSATIONS = [
+    ["halo", "berapa harga es kopi susu mako?", "mau pesan itu", "2", "selesai", "makan di tempat", "e-wallet"],
+    ["pagi kak", "menu apa saja?", "pesan es kopi karla", "1", "almond croissant", "2", "cukup itu aja", "dibungkus", "ambil sendiri", "cash"],
+    ["mau order matcha latte", "3", "cukup", "di sini", "qris"],
+    ["ada rekomendasi?", "yang coffee latte berapa ya", "beli itu", "1", "tidak", "take away", "delivery", "gopay"],
+    ["halo kak", "jam buka kapan?", "terima kasih"],
+    ["pesan cappuccino 2", "2", "croffle", "1", "selesai", "bawa pulang", "pickup", "tunai"],
+]
+
+
+class StubUser:
+    def __init__(self, user_id, first_name):
+        self.id = user_id
+        self.first_name = first_name
+
+    def mention_html(self):
+        return f'<a href="tg://user?id={self.id}">{self.first_name}</a>'
+
+
+class StubMessage:
+    """Pengganti telegram.Message; balasan disimpan ke sink alih-alih dikirim."""
+
+    def __init__(self, text, sink):
+        self.text = text
+        self._sink = sink
+
+    async def reply_text(self, text, **kwargs):
+        self._sink.append(text)
+
+    async def reply_html(self, text, **kwargs):
+        self._sink.append(text)
+
+
+class StubUpdate:
+    def __init__(self, user, text, sink):
+        self.effective_user = user
+        self.message = StubMessage(text, sink)
+
+
+async def simulate_customer(user_id, conversation, think_seconds, latencies, replies):
+    """Satu pelanggan mengirim pesan satu per satu, seperti dari aplikasi Telegram."""
+    user = StubUser(user_id, f"Pelanggan{user_id}")
+    for text in conversation:
+        if think_seconds:
+            await asyncio.sleep(random.uniform(0, think_seconds))
+        started = time.perf_counter()
+        # Lewat user_locks supaya urutan per user sama seperti dispatch di produksi
+        await user_locks.run(user_id, handle_message, StubUpdate(user, text, replies), None)
+        latencies.append(time.perf_counter() - started)
+
+
+def _percentile(sorted_values, percent):
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, int(round(percent / 100 * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+
+def _peak_rss_mb():
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux melaporkan KB, macOS melaporkan byte
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+async def run_load_test(user_count, think_seconds):
+    latencies = []
+    replies = []
+    tasks = [
+        simulate_customer(user_id, CONVERSATIONS[user_id % len(CONVERSATIONS)], think_seconds, latencies, replies)
+        for user_id in range(1, user_count + 1)
+    ]
+    started = time.perf_counter()
+    await asyncio.gather(*tasks)
+    elapsed = time.perf_counter() - started
+    return latencies, replies, elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load test offline untuk handle_message")
+    parser.add_argument("--users", type=int, default=2000, help="Jumlah pelanggan simulasi yang chat bersamaan")
+    parser.add_argument("--think-ms", type=float, default=0.0, help="Jeda acak maksimum antar pesan (ms)")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--verbose", action="store_true", help="Tampilkan log INFO dari bot")
+    args = parser.parse_args()
+
+    random.seed(args.seed)
+    if not args.verbose:
+        logging.getLogger().setLevel(logging.WARNING)
+
+    latencies, replies, elapsed = asyncio.run(run_load_test(args.users, args.think_ms / 1000))
+
+    latencies.sort()
+    message_count = len(latencies)
+    error_count = sum(1 for reply in replies if reply.startswith(SYSTEM_ERROR_REPLY))
+    peak_rss = _peak_rss_mb()
+
+    print(f"Pelanggan simulasi : {args.users}")
+    print(f"Pesan diproses     : {message_count} ({len(replies)} balasan, {error_count} error sistem)")
+    print(f"Durasi             : {elapsed:.2f} s")
+    print(f"Throughput         : {message_count / elapsed:.0f} pesan/detik")
+    print(f"Latency p50        : {_percentile(latencies, 50) * 1000:.2f} ms")
+    print(f"Latency p95        : {_percentile(latencies, 95) * 1000:.2f} ms")
+    print(f"Latency p99        : {_percentile(latencies, 99) * 1000:.2f} ms")
+    print(f"Latency maks       : {latencies[-1] * 1000 if latencies else 0:.2f} ms")
+    print(f"Sesi aktif         : {len(user_contexts)}")
+    if peak_rss is not None:
+        print(f"Peak RSS           : {peak_rss:.1f} MB")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,83 @@
+"""
+Benchmark memori sesi user: layout dict lama vs Session/OrderDetails/OrderLine (__slots__)
+Menjalankan: python benchmarks/session_memory.py [jumlah_sesi]
+"""
+import os
+import sys
+import tracemalloc
+from datetime import datetime
+
+current_dir = os.path.dirname(os.path.abspath(__file__))
+project_root = os.path.dirname(current_dir)
+if project_root not in sys.path:
+    sys.path.append(project_root)
+
+from bot.user_context import Session, OrderLine, STATE_AWAITING_MORE_ITEMS
+from modules.menu_manager import get_menu, MENU_CATEGORIES
+
+DEFAULT_SESSION_COUNT = 100_000
+
+
+def _sample_items():
+    menu = get_menu()
+    items = [item for category in MENU_CATEGORIES for item in menu.get(category, [])]
+    return items[:2], items[2]
+
+
+def build_legacy_sessions(count, cart_items, inquired_item):
+    """Layout lama: dict bersarang, salinan item menu di setiap baris keranjang."""
+    sessions = {}
+    for user_id in range(count):
+        sessions[user_id] = {
+            'state': STATE_AWAITING_MORE_ITEMS,
+            'order_details': {
+                'items': [{'item_data': dict(item), 'quantity': 1} for item in cart_items],
+                'current_item_to_add_data': None,
+                'dining_option': None,
+                'takeout_type': None,
+                'payment_method': None,
+                'total_price': sum(item['harga'] for item in cart_items),
+                'order_id': None
+            },
+            'last_inquired_item_data': dict(inquired_item),
+            'timestamp': datetime.now()
+        }
+    return sessions
+
+
+def build_slotted_sessions(count, cart_items, inquired_item):
+    """Layout baru: objek __slots__, baris keranjang hanya menyimpan id + harga."""
+    sessions = {}
+    for user_id in range(count):
+        session = Session(STATE_AWAITING_MORE_ITEMS)
+        session.order.items = [OrderLine(item['id'], item['nama'], item['harga'], 1) for item in cart_items]
+        session.order.total_price = sum(item['harga'] for item in cart_items)
+        session.last_inquired_item_id = inquired_item['id']
+        sessions[user_id] = session
+    return sessions
+
+
+def measure(builder, count, cart_items, inquired_item):
+    tracemalloc.start()
+    sessions = builder(count, cart_items, inquired_item)
+    current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del sessions
+    return current
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else DEFAULT_SESSION_COUNT
+    cart_items, inquired_item = _sample_items()
+
+    legacy_bytes = measure(build_legacy_sessions, count, cart_items, inquired_item)
+    slotted_bytes = measure(build_slotted_sessions, count, cart_items, inquired_item)
+
+    print(f"Jumlah sesi       : {count:,} (2 baris keranjang + 1 item terakhir ditanyakan)")
+    print(f"Layout dict lama  : {legacy_bytes / 1024 / 1024:8.1f} MB ({legacy_bytes / count:6.0f} byte/sesi)")
+    print(f"Layout __slots__  : {slotted_bytes / 1024 / 1024:8.1f} MB ({slotted_bytes / count:6.0f} byte/sesi)")
+    print(f"Penghematan       : {(1 - slotted_bytes / legacy_bytes) * 100:8.1f} %")
+
+
+if __name__ == "__main__":
+    main()
@@ -7,10 +7,12 @@ from telegram import Update
 from telegram.ext import ContextTypes
 
 from bot.user_context import set_user_state, reset_order_details, STATE_GENERAL
+from bot.metrics import latency, is_admin
+from bot.nlp_cache import format_nlp_cache_report
 
 # Import modules yang diperlukan
 try:
-    from modules.menu_manager import get_menu, get_info_pemesanan
+    from modules.menu_manager import get_menu, get_info_pemesanan, get_menu_version, get_category_version
 except ImportError as e:
     print(f"Gagal mengimpor modules: {e}")
 
@@ -32,7 +34,70 @@ async def start_command(update: Update, context: ContextTypes.DEFAULT_TYPE) -> N
         rf"Halo {user.mention_html()}! Selamat datang di Bot Mata Kopian. Ada yang bisa saya bantu? "
         "Anda bisa tanya tentang menu, harga, atau cara pemesanan.",
     )
-    logger.info(f"User {user_id} ({user.first_name}) memulai bot dengan /start")
+    logger.info("User %s (%s) memulai bot dengan /start", user_id, user.first_name)
+
+# Mapping kategori dengan emoji dan nama yang user-friendly
+MENU_CATEGORY_DISPLAY = {
+    "es_kopi": {"name": "Es Kopi", "emoji": "☕"},
+    "non_kopi": {"name": "Non Kopi", "emoji": "🍵"},
+    "espresso_based": {"name": "Espresso Based", "emoji": "🫕"},
+    "refreshment": {"name": "Refreshment", "emoji": "🍸"},
+    "others": {"name": "Others", "emoji": "🥤"},
+    "pastry": {"name": "Pastry", "emoji": "🥐"}
+}
+
+# Cache teks menu yang sudah dirender, keyed by versi menu / versi kategori
+_rendered_menu_cache = {"version": None, "text": None}
+_menu_fragment_cache = {} # category_key -> (versi kategori, teks fragmen)
+
+def _render_category(category_info, items):
+    """Render satu kategori menu ke Markdown."""
+    parts = [f"*{category_info['name']}* {category_info['emoji']}:\n"]
+    if items:
+        for item in items:
+            nama = item.get('nama', 'N/A')
+            harga = item.get('harga', 0)
+            deskripsi = item.get('deskripsi', '')
+            
+            # Format item dengan harga
+            parts.append(f"• {nama}: Rp{harga:,}")
+            
+            # Tambahkan deskripsi jika ada (untuk informasi lengkap)
+            if deskripsi:
+                parts.append(f"\n  _{deskripsi}_")
+            parts.append("\n")
+    else:
+        parts.append(f"_Belum ada menu {category_info['name'].lower()}._\n")
+    parts.append("\n")
+    return "".join(parts)
+
+def render_menu_text():
+    """
+    Mengembalikan teks /menu lengkap dari cache.
+    Hanya dirender ulang jika versi menu berubah, dan hanya kategori yang berubah
+    yang dirender ulang fragmennya.
+    """
+    menu_version = get_menu_version()
+    if _rendered_menu_cache["version"] == menu_version:
+        return _rendered_menu_cache["text"]
+
+    menu = get_menu()
+    parts = ["☕ *Menu Mata Kopian* ☕\n\n"]
+    for category_key, category_info in MENU_CATEGORY_DISPLAY.items():
+        category_version = get_category_version(category_key)
+        cached_fragment = _menu_fragment_cache.get(category_key)
+        if cached_fragment is None or cached_fragment[0] != category_version:
+            cached_fragment = (category_version, _render_category(category_info, menu.get(category_key, [])))
+            _menu_fragment_cache[category_key] = cached_fragment
+        parts.append(cached_fragment[1])
+
+    # Tambahkan info pemesanan di akhir
+    parts.append(f"*Info Pemesanan* ℹ️:\n{get_info_pemesanan()}")
+
+    text = "".join(parts)
+    _rendered_menu_cache["version"] = menu_version
+    _rendered_menu_cache["text"] = text
+    return text
 
 async def menu_command(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
     """
@@ -40,45 +105,25 @@ async def menu_command(update: Update, context: ContextTypes.DEFAULT_TYPE) -> No
     Menampilkan daftar menu lengkap dengan kategorisasi
     """
     user_id = update.effective_user.id
-    logger.info(f"User {user_id} meminta menu dengan /menu")
+    logger.info("User %s meminta menu dengan /menu", user_id)
     
-    menu = get_menu(force_reload=True)
-    response = "☕ *Menu Mata Kopian* ☕\n\n"
-    
-    # Mapping kategori dengan emoji dan nama yang user-friendly
-    categories = {
-        "es_kopi": {"name": "Es Kopi", "emoji": "☕"},
-        "non_kopi": {"name": "Non Kopi", "emoji": "🍵"},
-        "espresso_based": {"name": "Espresso Based", "emoji": "🫕"},
-        "refreshment": {"name": "Refreshment", "emoji": "🍸"},
-        "others": {"name": "Others", "emoji": "🥤"},
-        "pastry": {"name": "Pastry", "emoji": "🥐"}
-    }
-    
-    # Tampilkan setiap kategori
-    for category_key, category_info in categories.items():
-        items = menu.get(category_key, [])
-        response += f"*{category_info['name']}* {category_info['emoji']}:\n"
-        
-        if items:
-            for item in items:
-                nama = item.get('nama', 'N/A')
-                harga = item.get('harga', 0)
-                deskripsi = item.get('deskripsi', '')
-                
-                # Format item dengan harga
-                response += f"• {nama}: Rp{harga:,}"
-                
-                # Tambahkan deskripsi jika ada (untuk informasi lengkap)
-                if deskripsi:
-                    response += f"\n  _{deskripsi}_"
-                response += "\n"
-        else:
-            response += f"_Belum ada menu {category_info['name'].lower()}._\n"
-        
-        response += "\n"
-    
-    # Tambahkan info pemesanan di akhir
-    response += f"*Info Pemesanan* ℹ️:\n{get_info_pemesanan(force_reload=True)}"
+    # Perubahan dari dashboard sudah ditangani watcher menu (lihat telegram_bot.main)
+    response = render_menu_text()
     
     await update.message.reply_text(response, parse_mode='Markdown')
+
+async def metrics_command(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+    """
+    Handler untuk command /metrics (khusus admin, lihat BOT_ADMIN_IDS)
+    Menampilkan persentil latency per tahap pemrosesan pesan dan statistik cache NLP
+    """
+    user_id = update.effective_user.id
+    if not is_admin(user_id):
+        logger.warning("User %s mencoba /metrics tanpa akses admin", user_id)
+        return
+
+    report = f"{latency.format_report()}\n\n{format_nlp_cache_report()}"
+    # Batas panjang pesan Telegram 4096 karakter
+    if len(report) > 4000:
+        report = report[:4000] + "\n..."
+    await update.message.reply_text(report)
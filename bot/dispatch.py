@@ -0,0 +1,56 @@
+"""
+Module untuk dispatch update secara concurrent dengan urutan per user
+Update dari user berbeda boleh diproses paralel, update dari user yang sama
+diproses berurutan agar state percakapan (user_context) tidak saling tumpang tindih
+"""
+import asyncio
+import functools
+import logging
+import os
+
+logger = logging.getLogger(__name__)
+
+# Batas jumlah update yang diproses bersamaan oleh Application (1 = berurutan seperti dulu)
+CONCURRENT_UPDATES = max(1, int(os.environ.get("BOT_CONCURRENT_UPDATES", "32")))
+
+
+class PerUserLocks:
+    """
+    Lock asyncio per user, dibuat saat dibutuhkan dan dibuang saat tidak ada lagi
+    update yang menunggu, sehingga jumlah lock tidak tumbuh bersama jumlah user.
+    asyncio.Lock bersifat FIFO, jadi urutan pesan dari satu user tetap terjaga.
+    """
+
+    def __init__(self):
+        self._locks = {} # user_id -> [lock, jumlah pemakai]
+
+    def __len__(self):
+        return len(self._locks)
+
+    async def run(self, user_id, coroutine_function, *args, **kwargs):
+        entry = self._locks.get(user_id)
+        if entry is None:
+            entry = [asyncio.Lock(), 0]
+            self._locks[user_id] = entry
+        entry[1] += 1
+        try:
+            async with entry[0]:
+                return await coroutine_function(*args, **kwargs)
+        finally:
+            entry[1] -= 1
+            if entry[1] == 0:
+                del self._locks[user_id]
+
+
+user_locks = PerUserLocks()
+
+
+def serialize_per_user(handler):
+    """Decorator handler PTB: serialisasi per effective_user, paralel antar user."""
+    @functools.wraps(handler)
+    async def wrapper(update, context):
+        user = getattr(update, "effective_user", None)
+        if user is None:
+            return await handler(update, context)
+        return await user_locks.run(user.id, handler, update, context)
+    return wrapper
@@ -0,0 +1,202 @@
+"""
+Module classifier intent opsional: TF-IDF n-gram karakter + regresi logistik (softmax)
+Dilatih dari INTENT_KEYWORDS ditambah contoh pesan berlabel (data/intent_examples.jsonl),
+disimpan sebagai artifact .npz kecil dan dimuat saat startup. Biaya prediksi hanya
+bergantung pada panjang pesan, bukan jumlah frasa training.
+
+Melatih ulang model (jalankan setiap INTENT_KEYWORDS atau contoh berlabel berubah):
+    python -m bot.intent_classifier [--examples data/intent_examples.jsonl] [--output data/intent_model.npz]
+"""
+import argparse
+import hashlib
+import json
+import math
+import os
+import sys
+
+import numpy as np
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+INTENT_MODEL_PATH = os.environ.get("BOT_INTENT_MODEL", os.path.join(BASE_DIR, 'data', 'intent_model.npz'))
+INTENT_EXAMPLES_PATH = os.path.join(BASE_DIR, 'data', 'intent_examples.jsonl')
+NGRAM_RANGE = (2, 4)
+NO_INTENT_LABEL = "none" # Label contoh pesan yang bukan intent apa pun
+
+
+def keyword_table_hash(intent_keywords):
+    """Hash tabel keyword; model yang dilatih dari tabel lama tidak dipakai."""
+    table = {intent: list(keywords) for intent, keywords in intent_keywords.items()}
+    return hashlib.sha1(json.dumps(table, sort_keys=True).encode('utf-8')).hexdigest()
+
+
+def char_ngram_counts(processed_text, ngram_range=NGRAM_RANGE):
+    """Hitungan n-gram karakter; spasi di awal/akhir menandai batas kata."""
+    padded = f" {processed_text} "
+    counts = {}
+    for size in range(ngram_range[0], ngram_range[1] + 1):
+        for i in range(len(padded) - size + 1):
+            gram = padded[i:i + size]
+            counts[gram] = counts.get(gram, 0) + 1
+    return counts
+
+
+def _softmax(logits):
+    shifted = logits - logits.max(axis=-1, keepdims=True)
+    exp = np.exp(shifted)
+    return exp / exp.sum(axis=-1, keepdims=True)
+
+
+class IntentClassifier:
+    def __init__(self, vocabulary, idf, weights, bias, labels, keyword_hash=""):
+        self.vocabulary = {gram: index for index, gram in enumerate(vocabulary)}
+        self.idf = idf
+        self.weights = weights # (jumlah fitur, jumlah label)
+        self.bias = bias
+        self.labels = list(labels)
+        self.keyword_hash = keyword_hash
+
+    def _vectorize(self, processed_text):
+        """Vektor TF-IDF sparse (indeks, nilai) yang sudah dinormalisasi L2."""
+        indices = []
+        term_frequencies = []
+        for gram, count in char_ngram_counts(processed_text).items():
+            index = self.vocabulary.get(gram)
+            if index is not None:
+                indices.append(index)
+                term_frequencies.append(1.0 + math.log(count))
+        indices = np.array(indices, dtype=np.int32)
+        values = np.array(term_frequencies, dtype=np.float32) * self.idf[indices]
+        norm = np.sqrt(values @ values)
+        if norm > 0:
+            values /= norm
+        return indices, values
+
+    def predict_proba(self, processed_text):
+        indices, values = self._vectorize(processed_text)
+        if not len(indices):
+            return None
+        return _softmax(values @ self.weights[indices] + self.bias)
+
+    def predict(self, processed_text):
+        """Returns: (label, confidence); label None untuk kelas 'none' atau teks tanpa fitur dikenal."""
+        probabilities = self.predict_proba(processed_text)
+        if probabilities is None:
+            return None, 0.0
+        best = int(np.argmax(probabilities))
+        label = self.labels[best]
+        return (None if label == NO_INTENT_LABEL else label), float(probabilities[best])
+
+    @classmethod
+    def train(cls, texts, labels, keyword_hash="", epochs=400, learning_rate=2.0, l2=1e-4):
+        """Melatih dari teks yang sudah di-preprocess. Full-batch gradient descent pada matriks CSR."""
+        label_names = sorted(set(labels))
+        label_ids = np.array([label_names.index(label) for label in labels])
+
+        vocabulary = {}
+        rows = [char_ngram_counts(text) for text in texts]
+        for counts in rows:
+            for gram in counts:
+                vocabulary.setdefault(gram, len(vocabulary))
+
+        # CSR: indptr/indices/data
+        indptr = [0]
+        indices = []
+        data = []
+        for counts in rows:
+            for gram, count in counts.items():
+                indices.append(vocabulary[gram])
+                data.append(1.0 + math.log(count))
+            indptr.append(len(indices))
+        indptr = np.array(indptr)
+        indices = np.array(indices, dtype=np.int32)
+        data = np.array(data, dtype=np.float32)
+        row_ids = np.repeat(np.arange(len(rows)), np.diff(indptr))
+
+        document_frequency = np.bincount(indices, minlength=len(vocabulary))
+        idf = (np.log((1 + len(rows)) / (1 + document_frequency)) + 1).astype(np.float32)
+        data *= idf[indices]
+        row_norms = np.sqrt(np.bincount(row_ids, weights=data * data, minlength=len(rows)))
+        data /= row_norms[row_ids].astype(np.float32)
+
+        sample_count, feature_count, label_count = len(rows), len(vocabulary), len(label_names)
+        targets = np.zeros((sample_count, label_count), dtype=np.float32)
+        targets[np.arange(sample_count), label_ids] = 1.0
+        weights = np.zeros((feature_count, label_count), dtype=np.float32)
+        bias = np.zeros(label_count, dtype=np.float32)
+
+        for _ in range(epochs):
+            logits = np.zeros((sample_count, label_count), dtype=np.float32)
+            np.add.at(logits, row_ids, data[:, None] * weights[indices])
+            error = (_softmax(logits + bias) - targets) / sample_count
+            gradient = l2 * weights
+            np.add.at(gradient, indices, data[:, None] * error[row_ids])
+            weights -= learning_rate * gradient
+            bias -= learning_rate * error.sum(axis=0)
+
+        ordered_vocabulary = sorted(vocabulary, key=vocabulary.get)
+        return cls(ordered_vocabulary, idf, weights, bias, label_names, keyword_hash)
+
+    def save(self, path):
+        ordered_vocabulary = sorted(self.vocabulary, key=self.vocabulary.get)
+        np.savez_compressed(
+            path,
+            vocabulary=np.array("\x00".join(ordered_vocabulary)),
+            idf=self.idf, weights=self.weights.astype(np.float16), bias=self.bias,
+            labels=np.array(self.labels), keyword_hash=np.array(self.keyword_hash)
+        )
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path) as artifact:
+            return cls(
+                str(artifact["vocabulary"]).split("\x00"), artifact["idf"],
+                artifact["weights"].astype(np.float32), artifact["bias"],
+                [str(label) for label in artifact["labels"]], str(artifact["keyword_hash"])
+            )
+
+
+def load_training_data(intent_keywords, examples_path=INTENT_EXAMPLES_PATH):
+    """Frasa INTENT_KEYWORDS (satu frasa = satu contoh) ditambah pesan berlabel dari file JSONL."""
+    from modules.menu_index import normalize_text
+
+    texts, labels = [], []
+    for intent, keywords in intent_keywords.items():
+        for keyword in keywords:
+            texts.append(normalize_text(keyword))
+            labels.append(intent)
+    if examples_path and os.path.exists(examples_path):
+        with open(examples_path, 'r', encoding='utf-8') as f:
+            for line in f:
+                if line.strip():
+                    example = json.loads(line)
+                    texts.append(normalize_text(example["text"]))
+                    labels.append(example["intent"])
+    return texts, labels
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Melatih classifier intent TF-IDF")
+    parser.add_argument("--examples", default=INTENT_EXAMPLES_PATH, help="File JSONL {\"text\", \"intent\"}")
+    parser.add_argument("--output", default=INTENT_MODEL_PATH)
+    parser.add_argument("--epochs", type=int, default=400)
+    args = parser.parse_args()
+
+    project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    if project_root not in sys.path:
+        sys.path.append(project_root)
+    from bot.nlp_utils import INTENT_KEYWORDS
+
+    texts, labels = load_training_data(INTENT_KEYWORDS, args.examples)
+    classifier = IntentClassifier.train(texts, labels, keyword_table_hash(INTENT_KEYWORDS), epochs=args.epochs)
+    correct = sum(
+        1 for text, label in zip(texts, labels)
+        if (classifier.predict(text)[0] or NO_INTENT_LABEL) == label
+    )
+    classifier.save(args.output)
+    print(f"{len(texts)} contoh, {len(classifier.vocabulary)} fitur, {len(classifier.labels)} label")
+    print(f"Akurasi training: {correct / len(texts):.1%}")
+    print(f"Model disimpan ke {args.output} ({os.path.getsize(args.output) / 1024:.1f} KB)")
+
+
+if __name__ == "__main__":
+    main()
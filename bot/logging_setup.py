@@ -0,0 +1,106 @@
+"""
+Module konfigurasi logging bot
+Handler ditulis dari thread background (QueueHandler/QueueListener) sehingga I/O log
+tidak memblokir event loop, dan log INFO/DEBUG per pesan dibatasi per template agar
+tidak membanjiri output saat trafik tinggi
+"""
+import atexit
+import logging
+import os
+import queue
+from collections import OrderedDict
+from logging.handlers import QueueHandler, QueueListener
+
+LOG_FORMAT = "%(asctime)s - %(name)s - %(levelname)s - %(message)s"
+LOG_LEVEL = os.environ.get("BOT_LOG_LEVEL", "INFO").upper()
+LOG_QUEUE_ENABLED = os.environ.get("BOT_LOG_QUEUE", "1") != "0"
+# Maksimum log per detik untuk setiap template pesan INFO/DEBUG (0 = tanpa batas)
+LOG_RATE_LIMIT = float(os.environ.get("BOT_LOG_RATE_LIMIT", "20"))
+# Jumlah template yang dilacak rate limiter; template yang paling lama tidak muncul dibuang
+LOG_RATE_LIMIT_MAX_KEYS = 1024
+# Logger milik bot; argumen log-nya aman diformat belakangan di thread listener
+OWN_LOGGER_ROOTS = frozenset({"bot", "modules", "benchmarks", "__main__"})
+
+
+class LazyQueueHandler(QueueHandler):
+    """
+    QueueHandler yang tidak memformat record milik bot di thread pemanggil.
+    QueueHandler bawaan memanggil format() di prepare(); di sini formatting
+    (termasuk argumen %-style) record dari logger bot dikerjakan oleh thread
+    QueueListener, karena argumen log di bot berupa nilai immutable (id, string, angka).
+    Record dari library lain bisa membawa objek mutable di args, jadi pesannya
+    diformat dulu (getMessage) sebelum masuk queue.
+    """
+
+    def prepare(self, record):
+        if record.name.split(".", 1)[0] in OWN_LOGGER_ROOTS or not record.args:
+            return record
+        record.msg = record.getMessage()
+        record.args = None
+        return record
+
+
+class RateLimitFilter(logging.Filter):
+    """
+    Token bucket per (logger, template pesan) untuk record INFO ke bawah.
+    WARNING ke atas selalu lolos. Jumlah record yang dibuang dilaporkan di
+    record berikutnya yang lolos dengan template yang sama. Jumlah bucket dibatasi
+    max_keys (LRU), jadi template yang tidak konstan tidak membuat map tumbuh terus.
+    """
+
+    def __init__(self, rate_per_second, burst=None, max_keys=LOG_RATE_LIMIT_MAX_KEYS):
+        super().__init__()
+        self.rate = rate_per_second
+        self.burst = burst if burst is not None else max(1.0, rate_per_second)
+        self.max_keys = max_keys
+        self._buckets = OrderedDict() # (logger, template) -> [token, waktu terakhir, jumlah dibuang]
+
+    def filter(self, record):
+        if record.levelno > logging.INFO:
+            return True
+        key = (record.name, record.msg)
+        bucket = self._buckets.get(key)
+        if bucket is None:
+            bucket = self._buckets[key] = [self.burst, record.created, 0]
+            if len(self._buckets) > self.max_keys:
+                self._buckets.popitem(last=False)
+        else:
+            self._buckets.move_to_end(key)
+
+        tokens = min(self.burst, bucket[0] + (record.created - bucket[1]) * self.rate)
+        bucket[1] = record.created
+        if tokens < 1:
+            bucket[0] = tokens
+            bucket[2] += 1
+            return False
+
+        bucket[0] = tokens - 1
+        if bucket[2]:
+            record.msg = f"{record.msg} (+{bucket[2]} log serupa dilewati)"
+            bucket[2] = 0
+        return True
+
+
+def setup_logging(level=LOG_LEVEL, queued=LOG_QUEUE_ENABLED, rate_limit=LOG_RATE_LIMIT):
+    """
+    Mengatur root logger. Returns: QueueListener yang berjalan (atau None jika
+    logging langsung ke stderr tanpa queue).
+    """
+    stream_handler = logging.StreamHandler()
+    stream_handler.setFormatter(logging.Formatter(LOG_FORMAT))
+
+    listener = None
+    handler = stream_handler
+    if queued:
+        log_queue = queue.SimpleQueue()
+        handler = LazyQueueHandler(log_queue)
+        listener = QueueListener(log_queue, stream_handler, respect_handler_level=True)
+        listener.start()
+        # Pastikan log yang masih di queue tertulis sebelum proses keluar
+        atexit.register(listener.stop)
+
+    if rate_limit > 0:
+        handler.addFilter(RateLimitFilter(rate_limit))
+
+    logging.basicConfig(level=level, handlers=[handler], force=True)
+    return listener
@@ -6,31 +6,33 @@ import logging
 from datetime import datetime, timedelta
 
 from bot.user_context import *
+from bot.metrics import latency
 
-# Import NLP utilities dan modules
+# Import modules
 try:
-    from bot.nlp_utils import recognize_intent, extract_entities_item_name, extract_quantity, preprocess_text
     from modules.menu_manager import get_info_pemesanan
+    from modules.order_ledger import order_ledger, order_record
 except ImportError as e:
     print(f"Gagal mengimpor dependencies: {e}")
 
 logger = logging.getLogger(__name__)
 
-async def handle_quantity_input(update, user_id, user_first_name, text):
+@latency.timed("handler")
+async def handle_quantity_input(update, user_id, user_first_name, nlu):
     """
     Handler untuk input quantity saat STATE_AWAITING_QUANTITY
     """
-    order_details = get_order_details(user_id)
-    item_to_add_data = order_details.get('current_item_to_add_data') if order_details else None
+    item_to_add_data = get_current_item_to_add(user_id)
 
     if not item_to_add_data:
-        logger.warning(f"User {user_id} di state AWAITING_QUANTITY tapi 'current_item_to_add_data' kosong.")
+        logger.warning("User %s di state AWAITING_QUANTITY tapi tidak ada item yang menunggu kuantitas.", user_id)
         set_user_state(user_id, STATE_GENERAL)
         reset_order_details(user_id)
         await update.message.reply_text("Maaf, sepertinya ada yang salah. Bisa sebutkan lagi item yang mau dipesan?")
         return
 
-    qty = extract_quantity(text)
+    with latency.span("extract_quantity"):
+        qty = nlu.quantity
     if qty and qty > 0:
         if not add_item_to_current_order(user_id, qty):
              set_user_state(user_id, STATE_GENERAL)
@@ -39,11 +41,9 @@ async def handle_quantity_input(update, user_id, user_first_name, text):
              return
 
         order_details = get_order_details(user_id)
-        current_total = order_details.get('total_price', 0)
+        current_total = order_details.total_price
         
-        item_names_in_order = []
-        if order_details.get('items'):
-            item_names_in_order = [f"{item['quantity']} {item['item_data']['nama']}" for item in order_details['items']]
+        item_names_in_order = [f"{line.quantity} {line.nama}" for line in order_details.items]
         order_summary = ", ".join(item_names_in_order) if item_names_in_order else "Belum ada item"
 
         set_user_state(user_id, STATE_AWAITING_MORE_ITEMS)
@@ -55,32 +55,32 @@ async def handle_quantity_input(update, user_id, user_first_name, text):
     else:
         await update.message.reply_text(f"Jumlah tidak valid, {user_first_name}. Mau pesan berapa banyak untuk {item_to_add_data['nama']}?")
 
-async def handle_dining_option_input(update, user_id, text):
+@latency.timed("handler")
+async def handle_dining_option_input(update, user_id, nlu):
     """
     Handler untuk input dining option (dine-in/takeaway)
     """
     order_details = get_order_details(user_id)
-    if not order_details or not order_details.get('items'):
-        logger.warning(f"User {user_id} di state AWAITING_DINING_OPTION tapi tidak ada item di pesanan.")
+    if not order_details or not order_details.items:
+        logger.warning("User %s di state AWAITING_DINING_OPTION tapi tidak ada item di pesanan.", user_id)
         set_user_state(user_id, STATE_GENERAL)
         reset_order_details(user_id)
         await update.message.reply_text("Maaf, terjadi kesalahan pada pesanan Anda. Bisa dimulai lagi?")
         return
 
-    processed_text = preprocess_text(text)
     DINE_IN_KEYWORDS = ["dinikmati di tempat", "makan di tempat", "di tempat", "dine in", "disini", "di sini"]
     TAKEAWAY_KEYWORDS = ["bungkus", "dibungkus", "take away", "takeaway", "bawa pulang"]
 
     chosen_dining_option = None
-    if any(keyword in processed_text for keyword in DINE_IN_KEYWORDS):
+    if nlu.contains_any(DINE_IN_KEYWORDS):
         chosen_dining_option = "dine_in"
-    elif any(keyword in processed_text for keyword in TAKEAWAY_KEYWORDS):
+    elif nlu.contains_any(TAKEAWAY_KEYWORDS):
         chosen_dining_option = "takeaway"
     
     if chosen_dining_option:
         if user_id in user_contexts:
             update_order_field(user_id, 'dining_option', chosen_dining_option)
-            total_price = order_details.get('total_price', 0)
+            total_price = order_details.total_price
             
             if chosen_dining_option == "dine_in":
                 set_user_state(user_id, STATE_AWAITING_PAYMENT_METHOD)
@@ -100,26 +100,26 @@ async def handle_dining_option_input(update, user_id, text):
     else:
         await update.message.reply_text("Mohon pilih mau dinikmati di tempat atau dibungkus?")
 
-async def handle_takeout_type_input(update, user_id, text):
+@latency.timed("handler")
+async def handle_takeout_type_input(update, user_id, nlu):
     """
     Handler untuk input takeout type (pickup/delivery)
     """
     order_details = get_order_details(user_id)
-    if not order_details or order_details.get('dining_option') != 'takeaway':
-        logger.warning(f"User {user_id} di state AWAITING_TAKEOUT_TYPE tapi opsi dinikmati bukan takeaway atau tidak ada order.")
+    if not order_details or order_details.dining_option != 'takeaway':
+        logger.warning("User %s di state AWAITING_TAKEOUT_TYPE tapi opsi dinikmati bukan takeaway atau tidak ada order.", user_id)
         set_user_state(user_id, STATE_GENERAL)
         reset_order_details(user_id)
         await update.message.reply_text("Maaf, terjadi kesalahan. Proses pemesanan diulang.")
         return
 
-    processed_text = preprocess_text(text)
     PICKUP_KEYWORDS = ["ambil sendiri", "pickup", "self pickup", "diambil", "jemput"]
     DELIVERY_KEYWORDS = ["delivery", "diantar", "kirim", "anter"]
 
     chosen_takeout_type = None
-    if any(keyword in processed_text for keyword in PICKUP_KEYWORDS):
+    if nlu.contains_any(PICKUP_KEYWORDS):
         chosen_takeout_type = "pickup"
-    elif any(keyword in processed_text for keyword in DELIVERY_KEYWORDS):
+    elif nlu.contains_any(DELIVERY_KEYWORDS):
         chosen_takeout_type = "delivery"
 
     if chosen_takeout_type:
@@ -128,7 +128,7 @@ async def handle_takeout_type_input(update, user_id, text):
             
             if chosen_takeout_type == "pickup":
                 set_user_state(user_id, STATE_AWAITING_PAYMENT_METHOD)
-                total_price = order_details.get('total_price', 0)
+                total_price = order_details.total_price
                 await update.message.reply_text(
                     f"Oke, pesanan akan diambil sendiri. Totalnya tetap Rp{total_price:,}.\n\n"
                     "Silakan pilih metode pembayaran: E-Wallet atau Cash di Kasir?"
@@ -146,35 +146,42 @@ async def handle_takeout_type_input(update, user_id, text):
     else:
         await update.message.reply_text("Mohon pilih mau diambil sendiri atau delivery?")
 
-async def handle_payment_method_input(update, user_id, user_first_name, text):
+@latency.timed("handler")
+async def handle_payment_method_input(update, user_id, user_first_name, nlu):
     """
     Handler untuk input payment method dan finalisasi order
     """
     order_details = get_order_details(user_id)
-    if not order_details or not order_details.get('items'):
-        logger.warning(f"User {user_id} di state AWAITING_PAYMENT_METHOD tapi tidak ada item di pesanan.")
+    if not order_details or not order_details.items:
+        logger.warning("User %s di state AWAITING_PAYMENT_METHOD tapi tidak ada item di pesanan.", user_id)
         set_user_state(user_id, STATE_GENERAL)
         reset_order_details(user_id)
         await update.message.reply_text("Maaf, terjadi kesalahan pada pesanan Anda. Bisa dimulai lagi?")
         return
 
-    processed_text = preprocess_text(text)
     EWALLET_KEYWORDS = ["e-wallet", "wallet", "qris", "gopay", "ovo", "dana", "linkaja", "ewalet", "dompet digital"]
     CASH_KEYWORDS = ["cash", "kasir", "tunai", "kontan", "bayar di kasir"]
     
     chosen_payment_method = None
-    if any(keyword in processed_text for keyword in EWALLET_KEYWORDS):
+    if nlu.contains_any(EWALLET_KEYWORDS):
         chosen_payment_method = "E-Wallet"
-    elif any(keyword in processed_text for keyword in CASH_KEYWORDS):
+    elif nlu.contains_any(CASH_KEYWORDS):
         chosen_payment_method = "Cash"
 
     if chosen_payment_method:
         if user_id in user_contexts:
             update_order_field(user_id, 'payment_method', chosen_payment_method)
             
-            order_id = generate_order_id(user_id)
+            order_id = await generate_order_id(user_id)
             update_order_field(user_id, 'order_id', order_id)
             
+            # Catat ke ledger (hanya antrian di memori; ditulis ke disk oleh flusher background)
+            order_ledger.append(order_record(
+                order_id, user_id, [line.to_dict() for line in order_details.items],
+                order_details.total_price, order_details.dining_option,
+                order_details.takeout_type, chosen_payment_method
+            ))
+
             # Generate receipt
             receipt_message = await generate_receipt(order_details, order_id, chosen_payment_method, user_first_name)
             await update.message.reply_text(receipt_message, parse_mode='Markdown')
@@ -192,11 +199,11 @@ async def generate_receipt(order_details, order_id, payment_method, user_first_n
     """
     Generate receipt text untuk pesanan yang sudah selesai
     """
-    total_price = order_details.get('total_price', 0)
-    dining_option = order_details.get('dining_option')
-    takeout_type = order_details.get('takeout_type')
+    total_price = order_details.total_price
+    dining_option = order_details.dining_option
+    takeout_type = order_details.takeout_type
 
-    item_summary_list = [f"{item['quantity']}x {item['item_data']['nama']}" for item in order_details.get('items', [])]
+    item_summary_list = [f"{line.quantity}x {line.nama}" for line in order_details.items]
     item_summary_text = "\n- ".join(item_summary_list) if item_summary_list else "Tidak ada item"
     
     receipt_text = (
@@ -233,7 +240,8 @@ async def generate_receipt(order_details, order_id, payment_method, user_first_n
     
     return final_message
 
-async def handle_general_intent(update, user_id, user_first_name, text):
+@latency.timed("handler")
+async def handle_general_intent(update, user_id, user_first_name, nlu):
     """
     Handler untuk intent di state GENERAL (menu, harga, pemesanan, dll)
     """
@@ -241,15 +249,18 @@ async def handle_general_intent(update, user_id, user_first_name, text):
     if user_id not in user_contexts:
         set_user_state(user_id, STATE_GENERAL)
 
-    intent, score = recognize_intent(text)
-    logger.info(f"Intent terdeteksi (State GENERAL): {intent} (Skor: {score})")
+    with latency.span("recognize_intent") as span:
+        intent = nlu.intent
+        span.label = intent
+    logger.info("Intent terdeteksi (State GENERAL): %s (Skor: %s)", intent, nlu.intent_score)
 
     if intent == "lihat_menu":
         from bot.commands import menu_command
         await menu_command(update, None)
     
     elif intent == "tanya_harga":
-        item_data = extract_entities_item_name(text)
+        with latency.span("extract_entities", intent):
+            item_data = nlu.item
         if item_data:
             set_last_inquired_item(user_id, item_data)
             await update.message.reply_text(
@@ -263,15 +274,16 @@ async def handle_general_intent(update, user_id, user_first_name, text):
             
     elif intent == "info_pemesanan": 
         item_to_order = None
-        explicit_item_data = extract_entities_item_name(text)
+        with latency.span("extract_entities", intent):
+            explicit_item_data = nlu.item
         
         if explicit_item_data:
             item_to_order = explicit_item_data
-            logger.info(f"User {user_id} mau pesan item eksplisit: {item_to_order['nama']}")
-        elif any(keyword in text.lower() for keyword in REFERENTIAL_KEYWORDS + ["pesan", "order", "mau itu", "beli itu"]):
+            logger.info("User %s mau pesan item eksplisit: %s", user_id, item_to_order['nama'])
+        elif nlu.contains_any(REFERENTIAL_KEYWORDS + ["pesan", "order", "mau itu", "beli itu"]):
             item_to_order = get_last_inquired_item(user_id)
             if item_to_order:
-                logger.info(f"User {user_id} mau pesan item dari konteks: {item_to_order['nama']}")
+                logger.info("User %s mau pesan item dari konteks: %s", user_id, item_to_order['nama'])
         
         if item_to_order:
             set_user_state(user_id, STATE_AWAITING_QUANTITY) 
@@ -280,7 +292,7 @@ async def handle_general_intent(update, user_id, user_first_name, text):
         else:
             await update.message.reply_text(
                 f"Anda mau pesan apa, {user_first_name}? Sebutkan nama itemnya atau lihat /menu dulu. "
-                f"Info pemesanan umum: {get_info_pemesanan(force_reload=True)}"
+                f"Info pemesanan umum: {get_info_pemesanan()}"
             )
         
     elif intent == "sapaan":
@@ -295,7 +307,7 @@ async def handle_general_intent(update, user_id, user_first_name, text):
             "cek harga, dan memproses pesanan."
         )
     elif intent == "konfirmasi_tidak":
-        if user_id in user_contexts and user_contexts[user_id].get('state', STATE_GENERAL) != STATE_GENERAL:
+        if user_id in user_contexts and user_contexts[user_id].state != STATE_GENERAL:
             set_user_state(user_id, STATE_GENERAL)
             reset_order_details(user_id)
             await update.message.reply_text("Baik, pesanan saat ini dibatalkan. Ada lagi yang bisa dibantu?")
@@ -309,6 +321,7 @@ async def handle_general_intent(update, user_id, user_first_name, text):
             "Ketik /menu untuk melihat daftar menu lengkap."
         )
 
+@latency.timed("handler")
 async def handle_invalid_state_input(update, current_user_state):
     """
     Handler untuk input yang tidak sesuai dengan state saat ini
@@ -325,27 +338,26 @@ async def handle_invalid_state_input(update, current_user_state):
     elif current_user_state == STATE_AWAITING_QUANTITY:
         await update.message.reply_text("Mohon masukkan jumlah item yang ingin dipesan (angka).")
 
-async def handle_more_items_input(update, user_id, user_first_name, text):
+@latency.timed("handler")
+async def handle_more_items_input(update, user_id, user_first_name, nlu):
     """
     Handler untuk input saat STATE_AWAITING_MORE_ITEMS
     User bisa menambah item lain atau selesai untuk lanjut pembayaran
     """
-    processed_text = text.lower().strip()
-    
     # Keywords untuk menyelesaikan pemesanan
     FINISH_KEYWORDS = ["selesai", "tidak", "enggak", "nggak", "cukup", "lanjut", "bayar", "checkout"]
     
-    if any(keyword in processed_text for keyword in FINISH_KEYWORDS):
+    if nlu.contains_any(FINISH_KEYWORDS):
         # User selesai memesan, lanjut ke dining option
         order_details = get_order_details(user_id)
-        if not order_details or not order_details.get('items'):
+        if not order_details or not order_details.items:
             set_user_state(user_id, STATE_GENERAL)
             reset_order_details(user_id)
             await update.message.reply_text("Maaf, tidak ada item dalam pesanan. Silakan mulai memesan lagi.")
             return
             
-        current_total = order_details.get('total_price', 0)
-        item_names_in_order = [f"{item['quantity']} {item['item_data']['nama']}" for item in order_details['items']]
+        current_total = order_details.total_price
+        item_names_in_order = [f"{line.quantity} {line.nama}" for line in order_details.items]
         order_summary = ", ".join(item_names_in_order)
         
         set_user_state(user_id, STATE_AWAITING_DINING_OPTION)
@@ -357,7 +369,8 @@ async def handle_more_items_input(update, user_id, user_first_name, text):
         return
     
     # User ingin menambah item lain - coba extract nama item
-    item_data = extract_entities_item_name(text)
+    with latency.span("extract_entities", STATE_AWAITING_MORE_ITEMS):
+        item_data = nlu.item
     if item_data:
         set_user_state(user_id, STATE_AWAITING_QUANTITY)
         set_current_item_to_add(user_id, item_data)
@@ -365,6 +378,6 @@ async def handle_more_items_input(update, user_id, user_first_name, text):
     else:
         # Item tidak ditemukan, minta input yang lebih spesifik
         await update.message.reply_text(
-            f"Maaf {user_first_name}, saya tidak menemukan menu '{text}'. "
+            f"Maaf {user_first_name}, saya tidak menemukan menu '{nlu.text}'. "
             "Coba sebutkan nama menu yang lebih spesifik, lihat /menu, atau ketik 'selesai' jika sudah cukup."
         )
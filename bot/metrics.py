@@ -0,0 +1,170 @@
+"""
+Module untuk mengukur latency per tahap pemrosesan pesan
+Setiap tahap (get_user_state, recognize_intent, ekstraksi entitas, handler, request ke Telegram)
+dicatat ke histogram dengan bucket tetap, dikelompokkan per (tahap, label) di mana label
+berisi state atau intent. Jika BOT_METRICS=0, span dan decorator menjadi no-op.
+"""
+import bisect
+import functools
+import inspect
+import logging
+import os
+import time
+
+from telegram.request import HTTPXRequest
+
+logger = logging.getLogger(__name__)
+
+METRICS_ENABLED = os.environ.get("BOT_METRICS", "1") != "0"
+ADMIN_USER_IDS = {
+    int(user_id) for user_id in os.environ.get("BOT_ADMIN_IDS", "").split(",") if user_id.strip().isdigit()
+}
+
+# Batas atas bucket dalam milidetik; nilai di atas bucket terakhir masuk bucket overflow
+BUCKET_BOUNDS_MS = (
+    0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000
+)
+
+
+class LatencyHistogram:
+    """Histogram bucket tetap; observe O(log jumlah bucket), memori konstan."""
+
+    __slots__ = ("counts", "count", "total_ms", "max_ms")
+
+    def __init__(self):
+        self.counts = [0] * (len(BUCKET_BOUNDS_MS) + 1)
+        self.count = 0
+        self.total_ms = 0.0
+        self.max_ms = 0.0
+
+    def observe(self, elapsed_ms):
+        self.counts[bisect.bisect_left(BUCKET_BOUNDS_MS, elapsed_ms)] += 1
+        self.count += 1
+        self.total_ms += elapsed_ms
+        if elapsed_ms > self.max_ms:
+            self.max_ms = elapsed_ms
+
+    def percentile(self, percent):
+        """Perkiraan persentil: batas atas bucket tempat persentil tersebut jatuh."""
+        if not self.count:
+            return 0.0
+        target = percent / 100 * self.count
+        cumulative = 0
+        for index, bucket_count in enumerate(self.counts):
+            cumulative += bucket_count
+            if cumulative >= target:
+                return BUCKET_BOUNDS_MS[index] if index < len(BUCKET_BOUNDS_MS) else self.max_ms
+        return self.max_ms
+
+
+class _Span:
+    __slots__ = ("recorder", "stage", "label", "started")
+
+    def __init__(self, recorder, stage, label):
+        self.recorder = recorder
+        self.stage = stage
+        self.label = label # Boleh diubah di dalam blok, misalnya setelah intent diketahui
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.recorder.observe(self.stage, self.label, (time.perf_counter() - self.started) * 1000)
+        return False
+
+
+class _NullSpan:
+    """Span no-op untuk saat metrics dimatikan; satu instance dipakai bersama."""
+
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        return False
+
+    def __setattr__(self, name, value):
+        pass
+
+
+_NULL_SPAN = _NullSpan()
+
+
+class LatencyRecorder:
+    def __init__(self, enabled=METRICS_ENABLED):
+        self.enabled = enabled
+        self._histograms = {} # (stage, label) -> LatencyHistogram
+        self._started_at = time.time()
+
+    def observe(self, stage, label, elapsed_ms):
+        key = (stage, label)
+        histogram = self._histograms.get(key)
+        if histogram is None:
+            histogram = self._histograms[key] = LatencyHistogram()
+        histogram.observe(elapsed_ms)
+
+    def span(self, stage, label=""):
+        """Context manager untuk mengukur satu tahap."""
+        if not self.enabled:
+            return _NULL_SPAN
+        return _Span(self, stage, label)
+
+    def timed(self, stage, label=None):
+        """Decorator (fungsi biasa atau coroutine); label default = nama fungsi."""
+        def decorator(func):
+            if not self.enabled:
+                return func
+            span_label = label if label is not None else func.__name__
+            if inspect.iscoroutinefunction(func):
+                @functools.wraps(func)
+                async def async_wrapper(*args, **kwargs):
+                    with _Span(self, stage, span_label):
+                        return await func(*args, **kwargs)
+                return async_wrapper
+
+            @functools.wraps(func)
+            def wrapper(*args, **kwargs):
+                with _Span(self, stage, span_label):
+                    return func(*args, **kwargs)
+            return wrapper
+        return decorator
+
+    def reset(self):
+        self._histograms.clear()
+        self._started_at = time.time()
+
+    def format_report(self):
+        """Ringkasan persentil per tahap, terurut berdasarkan nama tahap lalu label."""
+        if not self.enabled:
+            return "Metrics latency dinonaktifkan (BOT_METRICS=0)."
+        if not self._histograms:
+            return "Belum ada data latency."
+        lines = [f"Latency per tahap (ms) sejak {time.strftime('%d-%m-%Y %H:%M:%S', time.localtime(self._started_at))}:"]
+        for (stage, label), histogram in sorted(self._histograms.items(), key=lambda entry: (entry[0][0], str(entry[0][1]))):
+            name = f"{stage}[{label}]" if label else stage
+            lines.append(
+                f"{name}: n={histogram.count} p50={histogram.percentile(50):g} "
+                f"p95={histogram.percentile(95):g} p99={histogram.percentile(99):g} "
+                f"maks={histogram.max_ms:.1f}"
+            )
+        return "\n".join(lines)
+
+    def log_report(self):
+        logger.info("%s", self.format_report())
+
+
+class TimedHTTPXRequest(HTTPXRequest):
+    """HTTPXRequest yang mencatat latency setiap panggilan Bot API (sendMessage, dll)."""
+
+    async def do_request(self, url, method, *args, **kwargs):
+        with latency.span("telegram_api", url.rsplit("/", 1)[-1]):
+            return await super().do_request(url, method, *args, **kwargs)
+
+
+def is_admin(user_id):
+    return user_id in ADMIN_USER_IDS
+
+
+latency = LatencyRecorder()
@@ -0,0 +1,96 @@
+"""
+Module cache hasil NLP untuk pesan pendek yang sering berulang ("ya", "selesai", "2", "cash")
+Setiap fungsi NLP punya LRU terbatas sendiri dengan kunci teks yang sudah dinormalisasi.
+Cache mengikuti "generasi" sumber datanya (matcher keyword atau versi menu): begitu
+generasinya berganti, seluruh isi cache dibuang sehingga hasil lama tidak pernah terpakai.
+Cache dipakai dari event loop bot (satu thread), jadi tidak memakai lock.
+"""
+import os
+from collections import OrderedDict
+
+NLP_CACHE_SIZE = int(os.environ.get("BOT_NLP_CACHE_SIZE", "2048")) # 0 = cache nonaktif
+# Pesan yang lebih panjang jarang berulang persis; tidak disimpan agar tidak mendesak pesan pendek
+NLP_CACHE_MAX_TEXT_LENGTH = 64
+
+_MISSING = object()
+_memos = []
+
+
+class LRUMemo:
+    def __init__(self, name, maxsize=NLP_CACHE_SIZE, max_key_length=NLP_CACHE_MAX_TEXT_LENGTH):
+        self.name = name
+        self.maxsize = maxsize
+        self.max_key_length = max_key_length
+        self._entries = OrderedDict()
+        self._generation = None
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+        _memos.append(self)
+
+    def get_or_compute(self, key, compute, *args, generation=None):
+        """
+        Mengembalikan hasil compute(*args) untuk key, dari cache jika ada.
+        generation: nilai yang menentukan validitas isi cache (misalnya versi menu);
+        jika berbeda dari panggilan sebelumnya, cache dikosongkan dulu.
+        """
+        if generation != self._generation:
+            if self._entries:
+                self._entries.clear()
+                self.invalidations += 1
+            self._generation = generation
+        if self.maxsize <= 0 or len(key) > self.max_key_length:
+            return compute(*args)
+
+        value = self._entries.get(key, _MISSING)
+        if value is not _MISSING:
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+        self.misses += 1
+        value = compute(*args)
+        self._entries[key] = value
+        if len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+        return value
+
+    def clear(self):
+        self._entries.clear()
+        self._generation = None
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self._entries),
+            "maxsize": self.maxsize,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "evictions": self.evictions,
+            "invalidations": self.invalidations,
+        }
+
+
+def get_nlp_cache_stats():
+    """Statistik semua cache NLP: {nama fungsi: stats}."""
+    return {memo.name: memo.stats() for memo in _memos}
+
+
+def clear_nlp_caches():
+    for memo in _memos:
+        memo.clear()
+
+
+def format_nlp_cache_report():
+    if NLP_CACHE_SIZE <= 0:
+        return "Cache NLP dinonaktifkan (BOT_NLP_CACHE_SIZE=0)."
+    lines = ["Cache NLP:"]
+    for name, stats in get_nlp_cache_stats().items():
+        lines.append(
+            f"{name}: hit={stats['hit_rate']:.0%} ({stats['hits']}/{stats['hits'] + stats['misses']}) "
+            f"isi={stats['size']}/{stats['maxsize']} evict={stats['evictions']} invalidasi={stats['invalidations']}"
+        )
+    return "\n".join(lines)
@@ -2,15 +2,29 @@
 import re
 import sys 
 import os 
+import logging
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from itertools import islice
+from types import MappingProxyType
 
 try:
-    from modules.menu_manager import get_menu
+    from modules.menu_manager import get_entity_index, get_fuzzy_index
+    from modules.menu_index import normalize_text
+    from modules.aho_corasick import AhoCorasick
+    from bot.nlp_cache import LRUMemo
 except ImportError:
     current_script_dir = os.path.dirname(os.path.abspath(__file__))
     project_root_dir = os.path.dirname(current_script_dir) 
     if project_root_dir not in sys.path:
         sys.path.append(project_root_dir)
-    from modules.menu_manager import get_menu
+    from modules.menu_manager import get_entity_index, get_fuzzy_index
+    from modules.menu_index import normalize_text
+    from modules.aho_corasick import AhoCorasick
+    from bot.nlp_cache import LRUMemo
+
+logger = logging.getLogger(__name__)
 
 
 # --- Definisi Keyword untuk Intent ---
@@ -70,33 +84,164 @@ INTENT_KEYWORDS = {
     ]
 }
 
+def freeze_intent_keywords(intent_keywords):
+    """
+    Salinan read-only tabel keyword (mapping proxy berisi tuple). Mengubahnya di tempat
+    melempar TypeError/AttributeError, jadi perubahan tidak mungkin lolos tanpa
+    reload_intent_keywords() yang membangun ulang matcher.
+    """
+    return MappingProxyType({intent: tuple(keywords) for intent, keywords in intent_keywords.items()})
+
+INTENT_KEYWORDS = freeze_intent_keywords(INTENT_KEYWORDS)
+
 def preprocess_text(text):
     """Membersihkan dan menormalkan teks."""
-    if not text:
-        return ""
-    text = text.lower()
-    text = re.sub(r'[^\w\s]', '', text) 
-    text = text.strip()
-    return text
+    # Normalisasi yang sama dipakai indeks nama menu di menu_manager
+    return normalize_text(text)
+
+def _is_word_char(char):
+    # Sama dengan definisi \w pada regex Unicode
+    return char.isalnum() or char == '_'
+
+def _is_word_boundary(text, position):
+    """Meniru \b: batas kata jika karakter kiri dan kanan beda jenis (word/non-word)."""
+    left = position > 0 and _is_word_char(text[position - 1])
+    right = position < len(text) and _is_word_char(text[position])
+    return left != right
+
+class IntentMatcher:
+    """
+    Matcher keyword intent berbasis Aho-Corasick.
+    Dibangun sekali dari INTENT_KEYWORDS; satu kali scan teks menghasilkan skor
+    yang sama dengan loop regex lama (2 untuk whole-word, 1 untuk partial).
+    """
+
+    def __init__(self, intent_keywords):
+        self.intents = list(intent_keywords)
+        # keyword -> daftar intent (duplikat dipertahankan agar skor tetap sama)
+        self._keyword_intents = {}
+        for intent, keywords in intent_keywords.items():
+            for keyword in keywords:
+                self._keyword_intents.setdefault(keyword, []).append(intent)
+        self._automaton = AhoCorasick((keyword, keyword) for keyword in self._keyword_intents)
+
+    def score(self, processed_text):
+        """Menghitung skor semua intent untuk teks yang sudah di-preprocess."""
+        whole_matches = set()
+        partial_matches = set()
+        for start, end, keyword in self._automaton.iter_matches(processed_text):
+            if keyword in whole_matches:
+                continue
+            if _is_word_boundary(processed_text, start) and _is_word_boundary(processed_text, end):
+                whole_matches.add(keyword)
+                partial_matches.discard(keyword)
+            else:
+                partial_matches.add(keyword)
+
+        intent_scores = {intent: 0 for intent in self.intents}
+        for keyword in whole_matches:
+            for intent in self._keyword_intents[keyword]:
+                intent_scores[intent] += 2
+        for keyword in partial_matches:
+            for intent in self._keyword_intents[keyword]:
+                intent_scores[intent] += 1
+        return intent_scores
+
+def get_intent_matcher():
+    """Mengembalikan matcher intent; dibangun ulang hanya lewat reload_intent_keywords()."""
+    return _intent_matcher
+
+def reload_intent_keywords(intent_keywords):
+    """
+    Mengganti tabel keyword saat runtime. INTENT_KEYWORDS read-only, jadi ini satu-satunya
+    jalan mengubahnya; matcher, kata non-item untuk pencarian fuzzy, dan validasi model
+    classifier ikut dibangun ulang.
+    """
+    global INTENT_KEYWORDS, _intent_matcher, NON_ITEM_WORDS, _intent_classifier, _intent_classifier_loaded
+    INTENT_KEYWORDS = freeze_intent_keywords(intent_keywords)
+    _intent_matcher = IntentMatcher(INTENT_KEYWORDS)
+    NON_ITEM_WORDS = build_non_item_words(INTENT_KEYWORDS)
+    # Hash keyword model dicek ulang saat classifier diminta berikutnya
+    _intent_classifier = None
+    _intent_classifier_loaded = False
+
+_intent_matcher = IntentMatcher(INTENT_KEYWORDS)
+
+# --- Classifier intent opsional (lihat bot/intent_classifier.py) ---
+INTENT_CLASSIFIER_ENABLED = os.environ.get("BOT_INTENT_CLASSIFIER", "0") == "1"
+# Di bawah confidence ini, intent ditentukan oleh matcher keyword
+INTENT_MIN_CONFIDENCE = float(os.environ.get("BOT_INTENT_MIN_CONFIDENCE", "0.6"))
+
+_intent_classifier = None
+_intent_classifier_loaded = False
+
+def get_intent_classifier():
+    """Memuat model classifier sekali. Returns: None jika nonaktif, tidak ada, atau usang."""
+    global _intent_classifier, _intent_classifier_loaded
+    if not INTENT_CLASSIFIER_ENABLED:
+        return None
+    if not _intent_classifier_loaded:
+        _intent_classifier_loaded = True
+        from bot.intent_classifier import IntentClassifier, INTENT_MODEL_PATH, keyword_table_hash
+        started = time.perf_counter()
+        try:
+            classifier = IntentClassifier.load(INTENT_MODEL_PATH)
+        except (OSError, ValueError, KeyError) as e:
+            logger.warning("Model intent %s tidak bisa dimuat (%s), memakai matcher keyword", INTENT_MODEL_PATH, e)
+            return None
+        if classifier.keyword_hash != keyword_table_hash(INTENT_KEYWORDS):
+            logger.warning(
+                "Model intent %s dilatih dari INTENT_KEYWORDS versi lama, memakai matcher keyword. "
+                "Latih ulang dengan: python -m bot.intent_classifier", INTENT_MODEL_PATH
+            )
+            return None
+        _intent_classifier = classifier
+        logger.info(
+            "Model intent dimuat: %s fitur, %s label (%.1f ms)",
+            len(classifier.vocabulary), len(classifier.labels), (time.perf_counter() - started) * 1000
+        )
+    return _intent_classifier
+
+_intent_memo = LRUMemo("recognize_intent")
 
 def recognize_intent(text):
-    """Mengenali intent pengguna berdasarkan keyword."""
-    processed_text = preprocess_text(text)
+    """
+    Mengenali intent pengguna. Jika classifier aktif dan yakin (confidence >=
+    BOT_INTENT_MIN_CONFIDENCE) hasilnya (intent, confidence); selain itu
+    berdasarkan keyword (intent, skor keyword).
+    """
+    return recognize_intent_processed(preprocess_text(text))
+
+def recognize_intent_processed(processed_text):
+    """Sama dengan recognize_intent untuk teks yang sudah di-preprocess."""
+    matcher = get_intent_matcher()
+    classifier = get_intent_classifier()
+    # reload_intent_keywords() membuat matcher baru, jadi cache ikut dikosongkan
+    return _intent_memo.get_or_compute(
+        processed_text, _recognize_processed, matcher, classifier, processed_text,
+        generation=(matcher, classifier)
+    )
+
+def _recognize_processed(matcher, classifier, processed_text):
+    """Satu-satunya aturan keputusan intent; dipakai recognize_intent maupun recognize_intents."""
+    if classifier is not None:
+        intent, confidence = classifier.predict(processed_text)
+        if confidence >= INTENT_MIN_CONFIDENCE:
+            return (intent, confidence) if intent else (None, 0)
+    return _best_keyword_intent(matcher, processed_text)
+
+def _recognize_text(matcher, classifier, text):
+    return _recognize_processed(matcher, classifier, preprocess_text(text))
+
+def _best_keyword_intent(matcher, processed_text):
     if not processed_text:
         return None, 0
 
-    intent_scores = {intent: 0 for intent in INTENT_KEYWORDS}
+    intent_scores = matcher.score(processed_text)
     best_intent = None
     highest_score = 0
 
-    for intent, keywords in INTENT_KEYWORDS.items():
-        score = 0
-        for keyword in keywords:
-            if re.search(r'\b' + re.escape(keyword) + r'\b', processed_text):
-                score += 2
-            elif keyword in processed_text:
-                score += 1
-        
+    for intent, score in intent_scores.items():
         if score > highest_score:
             highest_score = score
             best_intent = intent
@@ -108,52 +253,162 @@ def recognize_intent(text):
         
     return best_intent, highest_score
 
+# --- Batch API untuk analisis log offline ---
+
+_worker_matcher = None # Matcher milik proses worker, dibangun sekali oleh initializer
+_worker_classifier = None
+
+def _batch_classifier(intent_keywords):
+    """Classifier untuk batch, hanya jika dilatih dari tabel keyword yang sama."""
+    classifier = get_intent_classifier()
+    if classifier is None or intent_keywords is INTENT_KEYWORDS:
+        return classifier
+    from bot.intent_classifier import keyword_table_hash
+    return classifier if classifier.keyword_hash == keyword_table_hash(intent_keywords) else None
+
+def _init_batch_worker(intent_keywords, classifier_path):
+    global _worker_matcher, _worker_classifier
+    _worker_matcher = IntentMatcher(intent_keywords)
+    if classifier_path:
+        from bot.intent_classifier import IntentClassifier
+        _worker_classifier = IntentClassifier.load(classifier_path)
+
+def _recognize_chunk(texts):
+    return [_recognize_text(_worker_matcher, _worker_classifier, text) for text in texts]
+
+def recognize_intents(texts, intent_keywords=None, processes=1, chunk_size=2000, stats=None):
+    """
+    Versi batch recognize_intent untuk re-scoring log chat.
+    texts dibaca secara streaming (boleh generator/file besar) dan hasil (intent, skor)
+    di-yield dengan urutan yang sama dengan input. Keputusannya sama dengan
+    recognize_intent, termasuk classifier jika aktif. Matcher dan classifier
+    disiapkan sekali; dengan processes > 1 teks dibagi per chunk ke process pool,
+    dan setiap worker membangun matcher dan memuat model-nya sekali saja.
+    intent_keywords: tabel keyword alternatif (default INTENT_KEYWORDS saat ini);
+    classifier hanya dipakai jika dilatih dari tabel yang sama.
+    stats: dict opsional yang diisi throughput setelah iterasi selesai.
+    """
+    keywords = INTENT_KEYWORDS if intent_keywords is None else intent_keywords
+    classifier = _batch_classifier(keywords)
+    iterator = iter(texts)
+    started = time.perf_counter()
+    message_count = 0
+
+    if processes is None or processes > 1:
+        worker_count = processes or os.cpu_count() or 1
+        classifier_path = None
+        if classifier is not None:
+            from bot.intent_classifier import INTENT_MODEL_PATH
+            classifier_path = INTENT_MODEL_PATH
+        with ProcessPoolExecutor(max_workers=worker_count, initializer=_init_batch_worker,
+                                 initargs=(dict(keywords), classifier_path)) as pool:
+            pending = deque()
+            # Batasi chunk yang sedang diproses agar memori tidak tumbuh bersama ukuran input
+            max_in_flight = worker_count * 2
+            while True:
+                while len(pending) < max_in_flight:
+                    chunk = list(islice(iterator, chunk_size))
+                    if not chunk:
+                        break
+                    pending.append(pool.submit(_recognize_chunk, chunk))
+                if not pending:
+                    break
+                results = pending.popleft().result()
+                message_count += len(results)
+                yield from results
+    else:
+        worker_count = 1
+        matcher = IntentMatcher(keywords) if intent_keywords is not None else get_intent_matcher()
+        for text in iterator:
+            message_count += 1
+            yield _recognize_text(matcher, classifier, text)
+
+    elapsed = time.perf_counter() - started
+    throughput = message_count / elapsed if elapsed > 0 else 0.0
+    summary = {
+        "messages": message_count,
+        "seconds": elapsed,
+        "workers": worker_count,
+        "messages_per_second": throughput,
+        "messages_per_second_per_core": throughput / worker_count,
+    }
+    if stats is not None:
+        stats.update(summary)
+    logger.info(
+        "recognize_intents: %s pesan dalam %.2f s dengan %s worker (%.0f pesan/detik/core)",
+        message_count, elapsed, worker_count, summary["messages_per_second_per_core"]
+    )
+
+
+_entity_memo = LRUMemo("extract_entities_item_name")
 
 def extract_entities_item_name(text):
     """Mengekstrak nama item menu dari teks."""
-    processed_text = preprocess_text(text)
-    menu = get_menu(force_reload=False) 
-    
-    # Perbaikan: Ambil semua item dari semua kategori yang ada
-    all_items = []
-    
-    # Daftar kategori yang sesuai dengan struktur menu
-    categories = ["es_kopi", "non_kopi", "espresso_based", "refreshment", "others", "pastry"]
-    
-    for category in categories:
-        if menu.get(category):
-            all_items.extend(menu[category])
-
-    found_items_data = []
-    sorted_items_by_name_len = sorted(all_items, key=lambda x: len(x.get("nama","")), reverse=True)
-
-    for item_data in sorted_items_by_name_len:
-        item_name_processed = preprocess_text(item_data.get("nama", ""))
-        if item_name_processed and item_name_processed in processed_text:
-            is_substring_of_found = False
-            for fi_data in found_items_data:
-                if item_name_processed in preprocess_text(fi_data.get("nama","")):
-                    is_substring_of_found = True
-                    break
-            if not is_substring_of_found:
-                found_items_data.append(item_data) 
+    return extract_entities_item_name_processed(preprocess_text(text))
 
-    if not found_items_data:
+def extract_entities_item_name_processed(processed_text):
+    """Sama dengan extract_entities_item_name untuk teks yang sudah di-preprocess."""
+    if not processed_text:
         return None
-    
-    return found_items_data[0]
+    # Indeks dimiliki menu_manager dan hanya dibangun ulang saat menu berubah
+    entity_index = get_entity_index()
+    # Efektif berkunci (teks, versi menu, kata non-item): cache dikosongkan setiap versi
+    # menu naik atau reload_intent_keywords() membangun ulang NON_ITEM_WORDS
+    return _entity_memo.get_or_compute(
+        processed_text, _extract_item_processed, entity_index, processed_text,
+        generation=(entity_index.version, NON_ITEM_WORDS)
+    )
+
+def _extract_item_processed(entity_index, processed_text):
+    item_data = entity_index.find_best(processed_text)
+    if item_data:
+        return item_data
+
+    # Fallback untuk salah ketik, hanya dijalankan jika pencocokan persis tidak menemukan item.
+    # Kecocokan yang ambigu tidak dipilih otomatis supaya item lain tidak masuk keranjang diam-diam
+    return get_fuzzy_index().best_match(processed_text, ignore_words=NON_ITEM_WORDS)
+
+def find_item_candidates(text, limit=5):
+    """
+    Mencari kandidat item yang mirip dengan teks (toleran salah ketik).
+    Returns: list (item_data, skor 0..1) terurut dari skor tertinggi
+    """
+    processed_text = preprocess_text(text)
+    if not processed_text:
+        return []
+    return get_fuzzy_index().search(processed_text, limit=limit, ignore_words=NON_ITEM_WORDS)
 
 ANGKA_TEKS_KE_INT = {
     "satu": 1, "dua": 2, "tiga": 3, "empat": 4, "lima": 5,
     "enam": 6, "tujuh": 7, "delapan": 8, "sembilan": 9, "sepuluh": 10,
 }
 
+# Kata pengisi yang tidak pernah menjadi bagian nama item; memutus jendela pencarian fuzzy
+FILLER_WORDS = {
+    "aku", "saya", "gue", "gw", "kak", "kakak", "min", "mas", "mbak", "dong", "deh", "ya", "yah", "sih",
+    "aja", "saja", "nya", "yang", "dan", "sama", "atau", "tadi", "itu", "ini", "lagi", "juga", "tolong",
+    "pesen", "gelas", "porsi", "cup", "buah", "biji", "ada", "apa", "gimana", "kapan", "bisa", "kalau",
+}
+
+def build_non_item_words(intent_keywords):
+    words = {word for keywords in intent_keywords.values() for keyword in keywords for word in keyword.split()}
+    return frozenset(words | FILLER_WORDS | set(ANGKA_TEKS_KE_INT))
+
+NON_ITEM_WORDS = build_non_item_words(INTENT_KEYWORDS)
+
+_quantity_memo = LRUMemo("extract_quantity")
+
 def extract_quantity(text):
     """Mengekstrak kuantitas (angka) dari teks."""
-    processed_text = preprocess_text(text) 
+    return extract_quantity_processed(preprocess_text(text))
+
+def extract_quantity_processed(processed_text):
+    """Sama dengan extract_quantity untuk teks yang sudah di-preprocess."""
     if not processed_text:
         return None
+    return _quantity_memo.get_or_compute(processed_text, _extract_quantity_processed, processed_text)
 
+def _extract_quantity_processed(processed_text):
     match_digit = re.search(r'\b\d+\b', processed_text)
     if not match_digit: 
         match_digit = re.search(r'\d+', processed_text)
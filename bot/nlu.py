@@ -0,0 +1,52 @@
+"""
+Module hasil NLU per pesan
+Teks pesan dinormalisasi sekali saat MessageNLU dibuat; token, skor intent, item menu
+yang cocok, dan kuantitas baru dihitung saat pertama kali diminta oleh handler lalu
+disimpan, sehingga handler mana pun yang berjalan tidak perlu menormalisasi ulang.
+"""
+from functools import cached_property
+
+from bot.nlp_utils import (
+    preprocess_text, get_intent_matcher, recognize_intent_processed,
+    extract_entities_item_name_processed, extract_quantity_processed
+)
+
+
+class MessageNLU:
+    def __init__(self, text):
+        self.text = text or ""
+        self.processed_text = preprocess_text(self.text)
+
+    @cached_property
+    def tokens(self):
+        return self.processed_text.split()
+
+    @cached_property
+    def intent_scores(self):
+        """Skor keyword semua intent (untuk logging/debug; keputusan intent pakai .intent)."""
+        return get_intent_matcher().score(self.processed_text)
+
+    @cached_property
+    def _intent_result(self):
+        return recognize_intent_processed(self.processed_text)
+
+    @property
+    def intent(self):
+        return self._intent_result[0]
+
+    @property
+    def intent_score(self):
+        return self._intent_result[1]
+
+    @cached_property
+    def item(self):
+        """Item menu yang disebut di pesan (dict item) atau None."""
+        return extract_entities_item_name_processed(self.processed_text)
+
+    @cached_property
+    def quantity(self):
+        return extract_quantity_processed(self.processed_text)
+
+    def contains_any(self, keywords):
+        """True jika salah satu keyword muncul (substring) di teks yang sudah dinormalisasi."""
+        return any(keyword in self.processed_text for keyword in keywords)
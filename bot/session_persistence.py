@@ -0,0 +1,158 @@
+"""
+Module untuk menyimpan sesi user ke disk (SQLite) dengan write-behind batching
+Perubahan sesi hanya ditandai di memori; flusher background menulisnya per batch
+sehingga handler pesan tidak pernah menunggu disk
+"""
+import asyncio
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+
+from bot.user_context import Session
+
+logger = logging.getLogger(__name__)
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SESSION_DB_PATH = os.environ.get("BOT_SESSION_DB", os.path.join(BASE_DIR, 'data', 'sessions.db'))
+SESSION_PERSISTENCE_ENABLED = os.environ.get("BOT_SESSION_PERSISTENCE", "1") != "0"
+SESSION_FLUSH_INTERVAL_SECONDS = float(os.environ.get("BOT_SESSION_FLUSH_INTERVAL", "1.0"))
+FLUSH_REPORT_INTERVAL_SECONDS = 60 # Ringkasan latency flush di-log tiap interval ini
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS sessions (
+    user_id INTEGER PRIMARY KEY,
+    context TEXT NOT NULL,
+    updated_at REAL NOT NULL
+);
+"""
+
+
+class SessionPersistence:
+    """Backend SQLite untuk SessionStore dengan flush per batch."""
+
+    def __init__(self, db_path=SESSION_DB_PATH, flush_interval=SESSION_FLUSH_INTERVAL_SECONDS):
+        self.db_path = db_path
+        self.flush_interval = flush_interval
+        # Koneksi dipakai oleh thread utama (warm-load, flush terakhir) dan thread flusher;
+        # lock memastikan keduanya tidak pernah memakainya bersamaan
+        self._conn = sqlite3.connect(db_path, check_same_thread=False)
+        self._lock = threading.Lock()
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.executescript(_SCHEMA)
+        self._flush_count = 0
+        self._flush_total_ms = 0.0
+        self._flush_max_ms = 0.0
+        self._last_report = time.monotonic()
+
+    def warm_load(self, store):
+        """Memuat sesi yang belum kadaluarsa ke store dan mulai melacak perubahan."""
+        started = time.perf_counter()
+        now = time.time()
+        cutoff = now - store.ttl_seconds
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT user_id, context, updated_at FROM sessions WHERE updated_at > ? ORDER BY updated_at",
+                (cutoff,)
+            ).fetchall()
+            with self._conn:
+                self._conn.execute("DELETE FROM sessions WHERE updated_at <= ?", (cutoff,))
+
+        restored = 0
+        for user_id, context_json, updated_at in rows:
+            try:
+                context_data = Session.from_dict(json.loads(context_json))
+            except (json.JSONDecodeError, KeyError, TypeError):
+                logger.warning("Sesi user %s rusak di %s, dilewati.", user_id, self.db_path)
+                continue
+            store.restore(user_id, context_data, idle_seconds=max(0.0, now - updated_at))
+            restored += 1
+
+        store.track_changes = True
+        elapsed_ms = (time.perf_counter() - started) * 1000
+        logger.info("Warm-load sesi: %s sesi dipulihkan dari %s dalam %.1f ms", restored, self.db_path, elapsed_ms)
+        return restored
+
+    def _collect_batch(self, store):
+        """Serialisasi sesi yang berubah (di event loop, tanpa I/O)."""
+        now = time.time()
+        upserts = []
+        deletes = []
+        for user_id in store.drain_changes():
+            context_data = store.get(user_id)
+            if context_data is None:
+                deletes.append((user_id,))
+                continue
+            updated_at = now - store.idle_seconds(user_id)
+            upserts.append((user_id, json.dumps(context_data.to_dict(), ensure_ascii=False), updated_at))
+        return upserts, deletes
+
+    def _write_batch(self, upserts, deletes):
+        with self._lock, self._conn:
+            if upserts:
+                self._conn.executemany(
+                    "INSERT INTO sessions (user_id, context, updated_at) VALUES (?, ?, ?) "
+                    "ON CONFLICT(user_id) DO UPDATE SET context = excluded.context, updated_at = excluded.updated_at",
+                    upserts
+                )
+            if deletes:
+                self._conn.executemany("DELETE FROM sessions WHERE user_id = ?", deletes)
+
+    def _record_flush(self, batch_size, elapsed_ms):
+        self._flush_count += 1
+        self._flush_total_ms += elapsed_ms
+        self._flush_max_ms = max(self._flush_max_ms, elapsed_ms)
+        logger.debug("Flush sesi: %s perubahan dalam %.1f ms", batch_size, elapsed_ms)
+        if time.monotonic() - self._last_report >= FLUSH_REPORT_INTERVAL_SECONDS:
+            average_ms = self._flush_total_ms / self._flush_count
+            logger.info(
+                "Flush sesi: %s batch, rata-rata %.1f ms, maks %.1f ms",
+                self._flush_count, average_ms, self._flush_max_ms
+            )
+            self._flush_count = 0
+            self._flush_total_ms = 0.0
+            self._flush_max_ms = 0.0
+            self._last_report = time.monotonic()
+
+    async def flush(self, store):
+        """Menulis satu batch perubahan di thread terpisah."""
+        upserts, deletes = self._collect_batch(store)
+        if not upserts and not deletes:
+            return 0
+        started = time.perf_counter()
+        try:
+            await asyncio.to_thread(self._write_batch, upserts, deletes)
+        except (sqlite3.Error, asyncio.CancelledError):
+            # Jangan sampai perubahan hilang; coba lagi di flush berikutnya. Saat task
+            # dibatalkan (shutdown) thread-nya tetap berjalan, tapi hasilnya tidak bisa
+            # dipastikan, jadi flush_sync menulis ulang sesi yang sama (upsert idempoten)
+            store.requeue_changes([row[0] for row in upserts] + [row[0] for row in deletes])
+            raise
+        self._record_flush(len(upserts) + len(deletes), (time.perf_counter() - started) * 1000)
+        return len(upserts) + len(deletes)
+
+    def flush_sync(self, store):
+        """
+        Flush terakhir saat shutdown (boleh blocking). Menunggu lock koneksi, jadi
+        batch yang masih ditulis thread flusher selesai lebih dulu.
+        """
+        upserts, deletes = self._collect_batch(store)
+        started = time.perf_counter()
+        self._write_batch(upserts, deletes)
+        elapsed_ms = (time.perf_counter() - started) * 1000
+        logger.info("Flush sesi terakhir: %s perubahan dalam %.1f ms", len(upserts) + len(deletes), elapsed_ms)
+
+    async def run_flusher(self, store):
+        """Loop write-behind untuk dijalankan sebagai asyncio task."""
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            try:
+                await self.flush(store)
+            except sqlite3.Error as e:
+                logger.error("Gagal menyimpan sesi ke %s: %s", self.db_path, e)
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
@@ -3,7 +3,9 @@ Main Telegram Bot File
 Entry point untuk menjalankan chatbot Kafe Cerita
 Mengorganisir handler dan routing message berdasarkan state
 """
+import asyncio
 import logging
+import signal
 import sys
 import os
 
@@ -24,26 +26,37 @@ except ImportError as e:
     print("Pastikan file config.py tersedia dan berisi TELEGRAM_BOT_TOKEN")
     sys.exit(1)
 
+from modules.menu_events import MenuChangeWatcher
+from modules.menu_manager import refresh_menu_from_storage_async, get_storage_signature
+from modules.order_ledger import order_ledger
+
 # Import modules bot
 from bot.user_context import (
     get_user_state, set_user_state, STATE_GENERAL, STATE_AWAITING_QUANTITY,
     STATE_AWAITING_MORE_ITEMS, STATE_AWAITING_DINING_OPTION, STATE_AWAITING_TAKEOUT_TYPE, 
     STATE_AWAITING_PAYMENT_METHOD, user_contexts
 )
-from bot.commands import start_command, menu_command
+from bot.session_persistence import SessionPersistence, SESSION_PERSISTENCE_ENABLED
+from bot.dispatch import serialize_per_user, CONCURRENT_UPDATES
+from bot.webhook_server import WebhookServer, WEBHOOK_PATH, WEBHOOK_SECRET
+from bot.logging_setup import setup_logging
+from bot.metrics import latency, TimedHTTPXRequest, METRICS_ENABLED
+from bot.nlp_cache import format_nlp_cache_report
+from bot.nlu import MessageNLU
+from bot.commands import start_command, menu_command, metrics_command
 from bot.message_handlers import (
     handle_quantity_input, handle_dining_option_input, handle_takeout_type_input,
     handle_payment_method_input, handle_general_intent, handle_invalid_state_input,
     handle_more_items_input  # Handler baru untuk multiple items
 )
 
-# Setup logging
-logging.basicConfig(
-    format="%(asctime)s - %(name)s - %(levelname)s - %(message)s", 
-    level=logging.INFO
-)
+# Setup logging (handler berjalan di thread background, lihat bot/logging_setup.py)
+setup_logging()
 logger = logging.getLogger(__name__)
 
+BOT_MODE = os.environ.get("BOT_MODE", "polling") # "polling" atau "webhook"
+WEBHOOK_URL = os.environ.get("WEBHOOK_URL", "") # URL publik (tanpa path) untuk setWebhook, opsional
+
 async def handle_message(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
     """
     Main message handler - router untuk semua pesan text
@@ -54,46 +67,137 @@ async def handle_message(update: Update, context: ContextTypes.DEFAULT_TYPE) ->
     user_first_name = update.effective_user.first_name
     
     # Dapatkan state user saat ini
-    current_user_state = get_user_state(user_id)
+    with latency.span("get_user_state"):
+        current_user_state = get_user_state(user_id)
     
     # Inisialisasi konteks jika belum ada (untuk user baru atau konteks kadaluarsa)
     if user_id not in user_contexts:
         set_user_state(user_id, STATE_GENERAL)
         current_user_state = STATE_GENERAL
 
-    logger.info(f"Pesan dari {user_first_name} (ID: {user_id}, State: {current_user_state}): {text}")
+    logger.info("Pesan dari %s (ID: %s, State: %s): %s", user_first_name, user_id, current_user_state, text)
+
+    # Teks dinormalisasi sekali; intent, item, dan kuantitas dihitung saat diminta handler
+    nlu = MessageNLU(text)
 
     # Route ke handler yang sesuai berdasarkan state
     try:
-        if current_user_state == STATE_AWAITING_QUANTITY:
-            await handle_quantity_input(update, user_id, user_first_name, text)
+        with latency.span("handle_message", current_user_state):
+            if current_user_state == STATE_AWAITING_QUANTITY:
+                await handle_quantity_input(update, user_id, user_first_name, nlu)
             
-        elif current_user_state == STATE_AWAITING_MORE_ITEMS:
-            await handle_more_items_input(update, user_id, user_first_name, text)
+            elif current_user_state == STATE_AWAITING_MORE_ITEMS:
+                await handle_more_items_input(update, user_id, user_first_name, nlu)
             
-        elif current_user_state == STATE_AWAITING_DINING_OPTION:
-            await handle_dining_option_input(update, user_id, text)
+            elif current_user_state == STATE_AWAITING_DINING_OPTION:
+                await handle_dining_option_input(update, user_id, nlu)
             
-        elif current_user_state == STATE_AWAITING_TAKEOUT_TYPE:
-            await handle_takeout_type_input(update, user_id, text)
+            elif current_user_state == STATE_AWAITING_TAKEOUT_TYPE:
+                await handle_takeout_type_input(update, user_id, nlu)
             
-        elif current_user_state == STATE_AWAITING_PAYMENT_METHOD:
-            await handle_payment_method_input(update, user_id, user_first_name, text)
+            elif current_user_state == STATE_AWAITING_PAYMENT_METHOD:
+                await handle_payment_method_input(update, user_id, user_first_name, nlu)
             
-        elif current_user_state == STATE_GENERAL:
-            await handle_general_intent(update, user_id, user_first_name, text)
+            elif current_user_state == STATE_GENERAL:
+                await handle_general_intent(update, user_id, user_first_name, nlu)
             
-        else:
-            # State tidak dikenali atau input tidak sesuai state
-            logger.warning(f"User {user_id} dalam state {current_user_state}, input tidak cocok: '{text}'")
-            await handle_invalid_state_input(update, current_user_state)
+            else:
+                # State tidak dikenali atau input tidak sesuai state
+                logger.warning("User %s dalam state %s, input tidak cocok: '%s'", user_id, current_user_state, text)
+                await handle_invalid_state_input(update, current_user_state)
             
     except Exception as e:
-        logger.error(f"Error handling message untuk user {user_id}: {e}")
+        logger.error("Error handling message untuk user %s: %s", user_id, e)
         await update.message.reply_text(
             "Maaf, terjadi kesalahan sistem. Silakan coba lagi atau gunakan /start untuk memulai ulang."
         )
 
+def log_metrics_report() -> None:
+    latency.log_report()
+    logger.info("%s", format_nlp_cache_report())
+
+async def post_init(application: Application) -> None:
+    """
+    Dijalankan setelah Application siap: mulai background task bot.
+    Watcher menu menggantikan force_reload di hot path; menu hanya dimuat
+    ulang saat dashboard mempublikasikan perubahan. Sweeper sesi membuang
+    context user yang sudah kadaluarsa, dan sesi yang tersimpan di disk
+    dipulihkan supaya pesanan yang sedang berjalan tidak hilang saat restart.
+    """
+    menu_watcher = MenuChangeWatcher(
+        # Reload dan rebuild indeks berjalan di thread; event loop hanya memasang hasilnya
+        on_change=latency.timed("menu_reload")(refresh_menu_from_storage_async),
+        storage_signature=get_storage_signature
+    )
+    background_tasks = [
+        asyncio.create_task(menu_watcher.run()),
+        asyncio.create_task(user_contexts.run_sweeper()),
+        asyncio.create_task(order_ledger.run_flusher()),
+    ]
+
+    if SESSION_PERSISTENCE_ENABLED:
+        session_persistence = SessionPersistence()
+        session_persistence.warm_load(user_contexts)
+        application.bot_data["session_persistence"] = session_persistence
+        background_tasks.append(asyncio.create_task(session_persistence.run_flusher(user_contexts)))
+
+    application.bot_data["background_tasks"] = background_tasks
+
+    # kill -USR1 <pid> menulis ringkasan latency dan cache NLP ke log (tidak tersedia di Windows)
+    if METRICS_ENABLED and hasattr(signal, "SIGUSR1"):
+        try:
+            asyncio.get_running_loop().add_signal_handler(signal.SIGUSR1, log_metrics_report)
+        except (NotImplementedError, RuntimeError):
+            pass
+
+async def post_shutdown(application: Application) -> None:
+    """Menghentikan background task dan menulis sisa pesanan dan perubahan sesi ke disk."""
+    background_tasks = application.bot_data.get("background_tasks", [])
+    for task in background_tasks:
+        task.cancel()
+    # Tunggu task benar-benar berhenti sebelum flush terakhir memakai storage yang sama
+    await asyncio.gather(*background_tasks, return_exceptions=True)
+
+    order_ledger.flush_sync()
+
+    session_persistence = application.bot_data.get("session_persistence")
+    if session_persistence:
+        session_persistence.flush_sync(user_contexts)
+        session_persistence.close()
+
+async def run_webhook(application: Application) -> None:
+    """
+    Menjalankan bot dalam mode webhook: update JSON diterima oleh WebhookServer
+    lokal lalu dimasukkan ke update_queue, sehingga diproses oleh handler yang
+    sama dengan mode polling.
+    """
+    async def enqueue_update(update_data):
+        await application.update_queue.put(Update.de_json(update_data, application.bot))
+
+    webhook_server = WebhookServer(on_update=enqueue_update)
+
+    async with application:
+        # post_init/post_shutdown hanya dipanggil otomatis oleh run_polling/run_webhook
+        await post_init(application)
+        await application.start()
+        await webhook_server.start()
+        if WEBHOOK_URL:
+            await application.bot.set_webhook(
+                url=f"{WEBHOOK_URL.rstrip('/')}{WEBHOOK_PATH}",
+                secret_token=WEBHOOK_SECRET or None,
+                allowed_updates=Update.ALL_TYPES
+            )
+            logger.info("Webhook Telegram diarahkan ke %s%s", WEBHOOK_URL.rstrip('/'), WEBHOOK_PATH)
+        try:
+            await webhook_server.serve_forever()
+        except asyncio.CancelledError:
+            pass
+        finally:
+            await webhook_server.stop()
+            await application.stop()
+            await post_shutdown(application)
+            logger.info("Webhook server berhenti: %s", dict(webhook_server.stats))
+
 def main() -> None:
     """
     Fungsi utama untuk menjalankan bot
@@ -107,14 +211,36 @@ def main() -> None:
     logger.info("Memulai Telegram Bot Mata Kopian...")
     
     # Build application dengan token
-    application = Application.builder().token(TELEGRAM_BOT_TOKEN).build()
+    builder = (
+        Application.builder()
+        .token(TELEGRAM_BOT_TOKEN)
+        .concurrent_updates(CONCURRENT_UPDATES)
+        .post_init(post_init)
+        .post_shutdown(post_shutdown)
+    )
+    if METRICS_ENABLED:
+        # Catat latency request ke Bot API (kirim balasan) sebagai tahap telegram_api
+        builder = builder.request(TimedHTTPXRequest(connection_pool_size=256))
+    application = builder.build()
 
     # Register command handlers
-    application.add_handler(CommandHandler("start", start_command))
-    application.add_handler(CommandHandler("menu", menu_command))
+    # Update diproses concurrent antar user, tapi berurutan untuk user yang sama
+    application.add_handler(CommandHandler("start", serialize_per_user(start_command)))
+    application.add_handler(CommandHandler("menu", serialize_per_user(menu_command)))
+    application.add_handler(CommandHandler("metrics", metrics_command))
     
     # Register message handler untuk semua text (bukan command)
-    application.add_handler(MessageHandler(filters.TEXT & ~filters.COMMAND, handle_message))
+    application.add_handler(MessageHandler(filters.TEXT & ~filters.COMMAND, serialize_per_user(handle_message)))
+
+    logger.info("Dispatch concurrent: maksimal %s update diproses bersamaan", CONCURRENT_UPDATES)
+
+    if BOT_MODE == "webhook":
+        logger.info("Bot siap dalam mode webhook. Tekan Ctrl-C untuk menghentikan.")
+        try:
+            asyncio.run(run_webhook(application))
+        except KeyboardInterrupt:
+            pass
+        return
 
     logger.info("Bot siap dan mulai polling. Tekan Ctrl-C untuk menghentikan.")
     
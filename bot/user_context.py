@@ -2,10 +2,15 @@
 Module untuk mengelola konteks dan state pengguna
 Menangani session management, order details, dan state transitions
 """
+import asyncio
 import logging
-from datetime import datetime, timedelta
+import time
+from collections import OrderedDict
 import os
 
+from modules.menu_manager import get_item_by_id
+from modules.order_ids import order_id_allocator
+
 logger = logging.getLogger(__name__)
 
 # --- Konstanta State ---
@@ -18,126 +23,321 @@ STATE_AWAITING_PAYMENT_METHOD = "AWAITING_PAYMENT_METHOD"
 
 # --- Konfigurasi Context ---
 CONTEXT_EXPIRY_MINUTES = 30
+MAX_SESSIONS = int(os.environ.get("BOT_MAX_SESSIONS", "0")) or None # None = tanpa batas
+SESSION_SWEEP_INTERVAL_SECONDS = 60
 REFERENTIAL_KEYWORDS = ["itu", "item itu", "item tersebut", "yang tadi", "yang barusan", "ini"]
 
+class SessionStore:
+    """
+    Penyimpanan Session per user dengan TTL berbasis jam monotonic.
+    Sesi disimpan dalam OrderedDict berurutan dari aktivitas terlama; karena TTL
+    sama untuk semua sesi, urutan ini sekaligus menjadi antrian expiry, jadi
+    sweeper dan eviksi LRU cukup mengambil dari depan.
+    """
+
+    def __init__(self, ttl_seconds, max_sessions=None, clock=time.monotonic):
+        self.ttl_seconds = ttl_seconds
+        self.max_sessions = max_sessions
+        self._clock = clock
+        self._sessions = OrderedDict() # user_id -> Session
+        self._last_active = {} # user_id -> waktu monotonic aktivitas terakhir
+        self.expired_count = 0
+        self.evicted_count = 0
+        # Diaktifkan oleh SessionPersistence; user_id yang berubah sejak flush terakhir
+        self.track_changes = False
+        self._dirty = set()
+
+    def _is_expired(self, user_id, now):
+        return now - self._last_active[user_id] >= self.ttl_seconds
+
+    def _mark_dirty(self, user_id):
+        if self.track_changes:
+            self._dirty.add(user_id)
+
+    def _expire(self, user_id):
+        del self._sessions[user_id]
+        del self._last_active[user_id]
+        self._mark_dirty(user_id)
+        self.expired_count += 1
+        logger.info("Konteks untuk user %s kadaluarsa. Dihapus.", user_id)
+
+    def _live_context(self, user_id):
+        context_data = self._sessions.get(user_id)
+        if context_data is None:
+            return None
+        if self._is_expired(user_id, self._clock()):
+            self._expire(user_id)
+            return None
+        return context_data
+
+    def __contains__(self, user_id):
+        return self._live_context(user_id) is not None
+
+    def __getitem__(self, user_id):
+        context_data = self._live_context(user_id)
+        if context_data is None:
+            raise KeyError(user_id)
+        return context_data
+
+    def __setitem__(self, user_id, context_data):
+        self._sessions[user_id] = context_data
+        self.touch(user_id)
+        if self.max_sessions and len(self._sessions) > self.max_sessions:
+            evicted_user_id, _ = self._sessions.popitem(last=False)
+            del self._last_active[evicted_user_id]
+            self._mark_dirty(evicted_user_id)
+            self.evicted_count += 1
+            logger.info("Konteks user %s di-evict (batas %s sesi).", evicted_user_id, self.max_sessions)
+
+    def __delitem__(self, user_id):
+        del self._sessions[user_id]
+        del self._last_active[user_id]
+        self._mark_dirty(user_id)
+
+    def __len__(self):
+        return len(self._sessions)
+
+    def get(self, user_id, default=None):
+        context_data = self._live_context(user_id)
+        return default if context_data is None else context_data
+
+    def touch(self, user_id):
+        """Menandai aktivitas user: perpanjang TTL dan pindahkan ke akhir antrian."""
+        if user_id in self._sessions:
+            self._last_active[user_id] = self._clock()
+            self._sessions.move_to_end(user_id)
+            self._mark_dirty(user_id)
+
+    def mark_changed(self, user_id):
+        """Menandai context berubah tanpa memperpanjang TTL (untuk persistence)."""
+        if user_id in self._sessions:
+            self._mark_dirty(user_id)
+
+    def drain_changes(self):
+        """Mengambil dan mengosongkan daftar user_id yang berubah sejak panggilan terakhir."""
+        changed, self._dirty = self._dirty, set()
+        return changed
+
+    def requeue_changes(self, user_ids):
+        """Mengembalikan user_id ke daftar perubahan (misal jika flush gagal)."""
+        if self.track_changes:
+            self._dirty.update(user_ids)
+
+    def idle_seconds(self, user_id):
+        """Lama user tidak aktif (detik), atau None jika sesi tidak ada."""
+        if user_id not in self._last_active:
+            return None
+        return self._clock() - self._last_active[user_id]
+
+    def restore(self, user_id, context_data, idle_seconds):
+        """Memasukkan sesi hasil warm-load dengan umur aktivitas yang sudah berjalan."""
+        self._sessions[user_id] = context_data
+        self._last_active[user_id] = self._clock() - idle_seconds
+        self._sessions.move_to_end(user_id)
+
+    def sweep(self):
+        """Menghapus semua sesi kadaluarsa. Returns: jumlah sesi yang dihapus."""
+        now = self._clock()
+        removed = 0
+        while self._sessions:
+            oldest_user_id = next(iter(self._sessions))
+            if not self._is_expired(oldest_user_id, now):
+                break
+            self._expire(oldest_user_id)
+            removed += 1
+        return removed
+
+    def stats(self):
+        """Jumlah sesi hidup, kadaluarsa, dan ter-evict sejak bot berjalan."""
+        return {"live": len(self._sessions), "expired": self.expired_count, "evicted": self.evicted_count}
+
+    async def run_sweeper(self, interval=SESSION_SWEEP_INTERVAL_SECONDS):
+        """Loop sweeper untuk dijalankan sebagai asyncio task."""
+        while True:
+            await asyncio.sleep(interval)
+            removed = self.sweep()
+            if removed:
+                logger.info("Sweeper sesi: %s sesi kadaluarsa dihapus. Statistik: %s", removed, self.stats())
+
+# --- Struktur Data Sesi ---
+class OrderLine:
+    """Satu baris keranjang: referensi item by id plus nama dan harga saat dipesan."""
+    __slots__ = ("item_id", "nama", "harga", "quantity")
+
+    def __init__(self, item_id, nama, harga, quantity):
+        self.item_id = item_id
+        self.nama = nama
+        self.harga = harga
+        self.quantity = quantity
+
+    @property
+    def subtotal(self):
+        return self.harga * self.quantity
+
+    def to_dict(self):
+        return {"item_id": self.item_id, "nama": self.nama, "harga": self.harga, "quantity": self.quantity}
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls(data["item_id"], data["nama"], data["harga"], data["quantity"])
+
+
+class OrderDetails:
+    """Detail pesanan yang sedang berjalan untuk satu user."""
+    __slots__ = (
+        "items", "current_item_id", "dining_option", "takeout_type",
+        "payment_method", "total_price", "order_id"
+    )
+
+    def __init__(self):
+        self.items = []
+        self.current_item_id = None # Item yang menunggu input kuantitas
+        self.dining_option = None
+        self.takeout_type = None
+        self.payment_method = None
+        self.total_price = 0
+        self.order_id = None
+
+    def find_line(self, item_id):
+        for line in self.items:
+            if line.item_id == item_id:
+                return line
+        return None
+
+    def to_dict(self):
+        return {
+            "items": [line.to_dict() for line in self.items],
+            "current_item_id": self.current_item_id,
+            "dining_option": self.dining_option,
+            "takeout_type": self.takeout_type,
+            "payment_method": self.payment_method,
+            "total_price": self.total_price,
+            "order_id": self.order_id,
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        order_details = cls()
+        order_details.items = [OrderLine.from_dict(line) for line in data.get("items", [])]
+        order_details.current_item_id = data.get("current_item_id")
+        order_details.dining_option = data.get("dining_option")
+        order_details.takeout_type = data.get("takeout_type")
+        order_details.payment_method = data.get("payment_method")
+        order_details.total_price = data.get("total_price", 0)
+        order_details.order_id = data.get("order_id")
+        return order_details
+
+
+class Session:
+    """Context satu user: state percakapan, pesanan, dan item terakhir yang ditanyakan."""
+    __slots__ = ("state", "order", "last_inquired_item_id")
+
+    def __init__(self, state=STATE_GENERAL):
+        self.state = state
+        self.order = OrderDetails()
+        self.last_inquired_item_id = None
+
+    def to_dict(self):
+        return {"state": self.state, "order": self.order.to_dict(), "last_inquired_item_id": self.last_inquired_item_id}
+
+    @classmethod
+    def from_dict(cls, data):
+        session = cls(data.get("state", STATE_GENERAL))
+        session.order = OrderDetails.from_dict(data.get("order", {}))
+        session.last_inquired_item_id = data.get("last_inquired_item_id")
+        return session
+
 # --- Storage Global Context ---
-user_contexts = {}
+user_contexts = SessionStore(CONTEXT_EXPIRY_MINUTES * 60, max_sessions=MAX_SESSIONS)
 
 def get_user_state(user_id):
     """
     Mendapatkan state user saat ini dengan validasi expiry
     Returns: STATE_GENERAL jika expired atau tidak ada
     """
-    if user_id in user_contexts:
-        context_data = user_contexts[user_id]
-        if 'timestamp' in context_data and \
-           (datetime.now() - context_data['timestamp'] < timedelta(minutes=CONTEXT_EXPIRY_MINUTES)):
-            return context_data.get('state', STATE_GENERAL)
-        else: 
-            logger.info(f"Konteks untuk user {user_id} kadaluarsa. Dihapus.")
-            if user_id in user_contexts: 
-                del user_contexts[user_id] 
-            return STATE_GENERAL
+    session = user_contexts.get(user_id) # Sesi kadaluarsa otomatis dihapus oleh store
+    if session is not None:
+        return session.state
     return STATE_GENERAL
 
 def set_user_state(user_id, state):
     """
     Mengatur state user dan menginisialisasi struktur data context
     """
-    now = datetime.now()
-    if user_id not in user_contexts or \
-       (now - user_contexts[user_id].get('timestamp', datetime.min) >= timedelta(minutes=CONTEXT_EXPIRY_MINUTES)):
+    session = user_contexts.get(user_id)
+    if session is None:
         # Inisialisasi context baru
-        user_contexts[user_id] = {
-            'state': state,
-            'order_details': {
-                'items': [], 
-                'current_item_to_add_data': None, 
-                'dining_option': None,
-                'takeout_type': None,
-                'payment_method': None,
-                'total_price': 0,
-                'order_id': None
-            },
-            'last_inquired_item_data': None, 
-            'timestamp': now
-        }
-        logger.info(f"Konteks baru diinisialisasi untuk user {user_id}. State: {state}")
+        user_contexts[user_id] = Session(state)
+        logger.info("Konteks baru diinisialisasi untuk user %s. State: %s", user_id, state)
     else:
         # Update state existing context
-        user_contexts[user_id]['state'] = state
-        user_contexts[user_id]['timestamp'] = now
+        session.state = state
+        user_contexts.touch(user_id)
     
-    logger.info(f"State untuk user {user_id} diatur ke {state}.")
+    logger.info("State untuk user %s diatur ke %s.", user_id, state)
 
 def get_order_details(user_id):
     """
     Mendapatkan detail pesanan user dengan validasi
-    Returns: dict order_details atau {} jika tidak valid
-    """
-    if user_id in user_contexts and get_user_state(user_id) != STATE_GENERAL:
-        # Inisialisasi order_details jika tidak ada (safety check)
-        if 'order_details' not in user_contexts[user_id]:
-             user_contexts[user_id]['order_details'] = {
-                'items': [], 'current_item_to_add_data': None, 'dining_option': None,
-                'takeout_type': None, 'payment_method': None, 'total_price': 0, 'order_id': None
-            }
-        return user_contexts[user_id].get('order_details', {})
-    return {}
+    Returns: OrderDetails atau None jika tidak valid (tidak ada sesi / state GENERAL)
+    """
+    session = user_contexts.get(user_id)
+    if session is not None and session.state != STATE_GENERAL:
+        return session.order
+    return None
 
 def set_current_item_to_add(user_id, item_data):
     """
     Menyimpan item yang akan ditambahkan ke pesanan (menunggu input quantity)
     """
-    if user_id in user_contexts:
-        # Pastikan order_details ada
-        if 'order_details' not in user_contexts[user_id]:
-             user_contexts[user_id]['order_details'] = {
-                'items': [], 'current_item_to_add_data': None, 'dining_option': None,
-                'takeout_type': None, 'payment_method': None, 'total_price': 0, 'order_id': None
-            }
-        user_contexts[user_id]['order_details']['current_item_to_add_data'] = item_data
-        user_contexts[user_id]['timestamp'] = datetime.now() 
-        logger.info(f"User {user_id}: Item '{item_data['nama']}' disiapkan untuk penambahan kuantitas.")
+    session = user_contexts.get(user_id)
+    if session is not None:
+        session.order.current_item_id = item_data['id']
+        user_contexts.touch(user_id) 
+        logger.info("User %s: Item '%s' disiapkan untuk penambahan kuantitas.", user_id, item_data['nama'])
+
+def get_current_item_to_add(user_id):
+    """
+    Mendapatkan data menu item yang sedang menunggu input quantity
+    Returns: dict item menu atau None (tidak ada, atau item sudah dihapus dari menu)
+    """
+    order_details = get_order_details(user_id)
+    if order_details is None or not order_details.current_item_id:
+        return None
+    item_data, _ = get_item_by_id(order_details.current_item_id)
+    return item_data
 
 def add_item_to_current_order(user_id, quantity):
     """
     Menambahkan item dengan quantity ke pesanan saat ini
     Returns: True jika berhasil, False jika gagal
     """
-    if user_id not in user_contexts:
-        logger.warning(f"User {user_id} tidak memiliki konteks saat mencoba menambah item.")
-        return False
-        
-    order_details = user_contexts[user_id].get('order_details')
-    if not order_details:
-        logger.error(f"User {user_id}: 'order_details' tidak ada di konteks saat add_item_to_current_order.")
+    session = user_contexts.get(user_id)
+    if session is None:
+        logger.warning("User %s tidak memiliki konteks saat mencoba menambah item.", user_id)
         return False
 
-    item_to_add_data = order_details.get('current_item_to_add_data')
+    order_details = session.order
+    item_to_add_data = get_current_item_to_add(user_id)
     if not item_to_add_data:
-        logger.warning(f"User {user_id}: Tidak ada 'current_item_to_add_data' saat menambah kuantitas.")
+        logger.warning("User %s: Tidak ada item yang menunggu kuantitas saat menambah item.", user_id)
         return False
 
     # Cek apakah item sudah ada di pesanan, jika ya tambah quantity
-    found = False
-    if 'items' not in order_details: 
-        order_details['items'] = []
-
-    for item_in_order in order_details['items']:
-        if item_in_order['item_data']['id'] == item_to_add_data['id']:
-            item_in_order['quantity'] += int(quantity)
-            found = True
-            break
-    
-    if not found:
-        order_details['items'].append({'item_data': item_to_add_data, 'quantity': int(quantity)})
+    line = order_details.find_line(item_to_add_data['id'])
+    if line is not None:
+        line.quantity += int(quantity)
+    else:
+        # Harga dicatat saat item masuk keranjang
+        order_details.items.append(
+            OrderLine(item_to_add_data['id'], item_to_add_data['nama'], item_to_add_data['harga'], int(quantity))
+        )
     
-    # Reset current_item_to_add setelah berhasil ditambahkan
-    order_details['current_item_to_add_data'] = None 
-    user_contexts[user_id]['timestamp'] = datetime.now()
+    # Reset current item setelah berhasil ditambahkan
+    order_details.current_item_id = None 
+    user_contexts.touch(user_id)
     calculate_total_price(user_id)
-    logger.info(f"User {user_id}: Item '{item_to_add_data['nama']}' x{quantity} berhasil ditambahkan/diupdate ke pesanan.")
+    logger.info("User %s: Item '%s' x%s berhasil ditambahkan/diupdate ke pesanan.", user_id, item_to_add_data['nama'], quantity)
     return True
 
 def calculate_total_price(user_id):
@@ -146,63 +346,58 @@ def calculate_total_price(user_id):
     Returns: total price atau 0 jika tidak ada item
     """
     order_details = get_order_details(user_id)
-    if order_details and order_details.get('items'):
-        total = sum(item['item_data']['harga'] * item['quantity'] for item in order_details['items'])
-        if user_id in user_contexts and 'order_details' in user_contexts[user_id]:
-            user_contexts[user_id]['order_details']['total_price'] = total
-            logger.info(f"User {user_id}: Total harga pesanan dihitung Rp{total:,}")
-            return total
+    if order_details and order_details.items:
+        total = sum(line.subtotal for line in order_details.items)
+        order_details.total_price = total
+        user_contexts.mark_changed(user_id)
+        logger.info("User %s: Total harga pesanan dihitung Rp%d", user_id, total)
+        return total
     return 0
 
-def generate_order_id(user_id):
+async def generate_order_id(user_id):
     """
-    Generate ID unik untuk pesanan
-    Format: KC[YYMMDD]-[4digit_user][2hex_random]
+    Generate ID unik untuk pesanan (unik antar proses bot, lihat modules/order_ids.py)
+    Format: KC[YYMMDD]-[nomor urut harian], contoh KC261018-0042
     """
-    now = datetime.now()
-    user_part = str(user_id)[-4:] 
-    random_part = str(os.urandom(2).hex().upper())
-    return f"KC{now.strftime('%y%m%d')}-{user_part}{random_part}"
+    return await order_id_allocator.allocate_async()
 
 def reset_order_details(user_id):
     """
     Membersihkan detail pesanan setelah selesai atau dibatalkan
     """
-    if user_id in user_contexts and 'order_details' in user_contexts[user_id]:
-        user_contexts[user_id]['order_details'] = {
-            'items': [], 
-            'current_item_to_add_data': None,
-            'dining_option': None,
-            'takeout_type': None,
-            'payment_method': None,
-            'total_price': 0,
-            'order_id': None
-        }
-        logger.info(f"Order details untuk user {user_id} telah direset.")
+    session = user_contexts.get(user_id)
+    if session is not None:
+        session.order = OrderDetails()
+        user_contexts.mark_changed(user_id)
+        logger.info("Order details untuk user %s telah direset.", user_id)
 
 def set_last_inquired_item(user_id, item_data):
     """
     Menyimpan item terakhir yang ditanyakan user (untuk referensi 'itu', 'yang tadi', dll)
     """
-    if user_id in user_contexts:
-        user_contexts[user_id]['last_inquired_item_data'] = item_data
-        user_contexts[user_id]['timestamp'] = datetime.now()
-        logger.info(f"User {user_id}: Last inquired item set to '{item_data['nama']}'")
+    session = user_contexts.get(user_id)
+    if session is not None:
+        session.last_inquired_item_id = item_data['id']
+        user_contexts.touch(user_id)
+        logger.info("User %s: Last inquired item set to '%s'", user_id, item_data['nama'])
 
 def get_last_inquired_item(user_id):
     """
     Mendapatkan item terakhir yang ditanyakan user dengan validasi expiry
+    Returns: dict item menu atau None
     """
-    if user_id in user_contexts and user_contexts[user_id].get('last_inquired_item_data'):
-        if (datetime.now() - user_contexts[user_id].get('timestamp', datetime.min) < timedelta(minutes=CONTEXT_EXPIRY_MINUTES)):
-            return user_contexts[user_id]['last_inquired_item_data']
+    session = user_contexts.get(user_id)
+    if session is not None and session.last_inquired_item_id:
+        item_data, _ = get_item_by_id(session.last_inquired_item_id)
+        return item_data
     return None
 
 def update_order_field(user_id, field_name, value):
     """
     Update field tertentu di order_details
     """
-    if user_id in user_contexts and 'order_details' in user_contexts[user_id]:
-        user_contexts[user_id]['order_details'][field_name] = value
-        user_contexts[user_id]['timestamp'] = datetime.now()
-        logger.info(f"User {user_id}: Order field '{field_name}' updated to '{value}'")
+    session = user_contexts.get(user_id)
+    if session is not None:
+        setattr(session.order, field_name, value)
+        user_contexts.touch(user_id)
+        logger.info("User %s: Order field '%s' updated to '%s'", user_id, field_name, value)
@@ -0,0 +1,214 @@
+"""
+Module webhook server lokal untuk menerima update Telegram via HTTP POST
+Alternatif run_polling: update JSON diterima, dideduplikasi berdasarkan update_id,
+langsung di-ACK (200), lalu diproses secara asynchronous
+
+Replay update yang direkam (satu JSON per baris) ke server lokal:
+    python -m bot.webhook_server updates.jsonl --url http://127.0.0.1:8443/telegram
+"""
+import argparse
+import asyncio
+import hmac
+import json
+import logging
+import os
+import sys
+import urllib.error
+import urllib.request
+from collections import OrderedDict
+
+logger = logging.getLogger(__name__)
+
+WEBHOOK_HOST = os.environ.get("WEBHOOK_HOST", "127.0.0.1")
+WEBHOOK_PORT = int(os.environ.get("WEBHOOK_PORT", "8443"))
+WEBHOOK_PATH = os.environ.get("WEBHOOK_PATH", "/telegram")
+WEBHOOK_SECRET = os.environ.get("WEBHOOK_SECRET", "")
+DEDUP_WINDOW = 10_000 # Jumlah update_id terakhir yang diingat untuk deduplikasi retry
+MAX_BODY_BYTES = int(os.environ.get("WEBHOOK_MAX_BODY_BYTES", str(1024 * 1024)))
+MAX_HEADER_COUNT = 64
+SECRET_HEADER = "x-telegram-bot-api-secret-token"
+
+_STATUS_TEXT = {200: "OK", 400: "Bad Request", 403: "Forbidden", 404: "Not Found", 405: "Method Not Allowed", 413: "Payload Too Large"}
+
+
+class WebhookServer:
+    """HTTP server minimal (asyncio) untuk endpoint webhook Telegram."""
+
+    def __init__(self, on_update, host=WEBHOOK_HOST, port=WEBHOOK_PORT, path=WEBHOOK_PATH,
+                 secret_token=WEBHOOK_SECRET, dedup_window=DEDUP_WINDOW):
+        self.on_update = on_update # coroutine function(dict update)
+        self.host = host
+        self.port = port
+        self.path = path
+        self.secret_token = secret_token
+        self.dedup_window = dedup_window
+        self._seen_update_ids = OrderedDict()
+        self._pending_tasks = set()
+        self._server = None
+        self.stats = {"received": 0, "duplicates": 0, "processed": 0, "failed": 0}
+
+    async def start(self):
+        self._server = await asyncio.start_server(self._handle_connection, self.host, self.port)
+        # Port 0 berarti port acak; simpan port yang benar-benar dipakai
+        self.port = self._server.sockets[0].getsockname()[1]
+        logger.info("Webhook server mendengarkan di http://%s:%s%s", self.host, self.port, self.path)
+
+    async def serve_forever(self):
+        await self._server.serve_forever()
+
+    async def stop(self):
+        if self._server:
+            self._server.close()
+            await self._server.wait_closed()
+        if self._pending_tasks:
+            await asyncio.gather(*self._pending_tasks, return_exceptions=True)
+
+    def _is_duplicate(self, update_id):
+        if update_id in self._seen_update_ids:
+            return True
+        self._seen_update_ids[update_id] = None
+        if len(self._seen_update_ids) > self.dedup_window:
+            self._seen_update_ids.popitem(last=False)
+        return False
+
+    async def _process(self, update_data):
+        try:
+            await self.on_update(update_data)
+            self.stats["processed"] += 1
+        except Exception as e:
+            self.stats["failed"] += 1
+            logger.error("Error memproses update %s: %s", update_data.get('update_id'), e)
+
+    def _accept(self, body):
+        """Validasi body dan jadwalkan pemrosesan. Returns: status HTTP."""
+        try:
+            update_data = json.loads(body)
+        except (json.JSONDecodeError, UnicodeDecodeError):
+            return 400
+        if not isinstance(update_data, dict) or "update_id" not in update_data:
+            return 400
+
+        self.stats["received"] += 1
+        if self._is_duplicate(update_data["update_id"]):
+            # Telegram mengirim ulang jika ACK terlambat; cukup ACK lagi tanpa diproses
+            self.stats["duplicates"] += 1
+            return 200
+
+        task = asyncio.create_task(self._process(update_data))
+        self._pending_tasks.add(task)
+        task.add_done_callback(self._pending_tasks.discard)
+        return 200
+
+    async def _handle_connection(self, reader, writer):
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line:
+                    break
+                try:
+                    method, target, _ = request_line.decode("latin-1").split(" ", 2)
+                except ValueError:
+                    await self._respond(writer, 400, keep_alive=False)
+                    break
+
+                headers = await self._read_headers(reader)
+                if headers is None:
+                    await self._respond(writer, 400, keep_alive=False)
+                    break
+
+                # Body hanya dibaca lewat Content-Length; chunked tidak didukung
+                try:
+                    content_length = int(headers.get("content-length", "0") or 0)
+                except ValueError:
+                    content_length = -1
+                if content_length < 0 or "transfer-encoding" in headers:
+                    await self._respond(writer, 400, keep_alive=False)
+                    break
+                if content_length > MAX_BODY_BYTES:
+                    await self._respond(writer, 413, keep_alive=False)
+                    break
+                body = await reader.readexactly(content_length) if content_length else b""
+                keep_alive = headers.get("connection", "").lower() != "close"
+
+                if target.split("?", 1)[0] != self.path:
+                    status = 404
+                elif method != "POST":
+                    status = 405
+                elif self.secret_token and not self._secret_matches(headers.get(SECRET_HEADER, "")):
+                    status = 403
+                else:
+                    status = self._accept(body)
+
+                await self._respond(writer, status, keep_alive)
+                if not keep_alive:
+                    break
+        except (asyncio.IncompleteReadError, asyncio.LimitOverrunError, ValueError, ConnectionError):
+            # ValueError: baris request/header melebihi batas buffer StreamReader
+            pass
+        finally:
+            writer.close()
+
+    @staticmethod
+    async def _read_headers(reader):
+        """Header request (nama lowercase). Returns: None jika jumlah header melebihi batas."""
+        headers = {}
+        while True:
+            line = await reader.readline()
+            if line in (b"\r\n", b"\n", b""):
+                return headers
+            if len(headers) >= MAX_HEADER_COUNT:
+                return None
+            name, _, value = line.decode("latin-1").partition(":")
+            headers[name.strip().lower()] = value.strip()
+
+    def _secret_matches(self, received):
+        # Perbandingan waktu konstan agar token tidak bisa ditebak lewat timing
+        return hmac.compare_digest(received.encode("latin-1"), self.secret_token.encode("utf-8"))
+
+    @staticmethod
+    async def _respond(writer, status, keep_alive):
+        writer.write(
+            f"HTTP/1.1 {status} {_STATUS_TEXT.get(status, '')}\r\n"
+            f"Content-Length: 0\r\n"
+            f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n".encode("latin-1")
+        )
+        await writer.drain()
+
+
+def post_update(url, update_data, secret_token=WEBHOOK_SECRET, timeout=5):
+    """POST satu update JSON ke webhook (dipakai untuk replay/testing offline)."""
+    request = urllib.request.Request(
+        url, data=json.dumps(update_data).encode("utf-8"), method="POST",
+        headers={"Content-Type": "application/json"}
+    )
+    if secret_token:
+        request.add_header("X-Telegram-Bot-Api-Secret-Token", secret_token)
+    try:
+        with urllib.request.urlopen(request, timeout=timeout) as response:
+            return response.status
+    except urllib.error.HTTPError as e:
+        # Status 4xx/5xx dilempar sebagai exception oleh urllib; kembalikan kodenya
+        e.close()
+        return e.code
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Replay update Telegram yang direkam ke webhook lokal")
+    parser.add_argument("updates_file", help="File JSONL berisi satu update Telegram per baris")
+    parser.add_argument("--url", default=f"http://{WEBHOOK_HOST}:{WEBHOOK_PORT}{WEBHOOK_PATH}")
+    parser.add_argument("--secret", default=WEBHOOK_SECRET)
+    args = parser.parse_args()
+
+    sent = 0
+    with open(args.updates_file, encoding="utf-8") as f:
+        for line in f:
+            if line.strip():
+                status = post_update(args.url, json.loads(line), args.secret)
+                sent += 1
+                if status != 200:
+                    print(f"Update ke-{sent} ditolak dengan status {status}", file=sys.stderr)
+    print(f"{sent} update dikirim ke {args.url}")
+
+
+if __name__ == "__main__":
+    main()
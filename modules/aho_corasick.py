@@ -0,0 +1,70 @@
+# modules/aho_corasick.py
+"""
+Automaton Aho-Corasick sederhana untuk pencocokan banyak pola sekaligus.
+Dipakai oleh NLP bot (keyword intent) dan indeks nama menu supaya satu
+kali scan teks cukup untuk menemukan semua pola yang muncul.
+"""
+from collections import deque
+
+
+class AhoCorasick:
+    """Automaton multi-pattern yang dibangun sekali lalu dipakai berulang kali."""
+
+    def __init__(self, patterns=()):
+        # Node 0 adalah root. Tiap node: transisi karakter, failure link, dan output.
+        self._goto = [{}]
+        self._fail = [0]
+        self._output = [[]]
+        self._size = 0
+        for pattern, payload in patterns:
+            self._add(pattern, payload)
+        self._build_failure_links()
+
+    def __len__(self):
+        return self._size
+
+    def _add(self, pattern, payload):
+        if not pattern:
+            return
+        node = 0
+        for char in pattern:
+            next_node = self._goto[node].get(char)
+            if next_node is None:
+                next_node = len(self._goto)
+                self._goto[node][char] = next_node
+                self._goto.append({})
+                self._fail.append(0)
+                self._output.append([])
+            node = next_node
+        self._output[node].append((len(pattern), payload))
+        self._size += 1
+
+    def _build_failure_links(self):
+        queue = deque(self._goto[0].values())
+        while queue:
+            node = queue.popleft()
+            for char, child in self._goto[node].items():
+                queue.append(child)
+                fallback = self._fail[node]
+                while fallback and char not in self._goto[fallback]:
+                    fallback = self._fail[fallback]
+                target = self._goto[fallback].get(char, 0)
+                self._fail[child] = target if target != child else 0
+                # Gabungkan output dari failure link agar tidak perlu ditelusuri saat scan
+                if self._output[self._fail[child]]:
+                    self._output[child] = self._output[child] + self._output[self._fail[child]]
+
+    def iter_matches(self, text):
+        """Menghasilkan (start, end, payload) untuk setiap kemunculan pola di teks."""
+        goto = self._goto
+        fail = self._fail
+        output = self._output
+        node = 0
+        for index, char in enumerate(text):
+            while node and char not in goto[node]:
+                node = fail[node]
+            node = goto[node].get(char, 0)
+            if output[node]:
+                end = index + 1
+                for length, payload in output[node]:
+                    yield end - length, end, payload
@@ -0,0 +1,247 @@
+# modules/fuzzy_index.py
+"""
+Indeks fuzzy untuk nama menu yang salah ketik ("almond croisant", "kroisan almond", "croisant").
+Pesan dipecah menjadi jendela beberapa kata berurutan yang dicocokkan ke nama menu,
+bukan seluruh kalimat. Kandidat diambil lewat inverted index trigram karakter (trigram
+yang terlalu umum tidak diindeks agar posting list tetap pendek), disaring dengan batas
+jumlah trigram yang sama, lalu diurutkan dengan edit distance. Kata di jendela dan di
+nama diurutkan dulu, jadi urutan kata yang tertukar tetap cocok. Kata yang khas untuk
+satu-dua nama ("croissant", "karla") juga diindeks sebagai alias, dengan prioritas di
+bawah kecocokan nama lengkap. Untuk memilih item secara otomatis (best_match), hanya
+kecocokan nama lengkap yang jelas unggul dari kandidat berikutnya yang dipakai.
+"""
+import heapq
+from collections import Counter
+from itertools import chain
+
+NGRAM_SIZE = 3
+DEFAULT_MIN_SCORE = 0.75
+MIN_NAME_LENGTH = 4 # Nama/jendela yang terlalu pendek rawan false positive
+MAX_CANDIDATES = 5 # Jumlah kandidat per jendela yang dihitung edit distance-nya
+MAX_WINDOW_TOKENS = 6
+MAX_POSTING_LENGTH = 16 # Trigram yang muncul di lebih banyak nama tidak diindeks
+MIN_ALIAS_LENGTH = 5
+MAX_ALIAS_NAMES = 2 # Kata yang muncul di lebih banyak nama tidak cukup khas untuk jadi alias
+MIN_SCORE_MARGIN = 0.05 # Selisih skor minimum agar kandidat teratas dianggap jelas unggul
+
+
+def char_ngrams(text, size=NGRAM_SIZE):
+    """Himpunan n-gram karakter dari teks."""
+    if len(text) < size:
+        return {text} if text else set()
+    return {text[i:i + size] for i in range(len(text) - size + 1)}
+
+
+def edit_distance(a, b, max_distance=None):
+    """
+    Levenshtein distance antara a dan b. Jika max_distance diberikan, hanya pita
+    diagonal selebar itu yang dihitung dan hasilnya max_distance + 1 begitu batas
+    itu pasti terlewati.
+    """
+    # Awalan dan akhiran yang sama tidak mengubah jarak; buang sebelum DP
+    start = 0
+    while start < len(a) and start < len(b) and a[start] == b[start]:
+        start += 1
+    end_a, end_b = len(a), len(b)
+    while end_a > start and end_b > start and a[end_a - 1] == b[end_b - 1]:
+        end_a -= 1
+        end_b -= 1
+    a, b = a[start:end_a], b[start:end_b]
+
+    if len(a) < len(b):
+        a, b = b, a
+    if max_distance is None:
+        max_distance = len(a)
+    too_far = max_distance + 1
+    if len(a) - len(b) > max_distance:
+        return too_far
+    previous = [j if j <= max_distance else too_far for j in range(len(b) + 1)]
+    for i, a_char in enumerate(a, start=1):
+        current = [too_far] * (len(b) + 1)
+        current[0] = row_min = i if i <= max_distance else too_far
+        for j in range(max(1, i - max_distance), min(len(b), i + max_distance) + 1):
+            # Perbandingan langsung; min() dengan 3 argumen jauh lebih lambat di loop ini
+            value = previous[j - 1] + (a_char != b[j - 1])
+            if previous[j] < value:
+                value = previous[j] + 1
+            if current[j - 1] < value:
+                value = current[j - 1] + 1
+            current[j] = value
+            if value < row_min:
+                row_min = value
+        if row_min > max_distance:
+            return too_far
+        previous = current
+    return previous[-1]
+
+
+def _sorted_tokens(tokens):
+    return " ".join(sorted(tokens))
+
+
+class FuzzyNameIndex:
+    """Inverted index trigram atas nama (dan alias) yang sudah dinormalisasi."""
+
+    def __init__(self, entries, version=None):
+        self.version = version
+        self.vocabulary = set() # Semua kata di nama menu; tidak pernah dianggap kata pengisi
+        self._keys = [] # Nama/alias dengan kata terurut
+        self._payloads = []
+        self._is_alias = []
+        self.max_window_tokens = 1
+
+        token_owners = {}
+        for name, payload in entries:
+            if len(name) < MIN_NAME_LENGTH:
+                continue
+            tokens = name.split()
+            self.vocabulary.update(tokens)
+            self.max_window_tokens = min(MAX_WINDOW_TOKENS, max(self.max_window_tokens, len(tokens)))
+            self._add(_sorted_tokens(tokens), payload, is_alias=False)
+            if len(tokens) > 1:
+                for token in set(tokens):
+                    token_owners.setdefault(token, []).append(payload)
+
+        for token, owners in token_owners.items():
+            if len(token) >= MIN_ALIAS_LENGTH and len(owners) <= MAX_ALIAS_NAMES:
+                for payload in owners:
+                    self._add(token, payload, is_alias=True)
+
+        postings = {}
+        for entry_id, key in enumerate(self._keys):
+            for gram in char_ngrams(key):
+                postings.setdefault(gram, []).append(entry_id)
+        self._key_lengths = [len(key) for key in self._keys]
+        self._postings = {gram: ids for gram, ids in postings.items() if len(ids) <= MAX_POSTING_LENGTH}
+        self._common_grams = {gram for gram, ids in postings.items() if len(ids) > MAX_POSTING_LENGTH}
+        # Per entry hanya trigram umum yang disimpan (kecil), untuk menghitung batas bawah yang ketat
+        self._key_common_grams = [char_ngrams(key) & self._common_grams for key in self._keys]
+
+    def _add(self, key, payload, is_alias):
+        self._keys.append(key)
+        self._payloads.append(payload)
+        self._is_alias.append(is_alias)
+
+    def __len__(self):
+        return sum(1 for is_alias in self._is_alias if not is_alias)
+
+    def _windows(self, query, ignore_words):
+        """
+        Jendela kata dari query. Angka dan kata pengisi (ignore_words) yang bukan bagian
+        nama menu memutus jendela, jadi pesan tanpa kata mirip nama item tidak dicari sama sekali.
+        """
+        runs = []
+        run = []
+        for token in query.split():
+            if token.isdigit() or (token in ignore_words and token not in self.vocabulary):
+                if run:
+                    runs.append(run)
+                    run = []
+            else:
+                run.append(token)
+        if run:
+            runs.append(run)
+
+        windows = set()
+        for run in runs:
+            for size in range(1, min(self.max_window_tokens, len(run)) + 1):
+                for start in range(len(run) - size + 1):
+                    window = _sorted_tokens(run[start:start + size])
+                    if len(window) >= MIN_NAME_LENGTH:
+                        windows.add(window)
+        return windows
+
+    def _candidate_pairs(self, window, min_score):
+        """
+        Kandidat (peringkat optimistis, entry, jendela, max_distance) untuk satu jendela.
+        Batas bawah edit distance dari lemma q-gram: d edit menghapus paling banyak
+        NGRAM_SIZE * d trigram, jadi skor maksimum bisa diketahui tanpa edit distance.
+        """
+        grams = char_ngrams(window)
+        postings = self._postings
+        overlap = Counter(chain.from_iterable(postings[gram] for gram in grams if gram in postings))
+        if not overlap:
+            return []
+        # Trigram umum tidak diindeks; anggap cocok supaya batas bawah tetap aman
+        window_common_grams = grams & self._common_grams
+        common_count = len(window_common_grams)
+
+        window_length = len(window)
+        max_ratio = 1 - min_score + 1e-9
+        key_lengths = self._key_lengths
+        candidates = []
+        for entry_id, shared in overlap.items():
+            key_length = key_lengths[entry_id]
+            longest = key_length if key_length > window_length else window_length
+            max_distance = int(longest * max_ratio)
+            length_gap = abs(key_length - window_length)
+            missing_grams = longest - NGRAM_SIZE + 1 - shared - common_count
+            if length_gap > max_distance or missing_grams > NGRAM_SIZE * max_distance:
+                continue
+            if common_count:
+                # Hitung ulang dengan trigram umum yang benar-benar sama untuk batas yang lebih ketat
+                missing_grams += common_count - len(window_common_grams & self._key_common_grams[entry_id])
+                if missing_grams > NGRAM_SIZE * max_distance:
+                    continue
+            lower_bound = max(length_gap, -(-missing_grams // NGRAM_SIZE))
+            best_rank = (self._is_alias[entry_id], -(1 - lower_bound / longest) * key_length)
+            candidates.append((best_rank, entry_id, window, max_distance))
+        return heapq.nsmallest(MAX_CANDIDATES, candidates)
+
+    def search(self, query, limit=5, min_score=DEFAULT_MIN_SCORE, ignore_words=frozenset()):
+        """
+        Mencari nama yang mirip dengan jendela kata mana pun dari query.
+        Returns: list (payload, score 0..1). Kecocokan nama lengkap lebih dulu, lalu
+        yang menutup teks terpanjang (skor x panjang nama), supaya jendela pendek
+        yang kebetulan mirip nama lain tidak mengalahkan nama yang disebut utuh.
+        """
+        ranked = self._ranked(query, limit, min_score, ignore_words)
+        return [(payload, score) for _, payload, score in ranked]
+
+    def best_match(self, query, min_score=DEFAULT_MIN_SCORE, ignore_words=frozenset(), min_margin=MIN_SCORE_MARGIN):
+        """
+        Satu payload yang boleh dipilih otomatis, atau None jika ragu: cocok hanya lewat
+        alias ("matcha" untuk beberapa item matcha, "manis") atau kandidat berikutnya
+        (nama lengkap) skornya berselisih kurang dari min_margin.
+        """
+        ranked = self._ranked(query, 2, min_score, ignore_words)
+        if not ranked:
+            return None
+        (is_alias, _, _), payload, score = ranked[0]
+        if is_alias:
+            return None
+        if len(ranked) > 1:
+            (runner_up_is_alias, _, _), _, runner_up_score = ranked[1]
+            if not runner_up_is_alias and score - runner_up_score < min_margin:
+                return None
+        return payload
+
+    def _ranked(self, query, limit, min_score, ignore_words):
+        """Hasil teratas sebagai (peringkat, payload, skor); peringkat = (alias?, -skor x panjang, id)."""
+        if not query:
+            return []
+
+        candidates = []
+        for window in self._windows(query, ignore_words):
+            candidates.extend(self._candidate_pairs(window, min_score))
+        candidates.sort()
+
+        # Kandidat dievaluasi dari peringkat optimistis terbaik; berhenti begitu
+        # peringkat optimistisnya tidak bisa lagi masuk `limit` hasil teratas
+        payload_results = {} # id(payload) -> (peringkat, payload, skor)
+        for best_rank, entry_id, window, max_distance in candidates:
+            if len(payload_results) >= limit and \
+               best_rank >= sorted(result[0] for result in payload_results.values())[limit - 1]:
+                break
+            key = self._keys[entry_id]
+            distance = edit_distance(key, window, max_distance=max_distance)
+            if distance > max_distance:
+                continue
+            score = 1 - distance / max(len(key), len(window))
+            rank = (self._is_alias[entry_id], -score * len(key), entry_id)
+            payload = self._payloads[entry_id]
+            previous = payload_results.get(id(payload))
+            if previous is None or rank < previous[0]:
+                payload_results[id(payload)] = (rank, payload, score)
+
+        return sorted(payload_results.values(), key=lambda result: result[0])[:limit]
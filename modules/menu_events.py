@@ -0,0 +1,98 @@
+# modules/menu_events.py
+"""
+Notifikasi perubahan menu antar proses (dashboard -> bot).
+Setiap mutasi di menu_manager menulis token versi baru ke file kecil di
+folder data; bot mem-polling stat file tersebut dan hanya me-reload menu
+ketika token berubah, sehingga hot path tidak perlu revalidasi sendiri.
+Signature storage menu juga di-polling, jadi menu_data.json yang diedit langsung
+(tanpa lewat menu_manager) tetap terdeteksi.
+"""
+import asyncio
+import inspect
+import logging
+import os
+import time
+
+logger = logging.getLogger(__name__)
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+VERSION_FILE_PATH = os.path.join(BASE_DIR, 'data', 'menu_data.version')
+DEFAULT_POLL_INTERVAL = float(os.environ.get("MENU_WATCH_INTERVAL", "1.0"))
+
+
+def publish_menu_change(path=VERSION_FILE_PATH):
+    """Menulis token versi baru (atomic rename) agar proses lain tahu menu berubah."""
+    token = f"{time.time_ns()} {os.getpid()}"
+    tmp_path = f"{path}.tmp"
+    try:
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            f.write(token)
+        os.replace(tmp_path, path)
+    except OSError as e:
+        logger.warning("Gagal mempublikasikan perubahan menu: %s", e)
+        return None
+    return token
+
+
+def _version_signature(path):
+    try:
+        stat_result = os.stat(path)
+    except OSError:
+        return None
+    return (stat_result.st_mtime_ns, stat_result.st_size, stat_result.st_ino)
+
+
+class MenuChangeWatcher:
+    """
+    Polling watcher untuk file versi menu; memanggil on_change saat token berubah.
+    storage_signature: callable opsional (misalnya menu_manager.get_storage_signature)
+    yang perubahannya juga memicu on_change.
+    """
+
+    def __init__(self, on_change, path=VERSION_FILE_PATH, interval=DEFAULT_POLL_INTERVAL, storage_signature=None):
+        self.on_change = on_change
+        self.path = path
+        self.interval = interval
+        self.storage_signature = storage_signature
+        self._last_signature = self._signature()
+        self.notifications = 0
+
+    def _signature(self):
+        version_signature = _version_signature(self.path)
+        if self.storage_signature is None:
+            return version_signature
+        return (version_signature, self.storage_signature())
+
+    def _changed(self):
+        signature = self._signature()
+        if signature == self._last_signature:
+            return False
+        self._last_signature = signature
+        self.notifications += 1
+        return True
+
+    def check(self):
+        """Cek sekali; return True jika ada perubahan dan on_change sudah dipanggil."""
+        if not self._changed():
+            return False
+        self.on_change()
+        return True
+
+    async def check_async(self):
+        """Seperti check, tetapi on_change boleh coroutine function (misalnya reload di thread)."""
+        if not self._changed():
+            return False
+        result = self.on_change()
+        if inspect.isawaitable(result):
+            await result
+        return True
+
+    async def run(self):
+        """Loop polling untuk dijalankan sebagai asyncio task."""
+        logger.info("Memantau perubahan menu di %s (interval %ss)", self.path, self.interval)
+        while True:
+            await asyncio.sleep(self.interval)
+            try:
+                await self.check_async()
+            except Exception as e:
+                logger.error("Error saat memproses notifikasi perubahan menu: %s", e)
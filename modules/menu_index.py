@@ -0,0 +1,56 @@
+# modules/menu_index.py
+"""
+Indeks entitas nama menu untuk ekstraksi item dari pesan pengguna.
+Dibangun sekali per versi menu (lihat menu_manager.get_entity_index),
+sehingga lookup hanya sebanding dengan panjang pesan, bukan jumlah item.
+"""
+import re
+
+from modules.aho_corasick import AhoCorasick
+
+
+def normalize_text(text):
+    """Lowercase, hapus tanda baca, dan trim whitespace."""
+    if not text:
+        return ""
+    text = text.lower()
+    text = re.sub(r'[^\w\s]', '', text)
+    return text.strip()
+
+
+class MenuEntityIndex:
+    """
+    Indeks longest-match atas nama item yang sudah dinormalisasi.
+    Jika beberapa nama muncul di pesan, item dengan nama terpanjang menang;
+    seri diputuskan berdasarkan urutan kategori lalu urutan item di menu.
+    """
+
+    def __init__(self, menu, categories, version=None):
+        self.version = version
+        all_items = []
+        for category in categories:
+            if menu.get(category):
+                all_items.extend(menu[category])
+
+        # sorted() stabil, jadi urutan kategori/item tetap dipakai sebagai tie-breaker
+        ranked_items = sorted(all_items, key=lambda x: len(x.get("nama", "")), reverse=True)
+        self._items = ranked_items
+        self._names = [normalize_text(item.get("nama", "")) for item in ranked_items]
+        self._automaton = AhoCorasick((name, priority) for priority, name in enumerate(self._names))
+
+    def __len__(self):
+        return len(self._automaton)
+
+    def entries(self):
+        """Pasangan (nama ternormalisasi, item) sesuai urutan prioritas."""
+        return zip(self._names, self._items)
+
+    def find_best(self, processed_text):
+        """Mengembalikan item terbaik yang namanya muncul di teks (sudah dinormalisasi)."""
+        best_priority = None
+        for _, _, priority in self._automaton.iter_matches(processed_text):
+            if best_priority is None or priority < best_priority:
+                best_priority = priority
+        if best_priority is None:
+            return None
+        return self._items[best_priority]
@@ -1,50 +1,269 @@
 # modules/menu_manager.py
+import asyncio
 import json
 import os
+import sqlite3
 import uuid # Untuk generate ID unik
+from itertools import chain
+
+from modules.menu_index import MenuEntityIndex
+from modules.fuzzy_index import FuzzyNameIndex
+from modules.menu_storage import create_storage
+from modules.menu_events import publish_menu_change
 
 BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 DATA_FILE_PATH = os.path.join(BASE_DIR, 'data', 'menu_data.json')
 
+# "json" (tulis ulang snapshot utuh), "journal" (append per perubahan + compaction)
+# atau "sqlite" (database WAL bersama untuk bot dan dashboard)
+MENU_STORAGE_BACKEND = os.environ.get("MENU_STORAGE_BACKEND", "json")
+_storage = create_storage(MENU_STORAGE_BACKEND, DATA_FILE_PATH)
+
+# Kategori menu yang ditampilkan bot dan dipakai untuk ekstraksi entitas
+MENU_CATEGORIES = ["es_kopi", "non_kopi", "espresso_based", "refreshment", "others", "pastry"]
+
 _menu_cache = None
+_menu_version = 0 # Naik setiap kali menu dimuat ulang atau diubah
+_category_versions = {} # Versi per kategori, hanya naik jika isi kategori itu berubah
+_entity_index = None
+_fuzzy_index = None
+_id_index = {} # item_id -> (item, category)
+_name_index = {} # (category, nama.lower()) -> [item, ...]; nama bisa duplikat di data
+# item_id -> posisi item di list kategorinya. Hanya delete yang menggeser item ke kiri,
+# jadi posisi tersimpan selalu batas atas posisi sebenarnya dan tidak perlu dinomori ulang
+_item_positions = {}
+# Jika posisi tersimpan sudah bergeser sejauh ini, posisi seluruh kategori dinomori ulang
+POSITION_RENUMBER_DISTANCE = 64
+_file_signature = None # Signature storage (mtime_ns, size, inode) saat terakhir dimuat/disimpan
+_cache_stats = {"hits": 0, "misses": 0}
 
-def load_menu_data():
-    """Memuat data menu dari file JSON."""
-    global _menu_cache
+def _bump_menu_version(*categories):
+    global _menu_version
+    _menu_version += 1
+    for category in categories:
+        _category_versions[category] = _category_versions.get(category, 0) + 1
+
+def get_menu_version():
+    """Mengembalikan versi menu saat ini (berubah setiap reload atau CRUD)."""
+    return _menu_version
+
+def get_category_version(category):
+    """Mengembalikan versi satu kategori; tidak berubah jika kategori lain yang diedit."""
+    return _category_versions.get(category, 0)
+
+def _changed_categories(old_menu, new_menu):
+    """Kategori yang isinya berbeda antara dua versi menu (dipakai saat reload)."""
+    old_menu = old_menu or {}
+    return [key for key in set(old_menu) | set(new_menu) if old_menu.get(key) != new_menu.get(key)]
+
+def _item_categories(menu):
+    """Kategori yang berisi list item (semua key kecuali info_pemesanan)."""
+    return [key for key, value in menu.items() if key != "info_pemesanan" and isinstance(value, list)]
+
+def _index_item(item, category_key):
+    item_id = item.get("id")
+    if item_id:
+        _id_index.setdefault(item_id, (item, category_key))
+    _name_index.setdefault((category_key, item.get("nama", "").lower()), []).append(item)
+
+def _unindex_item(item, category_key):
+    item_id = item.get("id")
+    if item_id and _id_index.get(item_id, (None,))[0] is item:
+        del _id_index[item_id]
+    name_key = (category_key, item.get("nama", "").lower())
+    items = _name_index.get(name_key, [])
+    for position, indexed_item in enumerate(items):
+        if indexed_item is item:
+            del items[position]
+            break
+    if not items:
+        _name_index.pop(name_key, None)
+
+def _item_position(items, item):
+    """
+    Posisi item (berdasarkan identitas, bukan kesamaan isi) di list kategorinya.
+    Dicari mundur dari posisi tersimpan; jaraknya sebanyak delete sebelum item itu
+    sejak posisi terakhir dicatat.
+    """
+    item_id = item.get("id")
+    start = min(_item_positions.get(item_id, len(items) - 1), len(items) - 1)
+    for position in chain(range(start, -1, -1), range(start + 1, len(items))):
+        if items[position] is item:
+            if abs(start - position) > POSITION_RENUMBER_DISTANCE:
+                _renumber_positions(items)
+            elif item_id:
+                _item_positions[item_id] = position
+            return position
+    return None
+
+def _renumber_positions(items):
+    for position, item in enumerate(items):
+        item_id = item.get("id")
+        if item_id and _id_index.get(item_id, (None,))[0] is item:
+            _item_positions[item_id] = position
+
+def _build_lookup_indexes(menu):
+    """
+    Indeks id, nama, dan posisi untuk menu. Selalu membuat dict baru, jadi aman
+    dibangun di thread lain lalu dipasang sekaligus.
+    """
+    id_index, name_index, positions = {}, {}, {}
+    for category_key in _item_categories(menu):
+        for position, item in enumerate(menu[category_key]):
+            item_id = item.get("id")
+            if item_id and item_id not in id_index:
+                id_index[item_id] = (item, category_key)
+                positions[item_id] = position
+            name_index.setdefault((category_key, item.get("nama", "").lower()), []).append(item)
+    return id_index, name_index, positions
+
+def _rebuild_lookup_indexes():
+    """Membangun ulang indeks id, nama, dan posisi dari cache (dipanggil setiap load)."""
+    global _id_index, _name_index, _item_positions
+    _id_index, _name_index, _item_positions = _build_lookup_indexes(_menu_cache)
+
+def _read_storage():
+    """Membaca menu dari storage. Returns: (menu, signature storage sebelum dibaca)."""
+    # Ambil signature sebelum membaca, supaya tulisan yang terjadi setelahnya tetap terdeteksi
+    signature = _storage.signature()
     try:
-        with open(DATA_FILE_PATH, 'r', encoding='utf-8') as f:
-            _menu_cache = json.load(f)
-            return _menu_cache
+        menu = _storage.load()
     except FileNotFoundError:
         print(f"Error: File data menu tidak ditemukan di {DATA_FILE_PATH}")
-        _menu_cache = {"makanan": [], "minuman": [], "info_pemesanan": "Data menu tidak tersedia."}
-        return _menu_cache
+        menu = {"makanan": [], "minuman": [], "info_pemesanan": "Data menu tidak tersedia."}
     except json.JSONDecodeError:
         print(f"Error: Gagal membaca format JSON dari {DATA_FILE_PATH}")
-        _menu_cache = {"makanan": [], "minuman": [], "info_pemesanan": "Data menu rusak."}
-        return _menu_cache
+        menu = {"makanan": [], "minuman": [], "info_pemesanan": "Data menu rusak."}
+    except sqlite3.Error as e:
+        print(f"Error: Gagal membaca database menu: {e}")
+        menu = {"makanan": [], "minuman": [], "info_pemesanan": "Data menu tidak tersedia."}
+    return menu, signature
+
+def _install_menu_state(menu, signature, changed_categories, lookup_indexes, entity_index=None, fuzzy_index=None):
+    """
+    Memasang menu yang sudah dibaca beserta indeksnya. Hanya assignment (tanpa I/O
+    atau rebuild), jadi di event loop pergantiannya terjadi sekaligus.
+    """
+    global _menu_cache, _file_signature, _id_index, _name_index, _item_positions, _entity_index, _fuzzy_index
+    _menu_cache, _file_signature = menu, signature
+    _id_index, _name_index, _item_positions = lookup_indexes
+    _bump_menu_version(*changed_categories)
+    if entity_index is not None:
+        entity_index.version = fuzzy_index.version = _menu_version
+        _entity_index, _fuzzy_index = entity_index, fuzzy_index
+
+def load_menu_data():
+    """Memuat data menu dari file JSON."""
+    menu, signature = _read_storage()
+    _install_menu_state(menu, signature, _changed_categories(_menu_cache, menu), _build_lookup_indexes(menu))
+    return _menu_cache
 
 def save_menu_data():
     """Menyimpan data menu (dari cache) ke file JSON."""
-    global _menu_cache
+    global _menu_cache, _file_signature
     if _menu_cache is None:
         print("Tidak ada data di cache untuk disimpan.")
         return False
     try:
-        with open(DATA_FILE_PATH, 'w', encoding='utf-8') as f:
-            json.dump(_menu_cache, f, indent=4, ensure_ascii=False)
+        _storage.save_snapshot(_menu_cache)
+        # Tulisan sendiri tidak perlu memicu reload saat revalidasi berikutnya
+        _file_signature = _storage.signature()
+        publish_menu_change()
         return True
     except Exception as e:
         print(f"Error saat menyimpan data menu: {e}")
         return False
 
-def get_menu(force_reload=False):
-    """Mengembalikan seluruh menu, menggunakan cache jika memungkinkan."""
+def _persist_change(change):
+    """
+    Menyimpan satu perubahan lewat backend storage.
+    Mode journal hanya meng-append record perubahan; mode json menulis snapshot utuh.
+    """
+    global _file_signature
+    try:
+        _storage.record_change(_menu_cache, change)
+        _file_signature = _storage.signature()
+        publish_menu_change() # Beri tahu proses lain (misal bot) bahwa menu berubah
+        return True
+    except Exception as e:
+        print(f"Error saat menyimpan perubahan menu: {e}")
+        return False
+
+def get_menu(force_reload=False, revalidate=False):
+    """
+    Mengembalikan seluruh menu, menggunakan cache jika memungkinkan.
+    revalidate=True hanya membaca ulang file jika mtime/size/inode-nya berubah
+    (misalnya setelah diedit dari dashboard), jauh lebih murah dari force_reload.
+    """
     global _menu_cache
-    if _menu_cache is None or force_reload:
+    if _menu_cache is None or force_reload or \
+       (revalidate and _storage.signature() != _file_signature):
+        _cache_stats["misses"] += 1
         load_menu_data()
+    else:
+        _cache_stats["hits"] += 1
+    return _menu_cache
+
+def refresh_menu_from_storage():
+    """
+    Callback untuk notifikasi perubahan dari proses lain.
+    Reload hanya terjadi jika storage memang berubah; versi menu yang naik
+    otomatis menginvalidasi indeks entitas dan cache teks /menu.
+    """
+    return get_menu(revalidate=True)
+
+def _prepare_menu_state(previous_menu):
+    """Membaca storage dan membangun semua indeks (dijalankan di thread lain)."""
+    menu, signature = _read_storage()
+    entity_index = MenuEntityIndex(menu, MENU_CATEGORIES)
+    fuzzy_index = FuzzyNameIndex(entity_index.entries())
+    return menu, signature, _changed_categories(previous_menu, menu), _build_lookup_indexes(menu), entity_index, fuzzy_index
+
+async def refresh_menu_from_storage_async():
+    """
+    Versi refresh_menu_from_storage untuk event loop bot. Membaca storage dan membangun
+    indeks lookup, indeks entitas, dan indeks fuzzy di thread lain, lalu memasangnya
+    sekaligus, sehingga pesan user tidak menunggu reload maupun rebuild indeks.
+    """
+    if _menu_cache is not None and _storage.signature() == _file_signature:
+        _cache_stats["hits"] += 1
+        return _menu_cache
+    version_before = _menu_version
+    prepared = await asyncio.to_thread(_prepare_menu_state, _menu_cache)
+    if _menu_version != version_before:
+        # Menu berubah di proses ini selama persiapan; state yang disiapkan bisa tertinggal
+        return get_menu(revalidate=True)
+    _cache_stats["misses"] += 1
+    _install_menu_state(*prepared)
     return _menu_cache
 
+def get_storage_signature():
+    """Signature storage menu saat ini (untuk watcher yang mendeteksi edit langsung ke file)."""
+    return _storage.signature()
+
+def get_cache_stats():
+    """Statistik cache menu: jumlah hit, miss, dan versi menu saat ini."""
+    return {"hits": _cache_stats["hits"], "misses": _cache_stats["misses"], "version": _menu_version}
+
+def get_entity_index():
+    """
+    Mengembalikan indeks nama item untuk ekstraksi entitas.
+    Hanya dibangun ulang jika versi menu berubah (reload, add, update, delete).
+    """
+    global _entity_index
+    menu = get_menu()
+    if _entity_index is None or _entity_index.version != _menu_version:
+        _entity_index = MenuEntityIndex(menu, MENU_CATEGORIES, version=_menu_version)
+    return _entity_index
+
+def get_fuzzy_index():
+    """Mengembalikan indeks fuzzy nama item, mengikuti versi menu seperti get_entity_index."""
+    global _fuzzy_index
+    entity_index = get_entity_index()
+    if _fuzzy_index is None or _fuzzy_index.version != entity_index.version:
+        _fuzzy_index = FuzzyNameIndex(entity_index.entries(), version=entity_index.version)
+    return _fuzzy_index
+
 def get_items_by_category(category_name, force_reload=False):
     menu = get_menu(force_reload)
     if category_name:
@@ -53,32 +272,25 @@ def get_items_by_category(category_name, force_reload=False):
 
 def get_item_by_id(item_id, force_reload=False): # Fungsi baru untuk mendapatkan item berdasarkan ID
     """Mencari item berdasarkan ID uniknya di semua kategori."""
-    menu = get_menu(force_reload)
+    get_menu(force_reload)
     if item_id:
-        for category_key in menu:
-            if category_key == "info_pemesanan":
-                continue
-            if isinstance(menu[category_key], list):
-                for item in menu[category_key]:
-                    if item.get("id") == item_id:
-                        return item, category_key # Kembalikan item dan kategorinya
+        return _id_index.get(item_id, (None, None)) # Kembalikan item dan kategorinya
     return None, None
 
 
 def get_item_by_name(item_name, force_reload=False):
     menu = get_menu(force_reload)
     if item_name:
+        # Lookup hash per kategori, urutan kategori tetap mengikuti menu
+        name_lower = item_name.lower()
         for category_key in menu:
-            if category_key == "info_pemesanan":
-                continue
-            if isinstance(menu[category_key], list):
-                for item in menu[category_key]:
-                    if item.get("nama", "").lower() == item_name.lower():
-                        return item
+            items = _name_index.get((category_key, name_lower))
+            if items:
+                return items[0]
     return None
 
-def get_info_pemesanan(force_reload=False):
-    menu = get_menu(force_reload)
+def get_info_pemesanan(force_reload=False, revalidate=False):
+    menu = get_menu(force_reload, revalidate)
     return menu.get("info_pemesanan", "Informasi pemesanan tidak tersedia.")
 
 # --- Fungsi CRUD Baru ---
@@ -95,9 +307,8 @@ def add_item(category, nama, harga, deskripsi):
         menu[category.lower()] = [] # Buat kategori jika belum ada (meskipun idealnya sudah ada "makanan" dan "minuman")
 
     # Cek apakah item dengan nama yang sama sudah ada di kategori tersebut
-    for item_existing in menu[category.lower()]:
-        if item_existing.get("nama", "").lower() == nama.lower():
-            return False, "Item dengan nama tersebut sudah ada di kategori ini."
+    if (category.lower(), nama.lower()) in _name_index:
+        return False, "Item dengan nama tersebut sudah ada di kategori ini."
 
     new_item_id = generate_new_id(prefix=category[0].upper())
     new_item = {
@@ -107,11 +318,17 @@ def add_item(category, nama, harga, deskripsi):
         "deskripsi": deskripsi
     }
     menu[category.lower()].append(new_item)
-    if save_menu_data():
+    _index_item(new_item, category.lower())
+    _item_positions[new_item_id] = len(menu[category.lower()]) - 1
+    _bump_menu_version(category.lower())
+    if _persist_change({"op": "add", "category": category.lower(), "item": new_item}):
         return True, new_item_id
     else:
         # Rollback jika gagal simpan (opsional, tergantung kompleksitas)
         menu[category.lower()].pop() # Hapus item yang baru ditambahkan dari cache
+        _unindex_item(new_item, category.lower())
+        _item_positions.pop(new_item_id, None)
+        _bump_menu_version(category.lower())
         return False, "Gagal menyimpan data menu."
 
 def update_item(item_id, updated_data):
@@ -125,15 +342,18 @@ def update_item(item_id, updated_data):
 
     # Cek duplikasi nama jika nama diubah
     if "nama" in updated_data and updated_data["nama"].lower() != item_to_update.get("nama","").lower():
-        for item_existing in menu[category_key]:
-            if item_existing.get("id") != item_id and item_existing.get("nama", "").lower() == updated_data["nama"].lower():
-                return False, "Nama item duplikat dengan item lain di kategori yang sama."
+        items_existing = _name_index.get((category_key, updated_data["nama"].lower()), [])
+        if any(item_existing.get("id") != item_id for item_existing in items_existing):
+            return False, "Nama item duplikat dengan item lain di kategori yang sama."
 
+    _unindex_item(item_to_update, category_key)
     item_to_update.update(updated_data)
     if "harga" in updated_data: # Pastikan harga adalah integer
         item_to_update["harga"] = int(updated_data["harga"])
+    _index_item(item_to_update, category_key)
+    _bump_menu_version(category_key)
 
-    if save_menu_data():
+    if _persist_change({"op": "update", "id": item_id, "item": item_to_update}):
         return True, "Item berhasil diperbarui."
     else:
         # Untuk rollback yang lebih kompleks, kita perlu menyimpan state item sebelum diubah.
@@ -149,13 +369,23 @@ def delete_item(item_id):
     if not item_to_delete:
         return False, "Item tidak ditemukan."
 
-    menu[category_key].remove(item_to_delete)
-    
-    if save_menu_data():
+    items = menu[category_key]
+    position = _item_position(items, item_to_delete)
+    if position is None:
+        return False, "Item tidak ditemukan."
+    del items[position]
+    _unindex_item(item_to_delete, category_key)
+    _item_positions.pop(item_id, None)
+    _bump_menu_version(category_key)
+
+    if _persist_change({"op": "delete", "id": item_id}):
         return True, "Item berhasil dihapus."
     else:
         # Rollback jika gagal simpan
-        menu[category_key].append(item_to_delete) # Tambahkan kembali ke cache
+        items.insert(position, item_to_delete) # Kembalikan ke posisi semula
+        _index_item(item_to_delete, category_key)
+        _item_positions[item_id] = position
+        _bump_menu_version(category_key)
         return False, "Gagal menyimpan data setelah penghapusan."
 
 def update_info_pemesanan(new_info):
@@ -163,7 +393,8 @@ def update_info_pemesanan(new_info):
     global _menu_cache
     menu = get_menu()
     menu["info_pemesanan"] = new_info
-    if save_menu_data():
+    _bump_menu_version("info_pemesanan")
+    if _persist_change({"op": "info", "value": new_info}):
         return True, "Info pemesanan berhasil diperbarui."
     else:
         # Rollback (opsional)
@@ -172,4 +403,4 @@ def update_info_pemesanan(new_info):
 
 # Pastikan load_menu_data dipanggil sekali di awal agar _menu_cache terisi
 if _menu_cache is None:
-    load_menu_data()
\ No newline at end of file
+    get_menu()
\ No newline at end of file
@@ -0,0 +1,293 @@
+# modules/menu_storage.py
+"""
+Backend penyimpanan data menu untuk menu_manager.
+- JsonSnapshotStorage: seluruh menu ditulis ulang ke file JSON (atomic rename).
+- JournalStorage: setiap perubahan di-append sebagai satu baris JSON ke journal,
+  lalu dipadatkan (compaction) menjadi snapshot baru jika journal sudah besar.
+- SqliteStorage: database SQLite mode WAL yang bisa dipakai bersama oleh bot
+  dan dashboard tanpa saling memblokir.
+"""
+import json
+import os
+import sqlite3
+import threading
+
+JOURNAL_COMPACT_BYTES = 256 * 1024 # Batas ukuran journal sebelum compaction
+
+
+def _file_signature(path):
+    try:
+        stat_result = os.stat(path)
+    except OSError:
+        return None
+    return (stat_result.st_mtime_ns, stat_result.st_size, stat_result.st_ino)
+
+
+def _fsync_directory(path):
+    # Pastikan rename tercatat di disk; tidak semua platform mendukung fsync direktori
+    try:
+        dir_fd = os.open(os.path.dirname(path) or ".", os.O_RDONLY)
+    except OSError:
+        return
+    try:
+        os.fsync(dir_fd)
+    except OSError:
+        pass
+    finally:
+        os.close(dir_fd)
+
+
+def apply_change(menu, change):
+    """
+    Menerapkan satu record perubahan ke dict menu.
+    Idempotent, supaya replay journal setelah compaction yang terputus tetap aman.
+    """
+    op = change.get("op")
+    if op == "add":
+        items = menu.setdefault(change["category"], [])
+        if not any(item.get("id") == change["item"].get("id") for item in items):
+            items.append(dict(change["item"]))
+    elif op == "update":
+        for key, value in menu.items():
+            if key == "info_pemesanan" or not isinstance(value, list):
+                continue
+            for item in value:
+                if item.get("id") == change["id"]:
+                    item.clear()
+                    item.update(change["item"])
+                    return
+    elif op == "delete":
+        for key, value in menu.items():
+            if key == "info_pemesanan" or not isinstance(value, list):
+                continue
+            for index, item in enumerate(value):
+                if item.get("id") == change["id"]:
+                    del value[index]
+                    return
+    elif op == "info":
+        menu["info_pemesanan"] = change["value"]
+
+
+class JsonSnapshotStorage:
+    """Penyimpanan default: satu file JSON yang selalu ditulis utuh."""
+
+    def __init__(self, data_file_path):
+        self.data_file_path = data_file_path
+
+    def load(self):
+        """Membaca menu dari file. FileNotFoundError/JSONDecodeError diteruskan ke pemanggil."""
+        with open(self.data_file_path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+
+    def save_snapshot(self, menu):
+        """Menulis seluruh menu ke file sementara lalu rename atomik ke file data."""
+        tmp_path = f"{self.data_file_path}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(menu, f, indent=4, ensure_ascii=False)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self.data_file_path)
+        _fsync_directory(self.data_file_path)
+
+    def record_change(self, menu, change):
+        """Menyimpan satu perubahan. Mode snapshot cukup menulis ulang seluruh menu."""
+        self.save_snapshot(menu)
+
+    def signature(self):
+        """Signature murah untuk mendeteksi perubahan dari proses lain."""
+        return _file_signature(self.data_file_path)
+
+
+class JournalStorage(JsonSnapshotStorage):
+    """Snapshot JSON + journal append-only (satu baris JSON per perubahan)."""
+
+    def __init__(self, data_file_path, journal_path=None, compact_bytes=JOURNAL_COMPACT_BYTES):
+        super().__init__(data_file_path)
+        self.journal_path = journal_path or f"{os.path.splitext(data_file_path)[0]}.journal"
+        self.compact_bytes = compact_bytes
+
+    def load(self):
+        menu = super().load()
+        try:
+            with open(self.journal_path, 'r', encoding='utf-8') as f:
+                for line in f:
+                    line = line.strip()
+                    if not line:
+                        continue
+                    try:
+                        change = json.loads(line)
+                    except json.JSONDecodeError:
+                        # Baris terakhir bisa terpotong jika proses mati saat append
+                        print(f"Peringatan: baris journal rusak dilewati di {self.journal_path}")
+                        continue
+                    apply_change(menu, change)
+        except FileNotFoundError:
+            pass
+        return menu
+
+    def save_snapshot(self, menu):
+        super().save_snapshot(menu)
+        # Snapshot sudah memuat semua perubahan, journal bisa dikosongkan
+        with open(self.journal_path, 'w', encoding='utf-8') as f:
+            f.flush()
+            os.fsync(f.fileno())
+
+    def record_change(self, menu, change):
+        line = (json.dumps(change, ensure_ascii=False) + "\n").encode('utf-8')
+        with open(self.journal_path, 'ab+') as f:
+            # Jika baris terakhir terpotong (proses mati saat append), mulai di baris baru
+            if f.tell() > 0:
+                f.seek(-1, os.SEEK_END)
+                if f.read(1) != b"\n":
+                    line = b"\n" + line
+            f.write(line)
+            f.flush()
+            os.fsync(f.fileno())
+        if os.path.getsize(self.journal_path) >= self.compact_bytes:
+            self.save_snapshot(menu)
+
+    def signature(self):
+        return (super().signature(), _file_signature(self.journal_path))
+
+
+_ITEM_COLUMNS = ("id", "nama", "harga", "deskripsi")
+
+_SQLITE_SCHEMA = """
+CREATE TABLE IF NOT EXISTS menu_items (
+    id TEXT PRIMARY KEY,
+    category TEXT NOT NULL,
+    position INTEGER NOT NULL,
+    nama TEXT NOT NULL,
+    harga INTEGER NOT NULL,
+    deskripsi TEXT NOT NULL DEFAULT '',
+    extra TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_menu_items_category ON menu_items (category, position);
+CREATE INDEX IF NOT EXISTS idx_menu_items_name ON menu_items (category, nama COLLATE NOCASE);
+CREATE TABLE IF NOT EXISTS menu_meta (
+    key TEXT PRIMARY KEY,
+    value TEXT NOT NULL
+);
+"""
+
+
+class SqliteStorage:
+    """
+    Menyimpan menu di SQLite (WAL). Pembaca tidak memblokir penulis, dan setiap
+    perubahan hanya menyentuh satu baris. Saat pertama kali dibuat, data diimpor
+    dari menu_data.json (beserta journal-nya jika ada).
+    """
+
+    def __init__(self, data_file_path, db_path=None):
+        self.data_file_path = data_file_path
+        self.db_path = db_path or f"{os.path.splitext(data_file_path)[0]}.db"
+        self._lock = threading.Lock() # Streamlit menjalankan script di thread berbeda
+        self._conn = sqlite3.connect(self.db_path, timeout=10, check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=FULL")
+        self._conn.executescript(_SQLITE_SCHEMA)
+        self._migrate_from_json()
+
+    def _migrate_from_json(self):
+        with self._lock:
+            migrated = self._conn.execute("SELECT 1 FROM menu_meta WHERE key = 'category_order'").fetchone()
+        if migrated or not os.path.exists(self.data_file_path):
+            return
+        menu = JournalStorage(self.data_file_path).load()
+        self.save_snapshot(menu)
+        print(f"Data menu dimigrasikan dari {self.data_file_path} ke {self.db_path}")
+
+    @staticmethod
+    def _row_values(category, position, item):
+        extra = {key: value for key, value in item.items() if key not in _ITEM_COLUMNS}
+        return (
+            item.get("id"), category, position, item.get("nama", ""), int(item.get("harga", 0)),
+            item.get("deskripsi", ""), json.dumps(extra, ensure_ascii=False) if extra else None
+        )
+
+    @staticmethod
+    def _set_meta(conn, key, value):
+        conn.execute(
+            "INSERT INTO menu_meta (key, value) VALUES (?, ?) "
+            "ON CONFLICT(key) DO UPDATE SET value = excluded.value",
+            (key, json.dumps(value, ensure_ascii=False))
+        )
+
+    def load(self):
+        with self._lock:
+            meta = {row["key"]: json.loads(row["value"]) for row in self._conn.execute("SELECT key, value FROM menu_meta")}
+            rows = self._conn.execute("SELECT * FROM menu_items ORDER BY category, position").fetchall()
+
+        # Pertahankan urutan kategori seperti di file JSON asal
+        menu = {}
+        for category in meta.get("category_order", []):
+            menu[category] = [] if category != "info_pemesanan" else meta.get("info_pemesanan", "")
+        for row in rows:
+            item = {"id": row["id"], "nama": row["nama"], "harga": row["harga"], "deskripsi": row["deskripsi"]}
+            if row["extra"]:
+                item.update(json.loads(row["extra"]))
+            menu.setdefault(row["category"], []).append(item)
+        if "info_pemesanan" in meta:
+            menu["info_pemesanan"] = meta["info_pemesanan"]
+        return menu
+
+    def save_snapshot(self, menu):
+        """Mengganti seluruh isi database dengan menu (dipakai untuk migrasi/save penuh)."""
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM menu_items")
+            for category, items in menu.items():
+                if category == "info_pemesanan" or not isinstance(items, list):
+                    continue
+                self._conn.executemany(
+                    "INSERT OR REPLACE INTO menu_items VALUES (?, ?, ?, ?, ?, ?, ?)",
+                    [self._row_values(category, position, item) for position, item in enumerate(items)]
+                )
+            self._set_meta(self._conn, "category_order", list(menu))
+            if "info_pemesanan" in menu:
+                self._set_meta(self._conn, "info_pemesanan", menu["info_pemesanan"])
+
+    def record_change(self, menu, change):
+        op = change.get("op")
+        with self._lock, self._conn:
+            if op == "add":
+                category = change["category"]
+                next_position = self._conn.execute(
+                    "SELECT COALESCE(MAX(position) + 1, 0) FROM menu_items WHERE category = ?", (category,)
+                ).fetchone()[0]
+                self._conn.execute(
+                    "INSERT INTO menu_items VALUES (?, ?, ?, ?, ?, ?, ?)",
+                    self._row_values(category, next_position, change["item"])
+                )
+                self._set_meta(self._conn, "category_order", list(menu))
+            elif op == "update":
+                _, category, position, *values = self._row_values(None, None, change["item"])
+                self._conn.execute(
+                    "UPDATE menu_items SET nama = ?, harga = ?, deskripsi = ?, extra = ? WHERE id = ?",
+                    (*values, change["id"])
+                )
+            elif op == "delete":
+                self._conn.execute("DELETE FROM menu_items WHERE id = ?", (change["id"],))
+            elif op == "info":
+                self._set_meta(self._conn, "info_pemesanan", change["value"])
+
+    def signature(self):
+        # data_version hanya berubah jika koneksi LAIN (proses lain) melakukan commit
+        with self._lock:
+            return self._conn.execute("PRAGMA data_version").fetchone()[0]
+
+
+STORAGE_BACKENDS = {
+    "json": JsonSnapshotStorage,
+    "journal": JournalStorage,
+    "sqlite": SqliteStorage,
+}
+
+
+def create_storage(backend, data_file_path):
+    """Membuat backend penyimpanan berdasarkan nama ("json", "journal" atau "sqlite")."""
+    try:
+        storage_class = STORAGE_BACKENDS[backend]
+    except KeyError:
+        raise ValueError(f"Backend penyimpanan menu tidak dikenal: {backend}")
+    return storage_class(data_file_path)
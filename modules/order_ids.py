@@ -0,0 +1,149 @@
+# modules/order_ids.py
+"""
+Alokasi nomor pesanan yang unik antar proses bot.
+Nomor berbentuk KC[YYMMDD]-[urutan harian], misalnya KC261018-0042, pendek agar
+mudah disebutkan di kasir. Urutan harian disimpan di SQLite bersama; setiap proses
+menyewa (lease) satu blok nomor sekaligus, sehingga sebagian besar alokasi hanya
+increment di memori. Dari event loop, sewa dijalankan di thread terpisah dan blok
+berikutnya sudah disewa di background sebelum blok aktif habis, jadi transaksi
+SQLite yang sedang antre tidak pernah memblokir bot. Nomor sisa blok yang tidak
+terpakai saat proses berhenti dilewati (urutan bisa bolong), tapi tidak pernah
+dipakai dua kali.
+"""
+import asyncio
+import logging
+import os
+import sqlite3
+import threading
+from datetime import datetime
+
+logger = logging.getLogger(__name__)
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+ORDER_ID_DB_PATH = os.environ.get("ORDER_ID_DB", os.path.join(BASE_DIR, 'data', 'order_ids.db'))
+ORDER_ID_BLOCK_SIZE = max(1, int(os.environ.get("ORDER_ID_BLOCK_SIZE", "20")))
+ORDER_ID_PREFIX = "KC"
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS order_sequences (
+    day TEXT PRIMARY KEY,
+    next_value INTEGER NOT NULL
+);
+"""
+
+
+class OrderIdAllocator:
+    def __init__(self, db_path=ORDER_ID_DB_PATH, block_size=ORDER_ID_BLOCK_SIZE):
+        self.db_path = db_path
+        self.block_size = block_size
+        self._lock = threading.Lock() # Melindungi blok aktif dan blok cadangan
+        self._db_lock = threading.Lock() # Koneksi dipakai dari beberapa thread
+        self._lease_lock = None # asyncio.Lock, dibuat di event loop saat pertama dibutuhkan
+        self._prefetch_task = None
+        self._conn = None # Dibuka saat alokasi pertama
+        self._day = None
+        self._next = 0
+        self._limit = 0 # Nomor pertama di luar blok yang sedang disewa
+        self._spare = None # Blok berikutnya yang sudah disewa: (hari, awal, batas)
+        self.leases = 0
+
+    def _connection(self):
+        if self._conn is None:
+            # isolation_level=None: transaksi diatur manual dengan BEGIN IMMEDIATE
+            self._conn = sqlite3.connect(self.db_path, timeout=10, isolation_level=None, check_same_thread=False)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.executescript(_SCHEMA)
+        return self._conn
+
+    def _lease_block(self, day):
+        """Menyewa blok nomor berikutnya untuk hari itu secara atomik antar proses (blocking)."""
+        with self._db_lock:
+            conn = self._connection()
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                row = conn.execute("SELECT next_value FROM order_sequences WHERE day = ?", (day,)).fetchone()
+                start = row[0] if row else 1
+                conn.execute(
+                    "INSERT INTO order_sequences (day, next_value) VALUES (?, ?) "
+                    "ON CONFLICT(day) DO UPDATE SET next_value = excluded.next_value",
+                    (day, start + self.block_size)
+                )
+                conn.execute("COMMIT")
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+            self.leases += 1
+        return start, start + self.block_size
+
+    def _take(self, day):
+        """Nomor berikutnya dari blok aktif (atau blok cadangan). Returns: None jika perlu sewa baru."""
+        with self._lock:
+            if day != self._day or self._next >= self._limit:
+                spare, self._spare = self._spare, None
+                if spare is None or spare[0] != day:
+                    return None
+                self._day, self._next, self._limit = spare
+            sequence = self._next
+            self._next += 1
+            return sequence
+
+    def _install(self, day, start, limit):
+        with self._lock:
+            if day != self._day or self._next >= self._limit:
+                self._day, self._next, self._limit = day, start, limit
+            elif self._spare is None:
+                self._spare = (day, start, limit)
+
+    def allocate(self, now=None):
+        """Mengembalikan nomor pesanan baru (blocking; untuk skrip dan dashboard)."""
+        day = (now or datetime.now()).strftime('%y%m%d')
+        sequence = self._take(day)
+        while sequence is None:
+            self._install(day, *self._lease_block(day))
+            sequence = self._take(day)
+        return f"{ORDER_ID_PREFIX}{day}-{sequence:04d}"
+
+    async def allocate_async(self, now=None):
+        """Mengembalikan nomor pesanan baru tanpa memblokir event loop."""
+        day = (now or datetime.now()).strftime('%y%m%d')
+        if self._lease_lock is None:
+            self._lease_lock = asyncio.Lock()
+        sequence = self._take(day)
+        while sequence is None:
+            async with self._lease_lock:
+                # Sewa lain (atau prefetch) mungkin sudah selesai selama menunggu lock
+                sequence = self._take(day)
+                if sequence is None:
+                    self._install(day, *await asyncio.to_thread(self._lease_block, day))
+                    sequence = self._take(day)
+        self._maybe_prefetch(day)
+        return f"{ORDER_ID_PREFIX}{day}-{sequence:04d}"
+
+    def _maybe_prefetch(self, day):
+        """Menyewa blok berikutnya di background saat sisa blok aktif tinggal seperempat."""
+        with self._lock:
+            remaining = self._limit - self._next
+            needed = self._spare is None and remaining * 4 <= self.block_size
+        if needed and (self._prefetch_task is None or self._prefetch_task.done()):
+            self._prefetch_task = asyncio.get_running_loop().create_task(self._prefetch(day))
+
+    async def _prefetch(self, day):
+        async with self._lease_lock:
+            with self._lock:
+                if self._spare is not None or self._limit - self._next > self.block_size // 4:
+                    return
+            try:
+                start, limit = await asyncio.to_thread(self._lease_block, day)
+            except sqlite3.Error as e:
+                logger.warning("Gagal menyewa blok nomor pesanan di background: %s", e)
+                return
+            self._install(day, start, limit)
+
+    def close(self):
+        with self._db_lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+
+order_id_allocator = OrderIdAllocator()
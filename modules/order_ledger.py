@@ -0,0 +1,284 @@
+# modules/order_ledger.py
+"""
+Ledger pesanan yang sudah selesai (append-only).
+Setiap hari punya satu segmen JSONL (data/orders/orders-YYYY-MM-DD.jsonl), satu
+baris per pesanan, sehingga segmen itu sendiri menjadi indeks per tanggal.
+Di sebelahnya ada file .idx kecil (user_id, offset, panjang baris) sebagai indeks
+per user, jadi riwayat satu user bisa dibaca dengan seek tanpa mem-parse seluruh
+segmen. Penulisan dikumpulkan di memori dan di-flush per batch (satu fsync per
+segmen per batch) oleh task background, sehingga menyelesaikan pesanan tidak
+pernah menunggu disk.
+"""
+import asyncio
+import json
+import logging
+import os
+import re
+import threading
+from datetime import date, datetime
+
+try:
+    import fcntl
+except ImportError: # Windows: hanya satu proses penulis yang didukung
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+ORDER_LEDGER_DIR = os.environ.get("ORDER_LEDGER_DIR", os.path.join(BASE_DIR, 'data', 'orders'))
+ORDER_LEDGER_FLUSH_INTERVAL = float(os.environ.get("ORDER_LEDGER_FLUSH_INTERVAL", "0.5"))
+
+_SEGMENT_PATTERN = re.compile(r"^orders-(\d{4}-\d{2}-\d{2})\.jsonl$")
+
+
+def _lock_file(f):
+    """Lock eksklusif antar proses pada file segmen; dilepas saat file ditutup."""
+    if fcntl is not None:
+        fcntl.flock(f.fileno(), fcntl.LOCK_EX)
+
+
+def order_record(order_id, user_id, lines, total_price, dining_option, takeout_type, payment_method, created_at=None):
+    """
+    Membuat record ledger. lines: iterable dict dengan item_id, nama, harga, quantity
+    (harga yang dicatat adalah harga saat dipesan, bukan harga menu terbaru).
+    """
+    created_at = created_at or datetime.now()
+    return {
+        "order_id": order_id,
+        "user_id": user_id,
+        "created_at": created_at.isoformat(timespec="seconds"),
+        "lines": [
+            {
+                "item_id": line["item_id"], "nama": line["nama"], "harga": line["harga"],
+                "quantity": line["quantity"], "subtotal": line["harga"] * line["quantity"]
+            }
+            for line in lines
+        ],
+        "total_price": total_price,
+        "dining_option": dining_option,
+        "takeout_type": takeout_type,
+        "payment_method": payment_method,
+    }
+
+
+class OrderLedger:
+    def __init__(self, directory=ORDER_LEDGER_DIR, flush_interval=ORDER_LEDGER_FLUSH_INTERVAL):
+        self.directory = directory
+        self.flush_interval = flush_interval
+        self._pending = [] # Record yang belum ditulis ke disk
+        self._write_lock = threading.Lock() # flush dari thread flusher vs flush_sync saat shutdown
+        self._user_index = None # user_id -> [(tanggal, offset, panjang)], dibangun saat pertama dibutuhkan
+
+    def segment_path(self, day):
+        return os.path.join(self.directory, f"orders-{day.isoformat()}.jsonl")
+
+    def _index_path(self, day):
+        return os.path.join(self.directory, f"orders-{day.isoformat()}.idx")
+
+    def append(self, record):
+        """Mencatat satu pesanan (hanya di memori; ditulis oleh flusher)."""
+        self._pending.append(record)
+
+    def available_dates(self):
+        """Tanggal yang punya segmen ledger, terurut."""
+        days = []
+        if not os.path.isdir(self.directory):
+            return days
+        for name in os.listdir(self.directory):
+            match = _SEGMENT_PATTERN.match(name)
+            if match:
+                days.append(date.fromisoformat(match.group(1)))
+        return sorted(days)
+
+    # --- Penulisan ---
+
+    @staticmethod
+    def _group_by_day(records):
+        by_day = {}
+        for record in records:
+            day = date.fromisoformat(record["created_at"][:10])
+            by_day.setdefault(day, []).append(record)
+        return by_day
+
+    def _write_day(self, day, day_records):
+        """
+        Menulis record satu tanggal ke segmennya (satu fsync). Jika penulisan gagal,
+        segmen dipotong kembali ke ukuran sebelum batch sehingga batch bisa diulang
+        tanpa baris ganda atau setengah tertulis.
+        """
+        with self._write_lock:
+            # Direktori dibuat saat pertama menulis, bukan saat import
+            os.makedirs(self.directory, exist_ok=True)
+            index_entries = []
+            with open(self.segment_path(day), 'ab+') as f:
+                # Beberapa proses bot bisa menulis segmen yang sama: offset baru dibaca
+                # setelah lock didapat, dan lock dipegang sampai indeks selesai ditulis
+                _lock_file(f)
+                offset = batch_start = f.seek(0, os.SEEK_END)
+                try:
+                    chunks = []
+                    # Jika baris terakhir terpotong (proses mati saat menulis), mulai di baris baru
+                    if offset > 0:
+                        f.seek(-1, os.SEEK_END)
+                        if f.read(1) != b"\n":
+                            chunks.append(b"\n")
+                            offset += 1
+                    for record in day_records:
+                        line = (json.dumps(record, ensure_ascii=False) + "\n").encode('utf-8')
+                        chunks.append(line)
+                        index_entries.append((record["user_id"], offset, len(line)))
+                        offset += len(line)
+                    f.write(b"".join(chunks))
+                    f.flush()
+                    os.fsync(f.fileno())
+                except OSError:
+                    f.truncate(batch_start)
+                    raise
+
+                if self._user_index is not None:
+                    for user_id, offset, length in index_entries:
+                        self._user_index.setdefault(user_id, []).append((day, offset, length))
+                # Indeks tidak di-fsync dan kegagalannya tidak menggagalkan batch:
+                # jika tertinggal dari segmen, dibangun ulang saat dibaca
+                try:
+                    with open(self._index_path(day), 'a', encoding='utf-8') as index_file:
+                        index_file.writelines(
+                            f"{user_id}\t{offset}\t{length}\n" for user_id, offset, length in index_entries
+                        )
+                except OSError as e:
+                    logger.warning("Gagal menulis indeks ledger %s: %s", self._index_path(day), e)
+
+    def _take_pending(self):
+        records, self._pending = self._pending, []
+        return records
+
+    async def flush(self):
+        """Menulis batch yang tertunda di thread terpisah. Returns: jumlah record yang ditulis."""
+        records = self._take_pending()
+        if not records:
+            return 0
+        by_day = list(self._group_by_day(records).items())
+        for position, (day, day_records) in enumerate(by_day):
+            try:
+                await asyncio.to_thread(self._write_day, day, day_records)
+            except OSError:
+                # Hanya tanggal yang belum tertulis yang dikembalikan ke antrian
+                self._pending[:0] = [record for _, remaining in by_day[position:] for record in remaining]
+                raise
+        return len(records)
+
+    def flush_sync(self):
+        """Flush terakhir saat shutdown (boleh blocking)."""
+        records = self._take_pending()
+        if records:
+            for day, day_records in self._group_by_day(records).items():
+                self._write_day(day, day_records)
+            logger.info("Ledger pesanan: %s pesanan terakhir ditulis ke %s", len(records), self.directory)
+
+    async def run_flusher(self):
+        """Loop flush batch untuk dijalankan sebagai asyncio task."""
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            try:
+                await self.flush()
+            except OSError as e:
+                logger.error("Gagal menulis ledger pesanan ke %s: %s", self.directory, e)
+
+    # --- Pembacaan ---
+
+    def _read_segment(self, day):
+        records = []
+        try:
+            with open(self.segment_path(day), 'r', encoding='utf-8') as f:
+                for line in f:
+                    try:
+                        records.append(json.loads(line))
+                    except json.JSONDecodeError:
+                        # Baris terakhir bisa terpotong jika proses mati saat menulis
+                        continue
+        except FileNotFoundError:
+            pass
+        return records
+
+    def orders_for_date(self, day):
+        """Semua pesanan pada satu tanggal (termasuk yang belum di-flush)."""
+        day_prefix = day.isoformat()
+        return self._read_segment(day) + [r for r in self._pending if r["created_at"].startswith(day_prefix)]
+
+    def orders_between(self, start_day, end_day):
+        """Pesanan dari start_day sampai end_day (inklusif); hanya segmen di rentang itu yang dibaca."""
+        records = []
+        for day in self.available_dates():
+            if start_day <= day <= end_day:
+                records.extend(self._read_segment(day))
+        start_prefix, end_prefix = start_day.isoformat(), end_day.isoformat()
+        records.extend(r for r in self._pending if start_prefix <= r["created_at"][:10] <= end_prefix)
+        return records
+
+    def _load_day_index(self, day):
+        """Membaca .idx satu segmen; dibangun ulang dari segmen jika tidak lengkap."""
+        with open(self.segment_path(day), 'rb') as segment:
+            # Lock yang sama dengan penulis, supaya ukuran segmen dan .idx dibaca konsisten
+            _lock_file(segment)
+            segment_size = segment.seek(0, os.SEEK_END)
+            entries = []
+            try:
+                with open(self._index_path(day), 'r', encoding='utf-8') as f:
+                    for line in f:
+                        parts = line.split("\t")
+                        if len(parts) == 3:
+                            entries.append((int(parts[0]), int(parts[1]), int(parts[2])))
+            except (FileNotFoundError, ValueError):
+                entries = []
+
+            indexed_end = entries[-1][1] + entries[-1][2] if entries else 0
+            if indexed_end == segment_size:
+                return entries
+
+            entries = []
+            segment.seek(0)
+            offset = 0
+            for line in segment:
+                try:
+                    entries.append((json.loads(line)["user_id"], offset, len(line)))
+                except (json.JSONDecodeError, KeyError):
+                    pass
+                offset += len(line)
+            with open(self._index_path(day), 'w', encoding='utf-8') as f:
+                f.writelines(f"{user_id}\t{offset}\t{length}\n" for user_id, offset, length in entries)
+            return entries
+
+    def _ensure_user_index(self):
+        with self._write_lock:
+            if self._user_index is None:
+                user_index = {}
+                for day in self.available_dates():
+                    for user_id, offset, length in self._load_day_index(day):
+                        user_index.setdefault(user_id, []).append((day, offset, length))
+                self._user_index = user_index
+            return self._user_index
+
+    def orders_for_user(self, user_id, limit=None):
+        """Riwayat pesanan satu user, terbaru lebih dulu."""
+        entries = self._ensure_user_index().get(user_id, [])
+        records = [r for r in reversed(self._pending) if r["user_id"] == user_id]
+        selected = entries[::-1]
+        if limit is not None:
+            records = records[:limit]
+            selected = selected[:limit - len(records)]
+
+        open_files = {}
+        try:
+            for day, offset, length in selected:
+                f = open_files.get(day)
+                if f is None:
+                    f = open_files[day] = open(self.segment_path(day), 'rb')
+                f.seek(offset)
+                records.append(json.loads(f.read(length)))
+        finally:
+            for f in open_files.values():
+                f.close()
+        return records
+
+
+order_ledger = OrderLedger()
@@ -0,0 +1,197 @@
+# modules/sales_analytics.py
+"""
+Analitik penjualan dari ledger pesanan (modules/order_ledger.py) untuk dashboard.
+Setiap segmen harian dikonversi sekali ke array kolom NumPy (.npy) dan setelah itu
+dibaca dengan memory-map. Nama file cache memuat (ukuran, mtime_ns) segmen saat
+dikonversi, jadi cache hanya dipakai jika segmennya persis sama. Agregasi
+(pendapatan per jam, item terlaris, porsi dine-in/takeaway) dihitung secara
+vektor dengan bincount, tanpa loop Python per pesanan.
+"""
+import json
+import os
+
+import numpy as np
+
+from modules.order_ledger import order_ledger
+
+DINING_OPTIONS = ("dine_in", "takeaway") # Kode lain (None/tidak dikenal) = len(DINING_OPTIONS)
+PAYMENT_METHODS = ("E-Wallet", "Cash")
+
+ORDER_DTYPE = np.dtype([
+    ("hour", "u1"), ("total", "i8"), ("dining", "u1"), ("payment", "u1"),
+])
+# Dinaikkan setiap format cache .npy berubah, supaya cache lama tidak dipakai
+COLUMN_CACHE_VERSION = 2
+
+
+def line_dtype(item_id_width=1, nama_width=1):
+    """
+    Dtype baris item. Lebar kolom teks diambil dari data segmen (bukan lebar tetap),
+    karena NumPy memotong string yang lebih panjang tanpa peringatan.
+    """
+    return np.dtype([
+        ("hour", "u1"), ("item_id", f"U{max(1, item_id_width)}"), ("nama", f"U{max(1, nama_width)}"),
+        ("quantity", "i4"), ("subtotal", "i8"),
+    ])
+
+
+def _concatenate_lines(lines_per_day):
+    """Menggabungkan baris item beberapa hari dengan lebar kolom teks terlebar."""
+    if not lines_per_day:
+        return np.empty(0, dtype=line_dtype())
+    dtype = line_dtype(
+        max(lines.dtype["item_id"].itemsize // 4 for lines in lines_per_day),
+        max(lines.dtype["nama"].itemsize // 4 for lines in lines_per_day),
+    )
+    return np.concatenate([lines.astype(dtype, copy=False) for lines in lines_per_day])
+
+
+def _code(value, choices):
+    try:
+        return choices.index(value)
+    except ValueError:
+        return len(choices)
+
+
+def _segment_to_columns(segment_path, size=None):
+    """
+    Parse satu segmen JSONL menjadi (orders, lines) structured array.
+    size: hanya `size` byte pertama yang dibaca, supaya isi array persis sesuai
+    signature segmen yang dicatat sebelum parse meskipun bot sedang meng-append.
+    """
+    order_rows = []
+    line_rows = []
+    with open(segment_path, 'rb') as f:
+        content = f.read() if size is None else f.read(size)
+    for raw_line in content.decode('utf-8', errors='replace').splitlines():
+        try:
+            record = json.loads(raw_line)
+        except json.JSONDecodeError:
+            # Termasuk baris kosong dan baris terakhir yang terpotong
+            continue
+        hour = int(record["created_at"][11:13])
+        order_rows.append((
+            hour, record["total_price"],
+            _code(record.get("dining_option"), DINING_OPTIONS),
+            _code(record.get("payment_method"), PAYMENT_METHODS),
+        ))
+        for line in record["lines"]:
+            line_rows.append((hour, line["item_id"] or "", line["nama"], line["quantity"], line["subtotal"]))
+    dtype = line_dtype(
+        max((len(row[1]) for row in line_rows), default=1),
+        max((len(row[2]) for row in line_rows), default=1),
+    )
+    return np.array(order_rows, dtype=ORDER_DTYPE), np.array(line_rows, dtype=dtype)
+
+
+class SalesColumnStore:
+    """Cache kolom .npy per segmen ledger, dibaca dengan mmap."""
+
+    def __init__(self, ledger=order_ledger, cache_dir=None):
+        self.ledger = ledger
+        self.cache_dir = cache_dir or os.path.join(ledger.directory, "columnar")
+
+    def _cache_prefix(self, day):
+        return f"orders-{day.isoformat()}.v{COLUMN_CACHE_VERSION}."
+
+    def _cache_paths(self, day, segment_signature):
+        """Path cache untuk satu versi segmen; signature = (ukuran, mtime_ns) saat dikonversi."""
+        size, mtime_ns = segment_signature
+        prefix = os.path.join(self.cache_dir, f"{self._cache_prefix(day)}{size}-{mtime_ns}")
+        return f"{prefix}.orders.npy", f"{prefix}.lines.npy"
+
+    def _remove_stale_caches(self, day, keep_paths):
+        prefix = self._cache_prefix(day)
+        for name in os.listdir(self.cache_dir):
+            path = os.path.join(self.cache_dir, name)
+            # File .tmp milik proses lain yang sedang menulis dibiarkan
+            if name.startswith(prefix) and ".tmp." not in name and path not in keep_paths:
+                try:
+                    os.remove(path)
+                except OSError:
+                    pass
+
+    def load_day(self, day):
+        segment_path = self.ledger.segment_path(day)
+        stat_result = os.stat(segment_path)
+        # Signature dicatat sebelum parse dan parse dibatasi ke ukuran itu; cache
+        # hanya dipakai jika signature segmen sekarang sama persis
+        segment_signature = (stat_result.st_size, stat_result.st_mtime_ns)
+        orders_path, lines_path = self._cache_paths(day, segment_signature)
+        try:
+            return np.load(orders_path, mmap_mode='r'), np.load(lines_path, mmap_mode='r')
+        except OSError:
+            pass
+
+        orders, lines = _segment_to_columns(segment_path, size=segment_signature[0])
+        try:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            for path, array in ((orders_path, orders), (lines_path, lines)):
+                tmp_path = f"{path}.{os.getpid()}.tmp.npy"
+                np.save(tmp_path, array)
+                os.replace(tmp_path, path)
+            self._remove_stale_caches(day, (orders_path, lines_path))
+        except OSError:
+            pass # Folder tidak bisa ditulis: tetap pakai array di memori
+        return orders, lines
+
+    def load_range(self, start_day, end_day):
+        """Returns: (daftar tanggal, orders per hari, lines per hari) untuk rentang inklusif."""
+        days = [day for day in self.ledger.available_dates() if start_day <= day <= end_day]
+        columns = [self.load_day(day) for day in days]
+        return days, [orders for orders, _ in columns], [lines for _, lines in columns]
+
+    def signature(self, start_day, end_day):
+        """Berubah setiap ada pesanan baru di rentang tanggal; dipakai sebagai kunci cache."""
+        signature = []
+        for day in self.ledger.available_dates():
+            if start_day <= day <= end_day:
+                try:
+                    stat_result = os.stat(self.ledger.segment_path(day))
+                except OSError:
+                    continue
+                signature.append((day.isoformat(), stat_result.st_size, stat_result.st_mtime_ns))
+        return tuple(signature)
+
+
+def compute_sales_summary(start_day, end_day, store=None, top_n=10):
+    """Agregat penjualan untuk rentang tanggal (inklusif)."""
+    store = store or SalesColumnStore()
+    days, orders_per_day, lines_per_day = store.load_range(start_day, end_day)
+
+    orders = np.concatenate(orders_per_day) if orders_per_day else np.empty(0, dtype=ORDER_DTYPE)
+    lines = _concatenate_lines(lines_per_day)
+
+    revenue_per_hour = np.bincount(orders["hour"], weights=orders["total"], minlength=24).astype(np.int64)
+    orders_per_hour = np.bincount(orders["hour"], minlength=24)
+    dining_counts = np.bincount(orders["dining"], minlength=len(DINING_OPTIONS) + 1)
+    dining_revenue = np.bincount(orders["dining"], weights=orders["total"], minlength=len(DINING_OPTIONS) + 1).astype(np.int64)
+    payment_counts = np.bincount(orders["payment"], minlength=len(PAYMENT_METHODS) + 1)
+
+    top_items = []
+    if len(lines):
+        item_ids, first_index, inverse = np.unique(lines["item_id"], return_index=True, return_inverse=True)
+        quantity = np.bincount(inverse, weights=lines["quantity"]).astype(np.int64)
+        revenue = np.bincount(inverse, weights=lines["subtotal"]).astype(np.int64)
+        for index in np.argsort(-quantity, kind="stable")[:top_n]:
+            top_items.append({
+                "item_id": str(item_ids[index]),
+                "nama": str(lines["nama"][first_index[index]]),
+                "quantity": int(quantity[index]),
+                "revenue": int(revenue[index]),
+            })
+
+    return {
+        "days": [day.isoformat() for day in days],
+        "revenue_per_day": [int(day_orders["total"].sum()) for day_orders in orders_per_day],
+        "order_count": int(len(orders)),
+        "total_revenue": int(orders["total"].sum()),
+        "revenue_per_hour": revenue_per_hour.tolist(),
+        "orders_per_hour": orders_per_hour.tolist(),
+        "dining_split": {
+            option: {"orders": int(dining_counts[code]), "revenue": int(dining_revenue[code])}
+            for code, option in enumerate(DINING_OPTIONS)
+        },
+        "payment_split": {method: int(payment_counts[code]) for code, method in enumerate(PAYMENT_METHODS)},
+        "top_items": top_items,
+    }
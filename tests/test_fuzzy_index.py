@@ -0,0 +1,74 @@
+from modules.fuzzy_index import FuzzyNameIndex, edit_distance
+from modules.menu_index import MenuEntityIndex
+
+MENU = {
+    "es_kopi": [
+        {"id": "EK001", "nama": "Kopi Susu Aren", "harga": 20000},
+        {"id": "EK002", "nama": "Es Kopi Manis Pandan (Komandan)", "harga": 22000},
+        {"id": "EK003", "nama": "Kopi Santan", "harga": 21000},
+    ],
+    "non_kopi": [
+        {"id": "NK001", "nama": "Matcha Presso", "harga": 27000},
+        {"id": "NK002", "nama": "Matcha Latte", "harga": 25000},
+    ],
+    "pastry": [
+        {"id": "PS001", "nama": "Almond Croissant", "harga": 25000},
+        {"id": "PS002", "nama": "Croissant Original", "harga": 20000},
+        {"id": "PS003", "nama": "Pain Au Chocolat", "harga": 24000},
+    ],
+}
+FILLER = frozenset({"yang", "mau", "pesan", "berapa", "harga", "dong", "ya", "halo", "kak", "dua"})
+
+
+def build_index():
+    return FuzzyNameIndex(MenuEntityIndex(MENU, list(MENU)).entries())
+
+
+def best_name(query):
+    results = build_index().search(query, limit=1, ignore_words=FILLER)
+    return results[0][0]["nama"] if results else None
+
+
+def test_request_typo_examples():
+    assert best_name("kopsus aren") == "Kopi Susu Aren"
+    assert best_name("croisant") in ("Almond Croissant", "Croissant Original")
+    assert best_name("kroisan almond") == "Almond Croissant"
+
+
+def test_typo_inside_sentence():
+    assert best_name("mau pesan almond croisant dua") == "Almond Croissant"
+    assert best_name("berapa harga kopi santn ya") == "Kopi Santan"
+
+
+def test_full_name_beats_shorter_window():
+    assert best_name("es kopi pandan komandan") == "Es Kopi Manis Pandan (Komandan)"
+
+
+def test_message_without_item_words_is_not_searched():
+    assert build_index().search("halo kak", ignore_words=FILLER) == []
+    assert build_index().search("mau 2", ignore_words=FILLER) == []
+
+
+def test_edit_distance_band():
+    assert edit_distance("croisant", "croissant") == 1
+    assert edit_distance("kitten", "sitting", max_distance=1) > 1
+    assert edit_distance("kitten", "sitting", max_distance=3) == 3
+
+
+def best_match_name(query):
+    match = build_index().best_match(query, ignore_words=FILLER)
+    return match["nama"] if match else None
+
+
+def test_ambiguous_match_is_not_auto_selected():
+    # Dua item matcha sama-sama cocok lewat alias; jangan pilih salah satunya diam-diam
+    assert [score for _, score in build_index().search("matcha", ignore_words=FILLER)] == [1.0, 1.0]
+    assert best_match_name("mau pesan matcha") is None
+    assert best_match_name("pesan yang manis") is None
+    assert best_match_name("croisant") is None
+
+
+def test_clear_match_is_auto_selected():
+    assert best_match_name("mau pesan kroisan almond") == "Almond Croissant"
+    assert best_match_name("matcha latee") == "Matcha Latte"
+    assert best_match_name("kopi santn") == "Kopi Santan"
@@ -0,0 +1,40 @@
+import pytest
+
+from bot import nlp_utils
+
+
+def test_keyword_table_is_read_only():
+    with pytest.raises(AttributeError):
+        nlp_utils.INTENT_KEYWORDS["sapaan"].append("wilujeng")
+    with pytest.raises(TypeError):
+        nlp_utils.INTENT_KEYWORDS["sapaan_sunda"] = ["wilujeng"]
+
+
+def test_reload_rebuilds_matcher():
+    original = nlp_utils.INTENT_KEYWORDS
+    matcher = nlp_utils.get_intent_matcher()
+    try:
+        keywords = dict(original)
+        keywords["sapaan"] = keywords["sapaan"] + ("wilujeng",)
+        nlp_utils.reload_intent_keywords(keywords)
+        assert nlp_utils.get_intent_matcher() is not matcher
+        assert nlp_utils.recognize_intent("wilujeng")[0] == "sapaan"
+        assert "wilujeng" in nlp_utils.NON_ITEM_WORDS
+    finally:
+        nlp_utils.reload_intent_keywords(original)
+    assert "wilujeng" not in nlp_utils.NON_ITEM_WORDS
+    assert nlp_utils.recognize_intent("wilujeng")[0] is None
+
+
+def test_entity_cache_follows_keyword_reload():
+    original = nlp_utils.INTENT_KEYWORDS
+    assert nlp_utils.extract_entities_item_name("kroisan almond")["nama"] == "Almond Croissant"
+    try:
+        # Kata yang jadi keyword menjadi kata non-item, jadi fallback fuzzy tidak lagi menemukan item
+        keywords = dict(original)
+        keywords["sapaan"] = keywords["sapaan"] + ("kroisan almond",)
+        nlp_utils.reload_intent_keywords(keywords)
+        assert nlp_utils.extract_entities_item_name("kroisan almond") is None
+    finally:
+        nlp_utils.reload_intent_keywords(original)
+    assert nlp_utils.extract_entities_item_name("kroisan almond")["nama"] == "Almond Croissant"
@@ -0,0 +1,16 @@
+from modules.menu_events import MenuChangeWatcher
+
+
+def test_watcher_detects_storage_change_without_version_file(tmp_path):
+    storage = {"signature": 1}
+    changes = []
+    watcher = MenuChangeWatcher(
+        on_change=lambda: changes.append(1), path=str(tmp_path / "menu_data.version"),
+        storage_signature=lambda: storage["signature"]
+    )
+    assert watcher.check() is False
+
+    storage["signature"] = 2 # menu_data.json diedit langsung
+    assert watcher.check() is True
+    assert watcher.check() is False
+    assert changes == [1]
@@ -0,0 +1,84 @@
+import asyncio
+import json
+import shutil
+import threading
+
+from modules import menu_manager
+from modules.menu_storage import create_storage
+
+
+def test_name_index_keeps_duplicate_names():
+    first = {"id": "T001", "nama": "Kopi Kembar", "harga": 10000}
+    second = {"id": "T002", "nama": "Kopi Kembar", "harga": 12000}
+    key = ("test_kategori", "kopi kembar")
+    try:
+        menu_manager._index_item(first, "test_kategori")
+        menu_manager._index_item(second, "test_kategori")
+        assert menu_manager._name_index[key] == [first, second]
+
+        # Menghapus item pertama tidak boleh membuat item kedua hilang dari indeks
+        menu_manager._unindex_item(first, "test_kategori")
+        assert menu_manager._name_index[key] == [second]
+        menu_manager._unindex_item(second, "test_kategori")
+        assert key not in menu_manager._name_index
+    finally:
+        menu_manager._rebuild_lookup_indexes()
+
+
+def test_delete_removes_exact_item_and_rollback_keeps_position(monkeypatch):
+    items = [
+        {"id": "T001", "nama": "Kopi A", "harga": 10000},
+        {"id": "T002", "nama": "Kopi B", "harga": 10000},
+        {"id": "T003", "nama": "Kopi B", "harga": 10000},
+        {"id": "T004", "nama": "Kopi C", "harga": 10000},
+    ]
+    menu = menu_manager.get_menu()
+    menu["test_kategori"] = items
+    menu_manager._rebuild_lookup_indexes()
+    try:
+        monkeypatch.setattr(menu_manager, "_persist_change", lambda change: False)
+        assert menu_manager.delete_item("T003")[0] is False
+        assert [item["id"] for item in items] == ["T001", "T002", "T003", "T004"]
+
+        monkeypatch.setattr(menu_manager, "_persist_change", lambda change: True)
+        assert menu_manager.delete_item("T002")[0] is True
+        # Posisi T004 yang tersimpan sudah bergeser satu karena delete sebelumnya
+        assert menu_manager.delete_item("T004")[0] is True
+        assert [item["id"] for item in items] == ["T001", "T003"]
+        assert menu_manager.get_item_by_name("kopi b")["id"] == "T003"
+    finally:
+        del menu["test_kategori"]
+        menu_manager._rebuild_lookup_indexes()
+
+
+def test_async_refresh_builds_indexes_off_the_event_loop(tmp_path, monkeypatch):
+    data_path = tmp_path / "menu_data.json"
+    shutil.copy(menu_manager.DATA_FILE_PATH, data_path)
+    monkeypatch.setattr(menu_manager, "_storage", create_storage("json", str(data_path)))
+    menu_manager.load_menu_data()
+    try:
+        # Dashboard (proses lain) menambah item langsung ke storage
+        menu = json.loads(data_path.read_text(encoding="utf-8"))
+        menu["pastry"].append({"id": "PS999", "nama": "Kouign Amann", "harga": 30000, "deskripsi": ""})
+        data_path.write_text(json.dumps(menu), encoding="utf-8")
+
+        prepare = menu_manager._prepare_menu_state
+        threads = []
+
+        def recording_prepare(previous_menu):
+            threads.append(threading.get_ident())
+            return prepare(previous_menu)
+
+        monkeypatch.setattr(menu_manager, "_prepare_menu_state", recording_prepare)
+        asyncio.run(menu_manager.refresh_menu_from_storage_async())
+
+        assert threads and threads[0] != threading.get_ident()
+        # Indeks yang dibangun di thread langsung dipakai, tanpa rebuild di pesan berikutnya
+        entity_index, fuzzy_index = menu_manager._entity_index, menu_manager._fuzzy_index
+        assert entity_index.version == menu_manager.get_menu_version()
+        assert menu_manager.get_entity_index() is entity_index
+        assert menu_manager.get_fuzzy_index() is fuzzy_index
+        assert menu_manager.get_item_by_id("PS999")[0]["nama"] == "Kouign Amann"
+    finally:
+        monkeypatch.undo()
+        menu_manager.load_menu_data()
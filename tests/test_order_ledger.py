@@ -0,0 +1,87 @@
+import asyncio
+import multiprocessing
+import os
+from datetime import date, datetime
+
+import pytest
+
+from modules import order_ledger as order_ledger_module
+from modules.order_ledger import OrderLedger, order_record
+
+
+def _record(order_id, user_id, created_at):
+    lines = [{"item_id": "EK001", "nama": "Kopi Susu Aren", "harga": 20000, "quantity": 1}]
+    return order_record(order_id, user_id, lines, 20000, "dine_in", None, "cash", created_at)
+
+
+def test_directory_created_on_first_write(tmp_path):
+    directory = tmp_path / "orders"
+    ledger = OrderLedger(str(directory))
+    assert not directory.exists()
+    assert ledger.available_dates() == []
+
+    ledger.append(_record("A1", 1, datetime(2024, 5, 1, 9)))
+    ledger.flush_sync()
+    assert ledger.available_dates() == [date(2024, 5, 1)]
+
+
+def test_failed_flush_requeues_only_unwritten_days(tmp_path, monkeypatch):
+    ledger = OrderLedger(str(tmp_path))
+    ledger.append(_record("A1", 1, datetime(2024, 5, 2, 9)))
+    ledger.flush_sync()
+    second_day_size = os.path.getsize(ledger.segment_path(date(2024, 5, 2)))
+
+    ledger.append(_record("B1", 1, datetime(2024, 5, 1, 9)))
+    ledger.append(_record("B2", 2, datetime(2024, 5, 2, 10)))
+
+    real_fsync = os.fsync
+    calls = []
+
+    def failing_fsync(fd):
+        calls.append(fd)
+        if len(calls) == 2:
+            raise OSError("disk penuh")
+        real_fsync(fd)
+
+    monkeypatch.setattr(order_ledger_module.os, "fsync", failing_fsync)
+    with pytest.raises(OSError):
+        asyncio.run(ledger.flush())
+
+    # Tanggal pertama sudah tertulis; segmen tanggal kedua kembali ke ukuran sebelum batch
+    assert [r["order_id"] for r in ledger._pending] == ["B2"]
+    assert os.path.getsize(ledger.segment_path(date(2024, 5, 2))) == second_day_size
+
+    monkeypatch.setattr(order_ledger_module.os, "fsync", real_fsync)
+    assert asyncio.run(ledger.flush()) == 1
+    assert [r["order_id"] for r in ledger.orders_for_date(date(2024, 5, 2))] == ["A1", "B2"]
+    assert [r["order_id"] for r in ledger.orders_for_date(date(2024, 5, 1))] == ["B1"]
+
+
+def _write_orders(directory, user_id, count, results):
+    ledger = OrderLedger(directory)
+    ledger._ensure_user_index() # Indeks di memori ikut diperbarui setiap batch
+    for number in range(count):
+        ledger.append(_record(f"U{user_id}-{number}", user_id, datetime(2024, 5, 1, 9)))
+        ledger.flush_sync()
+    results.put([r["order_id"] for r in ledger.orders_for_user(user_id)])
+
+
+def test_concurrent_processes_keep_offsets_aligned(tmp_path):
+    context = multiprocessing.get_context("fork")
+    results = context.Queue()
+    workers = [
+        context.Process(target=_write_orders, args=(str(tmp_path), user_id, 200, results))
+        for user_id in (1, 2, 3)
+    ]
+    for worker in workers:
+        worker.start()
+    per_user = [results.get(timeout=60) for _ in workers]
+    for worker in workers:
+        worker.join()
+
+    for order_ids in per_user:
+        assert len(order_ids) == 200
+        assert len({order_id.split("-")[0] for order_id in order_ids}) == 1
+    ledger = OrderLedger(str(tmp_path))
+    for user_id in (1, 2, 3):
+        assert len(ledger.orders_for_user(user_id)) == 200
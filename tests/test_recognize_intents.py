@@ -0,0 +1,30 @@
+import pytest
+
+from bot import intent_classifier, nlp_utils
+from bot.nlp_cache import clear_nlp_caches
+from bot.intent_classifier import IntentClassifier, keyword_table_hash, load_training_data
+
+MESSAGES = [
+    "halo kak", "mau lihat menu dong", "berapa harga kopi susu aren", "iya betul", "gak jadi deh",
+    "makasih ya", "kamu bot apa", "cara pesan gimana", "aku pengen liat daftar minuman", "",
+]
+
+
+@pytest.fixture
+def classifier_enabled(tmp_path, monkeypatch):
+    texts, labels = load_training_data(nlp_utils.INTENT_KEYWORDS)
+    model_path = str(tmp_path / "intent_model.npz")
+    IntentClassifier.train(texts, labels, keyword_table_hash(nlp_utils.INTENT_KEYWORDS), epochs=100).save(model_path)
+    monkeypatch.setattr(intent_classifier, "INTENT_MODEL_PATH", model_path)
+    monkeypatch.setattr(nlp_utils, "INTENT_CLASSIFIER_ENABLED", True)
+    monkeypatch.setattr(nlp_utils, "_intent_classifier", None)
+    monkeypatch.setattr(nlp_utils, "_intent_classifier_loaded", False)
+    assert nlp_utils.get_intent_classifier() is not None
+    yield
+    clear_nlp_caches()
+
+
+@pytest.mark.parametrize("processes", [1, 2])
+def test_batch_matches_single_with_classifier(classifier_enabled, processes):
+    expected = [nlp_utils.recognize_intent(text) for text in MESSAGES]
+    assert list(nlp_utils.recognize_intents(MESSAGES, processes=processes, chunk_size=3)) == expected
@@ -0,0 +1,56 @@
+import os
+from datetime import date, datetime
+
+from modules.order_ledger import OrderLedger, order_record
+from modules import sales_analytics
+from modules.sales_analytics import SalesColumnStore, compute_sales_summary
+
+
+def test_long_item_ids_and_names_are_not_truncated(tmp_path):
+    ledger = OrderLedger(str(tmp_path / "orders"))
+    long_id = "ITEM_" + "X" * 40
+    long_name = "Es Kopi Susu Gula Aren Extra Shot Oat Milk Less Ice " * 2
+    ledger.append(order_record(
+        "A1", 1, [{"item_id": "K1", "nama": "Kopi", "harga": 10000, "quantity": 1}],
+        10000, "dine_in", None, "Cash", datetime(2024, 5, 1, 9)
+    ))
+    ledger.append(order_record(
+        "A2", 2, [{"item_id": long_id, "nama": long_name, "harga": 30000, "quantity": 2}],
+        60000, "takeaway", "bungkus", "E-Wallet", datetime(2024, 5, 2, 14)
+    ))
+    ledger.flush_sync()
+
+    store = SalesColumnStore(ledger)
+    for _ in range(2): # Kedua kalinya dibaca dari cache .npy
+        summary = compute_sales_summary(date(2024, 5, 1), date(2024, 5, 2), store)
+        assert summary["top_items"][0] == {"item_id": long_id, "nama": long_name, "quantity": 2, "revenue": 60000}
+        assert summary["top_items"][1]["item_id"] == "K1"
+
+
+def test_order_appended_during_conversion_is_not_lost(tmp_path, monkeypatch):
+    ledger = OrderLedger(str(tmp_path / "orders"))
+    day = date(2024, 5, 1)
+
+    def order(order_id, hour):
+        lines = [{"item_id": "K1", "nama": "Kopi", "harga": 10000, "quantity": 1}]
+        return order_record(order_id, 1, lines, 10000, "dine_in", None, "Cash", datetime(2024, 5, 1, hour))
+
+    ledger.append(order("A1", 9))
+    ledger.flush_sync()
+
+    segment_to_columns = sales_analytics._segment_to_columns
+
+    def append_while_converting(segment_path, size=None):
+        # Bot menulis pesanan baru tepat saat dashboard sedang mengonversi segmen
+        ledger.append(order("A2", 10))
+        ledger.flush_sync()
+        monkeypatch.setattr(sales_analytics, "_segment_to_columns", segment_to_columns)
+        return segment_to_columns(segment_path, size)
+
+    monkeypatch.setattr(sales_analytics, "_segment_to_columns", append_while_converting)
+    store = SalesColumnStore(ledger)
+    assert compute_sales_summary(day, day, store)["order_count"] == 1
+    assert compute_sales_summary(day, day, store)["order_count"] == 2
+    assert compute_sales_summary(day, day, store)["order_count"] == 2
+    # Cache versi lama dibersihkan; tersisa satu pasang file
+    assert len(os.listdir(store.cache_dir)) == 2
@@ -0,0 +1,46 @@
+import asyncio
+import sqlite3
+import threading
+
+from bot.session_persistence import SessionPersistence
+from bot.user_context import Session, SessionStore
+
+
+def test_cancelled_flush_is_written_by_final_flush(tmp_path):
+    db_path = str(tmp_path / "sessions.db")
+    persistence = SessionPersistence(db_path)
+    store = SessionStore(ttl_seconds=3600)
+    persistence.warm_load(store)
+    for user_id in range(1, 4):
+        store[user_id] = Session()
+
+    started = threading.Event()
+    release = threading.Event()
+    write_batch = persistence._write_batch
+
+    def slow_write_batch(upserts, deletes):
+        started.set()
+        release.wait(5)
+        write_batch(upserts, deletes)
+
+    persistence._write_batch = slow_write_batch
+
+    async def shutdown_during_flush():
+        task = asyncio.create_task(persistence.flush(store))
+        await asyncio.to_thread(started.wait, 5)
+        task.cancel()
+        await asyncio.gather(task, return_exceptions=True)
+
+    loop = asyncio.new_event_loop()
+    try:
+        loop.run_until_complete(shutdown_during_flush())
+        persistence._write_batch = write_batch
+        # Thread flusher masih memegang koneksi; flush terakhir harus menunggu, bukan bertabrakan
+        threading.Timer(0.05, release.set).start()
+        persistence.flush_sync(store)
+        persistence.close()
+    finally:
+        loop.close()
+
+    with sqlite3.connect(db_path) as conn:
+        assert sorted(row[0] for row in conn.execute("SELECT user_id FROM sessions")) == [1, 2, 3]
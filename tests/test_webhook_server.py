@@ -0,0 +1,58 @@
+import asyncio
+
+from bot.webhook_server import WebhookServer, post_update
+
+
+async def _raw_request(port, payload):
+    reader, writer = await asyncio.open_connection("127.0.0.1", port)
+    writer.write(payload)
+    await writer.drain()
+    status_line = await reader.readline()
+    writer.close()
+    return int(status_line.split()[1])
+
+
+def _post(headers, body=b"{}"):
+    lines = ["POST /telegram HTTP/1.1", "Connection: close", *headers, "", ""]
+    return "\r\n".join(lines).encode("latin-1") + body
+
+
+def test_rejects_malformed_requests():
+    received = []
+
+    async def on_update(update):
+        received.append(update)
+
+    async def scenario():
+        server = WebhookServer(on_update, port=0, secret_token="rahasia")
+        await server.start()
+        try:
+            secret = "X-Telegram-Bot-Api-Secret-Token: rahasia"
+            return [
+                await _raw_request(server.port, _post([secret, "Content-Length: abc"])),
+                await _raw_request(server.port, _post([secret, "Content-Length: -5"])),
+                await _raw_request(server.port, _post([secret, "Content-Length: 999999999"])),
+                await _raw_request(server.port, _post(["X-Telegram-Bot-Api-Secret-Token: salah", "Content-Length: 2"])),
+                await _raw_request(server.port, _post([secret, "Content-Length: 15"], b'{"update_id":1}')),
+            ]
+        finally:
+            await server.stop()
+
+    assert asyncio.run(scenario()) == [400, 400, 413, 403, 200]
+    assert received == [{"update_id": 1}]
+
+
+def test_post_update_returns_error_status():
+    async def on_update(update):
+        pass
+
+    async def scenario():
+        server = WebhookServer(on_update, port=0, secret_token="rahasia")
+        await server.start()
+        try:
+            url = f"http://127.0.0.1:{server.port}/telegram"
+            return await asyncio.to_thread(post_update, url, {"update_id": 7}, "salah")
+        finally:
+            await server.stop()
+
+    assert asyncio.run(scenario()) == 403